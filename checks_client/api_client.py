@@ -1,3 +1,5 @@
+import io
+import gzip
 import polars as pl
 import requests
 import json
@@ -24,7 +26,30 @@ API_BASE: str = (
 # async is default
 ASYNC_URL = f"{API_BASE}/v1/validate"
 ASYNC_STATUS_URL = f"{API_BASE}/v1/validate/{{task_id}}"
+ASYNC_ISSUES_URL = f"{API_BASE}/v1/validate/{{task_id}}/issues"
 SYNC_URL = f"{API_BASE}/v1/validate/core"
+BATCH_URL = f"{API_BASE}/v1/validate/batch"
+BATCH_STATUS_URL = f"{API_BASE}/v1/validate/batch/{{batch_id}}"
+ASYNC_UPLOAD_URL = f"{API_BASE}/v1/validate/upload"
+SYNC_UPLOAD_URL = f"{API_BASE}/v1/validate/core/upload"
+ARROW_FILE_TYPE = "application/vnd.apache.arrow.file"
+# request bodies from this size on are sent gzip compressed, 0 = never
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024 * 1024))
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """
+    requests.post, body gzip compressed (Content-Encoding) when larger than COMPRESS_MIN_BYTES.
+    csv and json rows usually shrink 5-10x, the server decompresses while reading.
+    """
+    req = requests.Request("POST", url, **kwargs).prepare()
+    body = req.body.encode() if isinstance(req.body, str) else req.body
+    if COMPRESS_MIN_BYTES and body and len(body) >= COMPRESS_MIN_BYTES:
+        req.body = gzip.compress(body, compresslevel=6)
+        req.headers["Content-Encoding"] = "gzip"
+        req.headers["Content-Length"] = str(len(req.body))
+    with requests.Session() as session:
+        return session.send(req)
 
 
 def file_to_rows(file_path: str | Path) -> List[Dict[str, Any]]:
@@ -60,6 +85,33 @@ def file_to_rows(file_path: str | Path) -> List[Dict[str, Any]]:
         )
 
 
+def file_to_arrow(file_path: str | Path) -> bytes:
+    """
+    Read csv or parquet and return it as an Arrow IPC file.
+    csv columns stay strings, like the server reads csv uploads.
+    """
+    path = Path(file_path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        df = pl.read_parquet(path)
+    elif path.suffix.lower() == ".csv":
+        df = pl.read_csv(path, infer_schema=False)
+    else:
+        raise ValueError(
+            f"Unsupported file extension: {path.suffix}. Use .csv or .parquet"
+        )
+    return frame_to_arrow(df)
+
+
+def frame_to_arrow(df: pl.DataFrame) -> bytes:
+    """
+    Arrow IPC file of a frame already in memory, dtypes are kept.
+    File format, uncompressed: the server memory maps it instead of reading it in full.
+    """
+    buf = io.BytesIO()
+    df.write_ipc(buf, compression="uncompressed")
+    return buf.getvalue()
+
+
 def build_request_body(dataset_file: str, datadic_file: str) -> Dict[str, Any]:
     """
     Build request body from two files (csv or json).
@@ -73,12 +125,20 @@ def build_request_body(dataset_file: str, datadic_file: str) -> Dict[str, Any]:
     }
 
 
+def row_count_header(payload: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Dataset row count for the server's memory admission estimate.
+    """
+    datasets = payload.get("datasets") or [payload["dataset"]]
+    return {"X-Row-Count": str(sum(len(d["rows"]) for d in datasets))}
+
+
 def call_async_validation(dataset_path: str, datadic_path: str) -> str:
     """
     Call POST /v1/validate and return task_id.
     """
     payload = build_request_body(dataset_path, datadic_path)
-    resp = requests.post(ASYNC_URL, json=payload)
+    resp = post(ASYNC_URL, json=payload, headers=row_count_header(payload))
 
     print("Create task status:", resp.status_code)
     try:
@@ -99,14 +159,20 @@ def call_async_validation(dataset_path: str, datadic_path: str) -> str:
 
 
 def poll_task(
-    task_id: str, interval_seconds: float = 1.0, max_attempts: int = 60
+    task_id: str,
+    interval_seconds: float = 1.0,
+    max_attempts: int = 60,
+    wait_seconds: float = 30,
 ) -> Dict[str, Any]:
     """
     Poll GET /v1/validate/{task_id} until DONE or ERROR, or until max_attempts.
+    With wait_seconds the server holds each request until the task finishes (long-poll),
+    so there is no sleep between attempts.
     """
     for attempt in range(max_attempts):
         url = ASYNC_STATUS_URL.format(task_id=task_id)
-        resp = requests.get(url)
+        params = {"wait": wait_seconds} if wait_seconds else None
+        resp = requests.get(url, params=params, timeout=(wait_seconds or 0) + 30)
         print(f"[poll {attempt + 1}] status code:", resp.status_code)
 
         if resp.status_code == 404:
@@ -125,17 +191,79 @@ def poll_task(
         if status in ("DONE", "ERROR"):
             return data
 
-        time.sleep(interval_seconds)
+        if not wait_seconds:
+            time.sleep(interval_seconds)
 
     return {"error": "Polling timed out", "task_id": task_id}
 
 
+def iter_task_issues(task_id: str, check: str, page_size: int = 10000):
+    """
+    Yield all issues of one check from a finished task, page by page via GET /v1/validate/{task_id}/issues.
+    Task results only carry counts and the first issues (see "truncated").
+    """
+    offset = 0
+    while True:
+        resp = requests.get(
+            ASYNC_ISSUES_URL.format(task_id=task_id),
+            params={"check": check, "offset": offset, "limit": page_size},
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(f"Error fetching issues: {resp.text}")
+        page = resp.json()
+        yield from page["issues"]
+        offset += len(page["issues"])
+        if not page["issues"] or offset >= page["total"]:
+            return
+
+
+def call_batch_validation(
+    dataset_paths: List[str],
+    datadic_path: str,
+    wait_seconds: float = 30,
+    max_attempts: int = 60,
+    interval_seconds: float = 1.0,
+) -> Dict[str, Any]:
+    """
+    Validate several datasets against one dictionary: POST /v1/validate/batch,
+    then long-poll the batch until every task is done, or until max_attempts.
+    Returns batch status with task ids.
+    """
+    body = {
+        "datadic": {"rows": file_to_rows(datadic_path)},
+        "datasets": [{"rows": file_to_rows(p)} for p in dataset_paths],
+    }
+    resp = post(BATCH_URL, json=body, headers=row_count_header(body))
+    print("Create batch status:", resp.status_code)
+    if resp.status_code != 200:
+        raise RuntimeError(f"Error creating batch: {resp.text}")
+    batch_id = resp.json()["id"]
+
+    url = BATCH_STATUS_URL.format(batch_id=batch_id)
+    params = {"wait": wait_seconds} if wait_seconds else None
+    for attempt in range(max_attempts):
+        resp = requests.get(url, params=params, timeout=(wait_seconds or 0) + 30)
+        print(f"[poll {attempt + 1}] status code:", resp.status_code)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Error polling batch {batch_id}: {resp.text}")
+
+        data = resp.json()
+        print("Batch status:", data["status"], data["counts"])
+        if data["status"] == "DONE":
+            return data
+
+        if not wait_seconds:
+            time.sleep(interval_seconds)
+
+    return {"error": "Polling timed out", "batch_id": batch_id}
+
+
 def call_sync_validation(dataset_path: str, datadic_path: str) -> Dict[str, Any]:
     """
     Call POST /v1/validate/core and return the result directly.
     """
     payload = build_request_body(dataset_path, datadic_path)
-    resp = requests.post(SYNC_URL, json=payload)
+    resp = post(SYNC_URL, json=payload, headers=row_count_header(payload))
 
     print("Sync call status:", resp.status_code)
     try:
@@ -150,6 +278,54 @@ def call_sync_validation(dataset_path: str, datadic_path: str) -> Dict[str, Any]
     return data
 
 
+def call_upload_validation(
+    dataset_path: str,
+    datadic_path: str,
+    url: str = ASYNC_UPLOAD_URL,
+    as_arrow: bool = False,
+) -> Dict[str, Any]:
+    """
+    Send csv or parquet files as-is (multipart) and return the response JSON.
+    With as_arrow both are sent as Arrow IPC files, the server memory maps them without parsing.
+    """
+    if as_arrow:
+        files = {
+            "dataset": (
+                Path(dataset_path).stem + ".arrow",
+                file_to_arrow(dataset_path),
+                ARROW_FILE_TYPE,
+            ),
+            "datadic": (
+                Path(datadic_path).stem + ".arrow",
+                file_to_arrow(datadic_path),
+                ARROW_FILE_TYPE,
+            ),
+        }
+        resp = post(url, files=files)
+    else:
+        with (
+            open(dataset_path, "rb") as dataset_f,
+            open(datadic_path, "rb") as datadic_f,
+        ):
+            files = {
+                "dataset": (Path(dataset_path).name, dataset_f),
+                "datadic": (Path(datadic_path).name, datadic_f),
+            }
+            resp = post(url, files=files)
+
+    print("Upload call status:", resp.status_code)
+    try:
+        data = resp.json()
+    except Exception:
+        print("Non-JSON response:", resp.text)
+        raise
+
+    if resp.status_code != 200:
+        raise RuntimeError(f"Error from upload validation: {data}")
+
+    return data
+
+
 def main(mode: str, dataset_path: str, datadic_path: str):
     try:
         if mode == "async":
@@ -161,13 +337,55 @@ def main(mode: str, dataset_path: str, datadic_path: str):
             print("Final task response JSON:")
             print(json.dumps(result, indent=2))
 
+            # page through issue lists that were cut short in the summary
+            for kind, rows in (result.get("result") or {}).items():
+                for row in rows:
+                    if row.get("truncated"):
+                        issues = list(iter_task_issues(task_id, row["check"]))
+                        print(f"{kind}/{row['check']}: {len(issues)} issues fetched")
+
         elif mode == "sync":
             result = call_sync_validation(dataset_path, datadic_path)
             print("Sync validation response JSON:")
             print(json.dumps(result, indent=2))
 
+        elif mode == "async_upload":
+            task_id = call_upload_validation(dataset_path, datadic_path)["id"]
+            print(f"Created task id: {task_id}")
+            result = poll_task(task_id, interval_seconds=1.0, max_attempts=60)
+
+            print("Final task response JSON:")
+            print(json.dumps(result, indent=2))
+
+        elif mode == "sync_upload":
+            result = call_upload_validation(
+                dataset_path, datadic_path, url=SYNC_UPLOAD_URL
+            )
+            print("Sync upload validation response JSON:")
+            print(json.dumps(result, indent=2))
+
+        elif mode == "async_arrow":
+            task_id = call_upload_validation(dataset_path, datadic_path, as_arrow=True)[
+                "id"
+            ]
+            print(f"Created task id: {task_id}")
+            result = poll_task(task_id, interval_seconds=1.0, max_attempts=60)
+
+            print("Final task response JSON:")
+            print(json.dumps(result, indent=2))
+
+        elif mode == "sync_arrow":
+            result = call_upload_validation(
+                dataset_path, datadic_path, url=SYNC_UPLOAD_URL, as_arrow=True
+            )
+            print("Sync arrow validation response JSON:")
+            print(json.dumps(result, indent=2))
+
         else:
-            print(f"Unknown mode '{mode}', use 'async' or 'sync'")
+            print(
+                f"Unknown mode '{mode}', use 'async', 'sync', 'async_upload', 'sync_upload', "
+                "'async_arrow' or 'sync_arrow'"
+            )
 
     except FileNotFoundError as e:
         print(f"File not found: {e}")
@@ -185,5 +403,11 @@ if __name__ == "__main__":
     # large dataset (~220 MB)
     main("async", "./data/metropt.csv", "./data/incorrect_data_dictionary.csv")
 
+    # large dataset as raw file upload, no JSON rows round trip
+    # main("async_upload", "./data/metropt.csv", "./data/incorrect_data_dictionary.csv")
+
+    # same as Arrow IPC stream, no csv parsing on the server
+    # main("async_arrow", "./data/metropt.csv", "./data/incorrect_data_dictionary.csv")
+
     # empty dataset
     # main("async", "./data/empty.csv", "./data/incorrect_data_dictionary.csv")
@@ -1,5 +1,6 @@
 import fs from "fs";
 import path from "path";
+import zlib from "zlib";
 import axios from "axios";
 import dotenv from "dotenv";
 import csv from "csv-parser"; // lightweight CSV reader
@@ -24,6 +25,33 @@ console.log(API_BASE);
 const ASYNC_URL = `${API_BASE}/v1/validate`;
 const ASYNC_STATUS_URL = `${API_BASE}/v1/validate/{task_id}`;
 const SYNC_URL = `${API_BASE}/v1/validate/core`;
+const ASYNC_UPLOAD_URL = `${API_BASE}/v1/validate/upload`;
+const SYNC_UPLOAD_URL = `${API_BASE}/v1/validate/core/upload`;
+//request bodies from this size on are sent gzip compressed, 0 = never
+const COMPRESS_MIN_BYTES = Number(
+  process.env.COMPRESS_MIN_BYTES ?? 1024 * 1024,
+);
+
+//POST json or form, gzip compressed above COMPRESS_MIN_BYTES (server decompresses while reading)
+async function post(url: string, payload: AnyDict | FormData) {
+  let body: Buffer;
+  let contentType: string;
+  if (payload instanceof FormData) {
+    const encoded = new Response(payload); //multipart bytes plus boundary header
+    contentType = encoded.headers.get("content-type")!;
+    body = Buffer.from(await encoded.arrayBuffer());
+  } else {
+    contentType = "application/json";
+    body = Buffer.from(JSON.stringify(payload));
+  }
+
+  const headers: AnyDict = { "Content-Type": contentType };
+  if (COMPRESS_MIN_BYTES && body.length >= COMPRESS_MIN_BYTES) {
+    body = zlib.gzipSync(body);
+    headers["Content-Encoding"] = "gzip";
+  }
+  return axios.post(url, body, { headers });
+}
 
 //handle files
 async function fileToRows(filePath: string): Promise<AnyDict[]> {
@@ -58,6 +86,15 @@ async function fileToRows(filePath: string): Promise<AnyDict[]> {
   throw new Error(`Unsupported file extension: ${ext}. Use .csv or .json`);
 }
 
+//ndjson: one row per line, the server parses it in batches instead of one huge JSON body
+async function fileToNdjson(filePath: string): Promise<Blob> {
+  const rows = await fileToRows(filePath);
+  return new Blob(
+    rows.map((row) => JSON.stringify(row) + "\n"),
+    { type: "application/x-ndjson" },
+  );
+}
+
 async function buildRequestBody(
   datasetFile: string,
   datadicFile: string,
@@ -76,7 +113,7 @@ async function callAsyncValidation(
   datadicPath: string,
 ): Promise<string> {
   const payload = await buildRequestBody(datasetPath, datadicPath);
-  const resp = await axios.post(ASYNC_URL, payload);
+  const resp = await post(ASYNC_URL, payload);
 
   console.log("Create task status:", resp.status);
 
@@ -96,10 +133,14 @@ async function pollTask(
   taskId: string,
   interval = 1000,
   maxAttempts = 60,
+  waitSeconds = 30, //long-poll: server answers when task is done, no sleep needed
 ): Promise<AnyDict> {
   for (let attempt = 1; attempt <= maxAttempts; attempt++) {
     const url = ASYNC_STATUS_URL.replace("{task_id}", taskId);
-    const resp = await axios.get(url);
+    const resp = await axios.get(url, {
+      params: waitSeconds ? { wait: waitSeconds } : undefined,
+      timeout: (waitSeconds + 30) * 1000,
+    });
 
     console.log(`[poll ${attempt}] status code:`, resp.status);
 
@@ -116,7 +157,9 @@ async function pollTask(
       return data;
     }
 
-    await new Promise((res) => setTimeout(res, interval));
+    if (!waitSeconds) {
+      await new Promise((res) => setTimeout(res, interval));
+    }
   }
 
   return { error: "Polling timed out", task_id: taskId };
@@ -128,7 +171,7 @@ async function callSyncValidation(
   datadicPath: string,
 ): Promise<AnyDict> {
   const payload = await buildRequestBody(datasetPath, datadicPath);
-  const resp = await axios.post(SYNC_URL, payload);
+  const resp = await post(SYNC_URL, payload);
 
   console.log("Sync call status:", resp.status);
 
@@ -141,6 +184,34 @@ async function callSyncValidation(
   return resp.data;
 }
 
+//ndjson upload, returns task id (async) or the result (sync)
+async function callNdjsonValidation(
+  datasetPath: string,
+  datadicPath: string,
+  url = ASYNC_UPLOAD_URL,
+): Promise<AnyDict> {
+  const form = new FormData();
+  form.append(
+    "dataset",
+    await fileToNdjson(datasetPath),
+    path.parse(datasetPath).name + ".ndjson",
+  );
+  form.append(
+    "datadic",
+    await fileToNdjson(datadicPath),
+    path.parse(datadicPath).name + ".ndjson",
+  );
+  const resp = await post(url, form);
+
+  console.log("NDJSON upload status:", resp.status);
+
+  if (resp.status !== 200) {
+    throw new Error(`Error from ndjson upload: ${JSON.stringify(resp.data)}`);
+  }
+
+  return resp.data;
+}
+
 async function main() {
   const args = process.argv.slice(2);
   let [datasetPath, datadicPath, mode] = args;
@@ -150,7 +221,7 @@ async function main() {
     datadicPath = "../../data/incorrect_data_dictionary.csv";
     mode = "async";
     console.log(
-      `Usage: ts-node validateClient.ts <dataset_file> <datadic_file> <mode: async|sync>`,
+      `Usage: ts-node validateClient.ts <dataset_file> <datadic_file> <mode: async|sync|async_ndjson|sync_ndjson>`,
     );
     console.log(`Using defaults: ${datasetPath}, ${datadicPath}, mode=${mode}`);
   }
@@ -165,8 +236,23 @@ async function main() {
       const result = await callSyncValidation(datasetPath!, datadicPath!);
       console.log("Sync validation response JSON:");
       console.log(JSON.stringify(result, null, 2));
+    } else if (mode === "async_ndjson") {
+      const { id } = await callNdjsonValidation(datasetPath!, datadicPath!);
+      const result = await pollTask(id);
+      console.log("Final task response JSON:");
+      console.log(JSON.stringify(result, null, 2));
+    } else if (mode === "sync_ndjson") {
+      const result = await callNdjsonValidation(
+        datasetPath!,
+        datadicPath!,
+        SYNC_UPLOAD_URL,
+      );
+      console.log("Sync ndjson validation response JSON:");
+      console.log(JSON.stringify(result, null, 2));
     } else {
-      console.error(`Unknown mode '${mode}', use 'async' or 'sync'`);
+      console.error(
+        `Unknown mode '${mode}', use 'async', 'sync', 'async_ndjson' or 'sync_ndjson'`,
+      );
     }
   } catch (err: any) {
     console.error("Error:", err.message);
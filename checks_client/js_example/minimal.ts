@@ -44,10 +44,14 @@ async function pollTask(
   taskId: string,
   interval = 1000,
   maxAttempts = 5,
+  waitSeconds = 30, //long-poll: server answers when task is done, no sleep needed
 ): Promise<AnyDict> {
   for (let attempt = 1; attempt <= maxAttempts; attempt++) {
     const url = ASYNC_STATUS_URL.replace("{task_id}", taskId);
-    const resp = await axios.get(url);
+    const resp = await axios.get(url, {
+      params: waitSeconds ? { wait: waitSeconds } : undefined,
+      timeout: (waitSeconds + 30) * 1000,
+    });
 
     console.log(`[poll ${attempt}] status code:`, resp.status);
 
@@ -64,7 +68,9 @@ async function pollTask(
       return data;
     }
 
-    await new Promise((res) => setTimeout(res, interval));
+    if (!waitSeconds) {
+      await new Promise((res) => setTimeout(res, interval));
+    }
   }
 
   return { error: "Polling timed out", task_id: taskId };
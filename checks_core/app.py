@@ -1,28 +1,86 @@
 import os
+import orjson
 import uvicorn
-import json
 import uuid
+import secrets
 import asyncio
 import logging
 import psutil
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Request
+from typing import Annotated, List, Optional
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Request,
+    UploadFile,
+    File,
+    Query,
+    Header,
+    Depends,
+)
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
-from validators.schema_validator import SchemaValidator
-from validators.structure_validator import StructureValidator
-from server.models import ValidationResponse, DatasetRequest, DataDictionaryRequest
-from server.helper import _format_bytes, json_rows_to_df, df_to_temp_csv
-from validators.wrapper import run_both_validations
-from logs import setup_otel_logging
-from server.mariadb import (
-    init_db_pool,
-    close_db_pool,
-    create_task,
-    update_task,
-    get_task,
-    create_table,
+from server.models import (
+    ValidationResponse,
+    DatasetRequest,
+    DataDictionaryRequest,
+    ValidationOptions,
+    BatchRequest,
+    BatchValidationResponse,
+)
+from server.helper import (
+    OrjsonResponse,
+    _format_bytes,
+    dumps,
+    json_rows_to_df,
+    loads,
+)
+from server.admission import (
+    ADMISSION_CONFIG,
+    MemoryBudgetExceeded,
+    acquire,
+    admission_stats,
+    estimate_request,
+    estimate_task,
+    release,
+    reserve,
+)
+from server.encoding import DecompressionMiddleware
+from server.metrics import render_prometheus, start_metrics, stop_metrics
+from server.ingest import spool_upload, spool_rows, remove_files
+from server.results import split_result, fetch_issues
+from server.notify import subscribe, unsubscribe
+from server.retention import (
+    RETENTION_CONFIG,
+    purge_stats,
+    purge_expired,
+    start_purger,
+    stop_purger,
 )
+from server.queue import (
+    SPOOL_DIR,
+    QUEUE_CONFIG,
+    QueueFullError,
+    start_workers,
+    stop_workers,
+    ensure_capacity,
+    notify_workers,
+    release_inputs,
+)
+from validators.wrapper import (
+    init_executor,
+    shutdown_executor,
+    run_both_validations,
+    run_file_validations,
+    run_batch_validations,
+    run_structure_validation,
+    run_schema_validation,
+    lookup_cached_validations,
+    DEFAULT_MAX_MEMORY_MB,
+)
+from logs import setup_otel_logging
+from server.store import STORE_CONFIG, store
 
 # configs
 load_dotenv()
@@ -33,38 +91,189 @@ logging.basicConfig(level=log_level)
 logger = logging.getLogger()
 logger.setLevel(log_level)
 _process = psutil.Process(os.getpid())
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+# queue worker handler, inputs were spooled to disk at submission
+async def run_queued_validation(task: dict) -> dict:
+    options = ValidationOptions.model_validate_json(task["options_json"] or "{}")
+    # already queued, so wait for room in the memory budget instead of failing
+    estimate = await asyncio.to_thread(
+        estimate_task,
+        task["dataset_path"],
+        task["datadic_path"],
+        options.max_memory_mb or DEFAULT_MAX_MEMORY_MB,
+    )
+    # batch tasks start out with the schema rows of their shared dictionary
+    checked = loads(task["result_json"]) if task.get("result_json") else {}
+    async with reserve(estimate):
+        return await run_file_validations(
+            task["dataset_path"], task["datadic_path"], options, checked.get("schema")
+        )
+
+
+async def check_queue_capacity(n: int = 1):
+    try:
+        await ensure_capacity(n)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(int(QUEUE_CONFIG["poll_seconds"]) + 1)},
+        )
+
+
+FINAL_STATUSES = ("DONE", "ERROR")
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def task_response(task: dict) -> dict:
+    # stored result json is embedded as is, never parsed and re-serialized
+    final = task["status"] in FINAL_STATUSES and task["result_json"]
+    return {
+        "id": task["id"],
+        "status": task["status"],
+        "result": orjson.Fragment(task["result_json"]) if final else None,
+        "error": task["error"],
+    }
+
+
+async def wait_for_task(task_id: str, timeout: float, seen_status: str = None):
+    """
+    Return task once it is final or its status differs from seen_status, or when timeout runs out.
+
+    Woken in-process by update_task, the DB is only re-read on wakeup or every wait_recheck_seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    event = subscribe(task_id)
+    try:
+        while True:
+            event.clear()
+            task = await store.get_task(task_id)
+            if (
+                task is None
+                or task["status"] in FINAL_STATUSES
+                or (seen_status is not None and task["status"] != seen_status)
+            ):
+                return task
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return task
+            try:
+                await asyncio.wait_for(
+                    event.wait(),
+                    min(remaining, QUEUE_CONFIG["wait_recheck_seconds"]),
+                )
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        unsubscribe(task_id, event)
+
+
+# admin routes need X-Admin-Token, and are refused while ADMIN_TOKEN is not set
+async def require_admin(x_admin_token: Annotated[str, Header()] = ""):
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403, detail="Admin routes are disabled, ADMIN_TOKEN is not set"
+        )
+    if not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+async def submit_task(
+    dataset_path: str, datadic_path: str, options: ValidationOptions
+) -> str:
+    task_id = str(uuid.uuid4())
+    try:
+        # repeat submission: both results cached, task is done right away
+        cached = await lookup_cached_validations(dataset_path, datadic_path, options)
+        if cached is not None:
+            remove_files(dataset_path, datadic_path)
+            summary, issues = await asyncio.to_thread(split_result, cached)
+            await store.create_task(
+                task_id, status="DONE", result=summary, issues=issues
+            )
+            logger.info(f"[submit] served from cache | task_id={task_id}")
+            return task_id
+
+        await store.create_task(
+            task_id,
+            dataset_path,
+            datadic_path,
+            options.model_dump(exclude_none=True),
+        )
+    except Exception:
+        remove_files(dataset_path, datadic_path)
+        raise
+    notify_workers()
+    return task_id
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    logger.info("Initializing MariaDB pool...")
-    await init_db_pool()
-    await create_table()
-    logger.info("MariaDB pool ready and table ensured")
+    logger.info(f"Opening task store ({STORE_CONFIG['backend']})...")
+    await store.open()
+    await store.create_table()
+    logger.info("Task store ready and tables ensured")
+    init_executor()
+    await start_workers(run_queued_validation)
+    logger.info(f"Task workers started (max_in_flight={QUEUE_CONFIG['max_in_flight']})")
+    start_purger()
+    start_metrics()
     yield
-    logger.info("Closing MariaDB pool...")
-    await close_db_pool()
+    logger.info("Stopping task workers...")
+    await stop_metrics()
+    await stop_purger()
+    await stop_workers()
+    logger.info("Shutting down validation executor...")
+    shutdown_executor()
+    logger.info("Closing task store...")
+    await store.close()
 
 
 app = FastAPI(title="QC Tool API", lifespan=lifespan)
+# gzip/zstd request bodies, decoded as they stream in
+app.add_middleware(DecompressionMiddleware)
 
 
-# middlware: monitor RAM use
+# middlware: monitor RAM use, and admit requests only while their estimated memory fits the budget
 @app.middleware("http")
 async def memory_logging_middleware(request: Request, call_next):
-    before_bytes = _process.memory_info().rss
-    response = await call_next(request)
-    after_bytes = _process.memory_info().rss
+    estimate = estimate_request(request.method, request.url.path, request.headers)
+    try:
+        reservation = await acquire(estimate, ADMISSION_CONFIG["max_wait_seconds"])
+    except MemoryBudgetExceeded as e:
+        logger.warning(
+            "[memory][admission] rejected %s %s | estimate=%s | %s",
+            request.method,
+            request.url.path,
+            _format_bytes(estimate),
+            e,
+        )
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e)},
+            headers={"Retry-After": str(ADMISSION_CONFIG["retry_after_seconds"])},
+        )
+
+    try:
+        before_bytes = _process.memory_info().rss
+        response = await call_next(request)
+        after_bytes = _process.memory_info().rss
+    finally:
+        await release(reservation)
     delta_bytes = after_bytes - before_bytes
 
     logger.debug(
-        "[memory][request] %s %s | status=%s | before=%s after=%s delta=%+s",
+        "[memory][request] %s %s | status=%s | before=%s after=%s delta=%+s estimate=%s",
         request.method,
         request.url.path,
         getattr(response, "status_code", "NA"),
         _format_bytes(before_bytes),
         _format_bytes(after_bytes),
         _format_bytes(delta_bytes),
+        _format_bytes(estimate),
     )
 
     if delta_bytes > 0:
@@ -92,81 +301,403 @@ async def health():
 
 @app.post("/v1/validate")
 async def create_validation_task(
-    dataset: DatasetRequest, datadic: DataDictionaryRequest
+    dataset: DatasetRequest,
+    datadic: DataDictionaryRequest,
+    options: Annotated[ValidationOptions, Query()],
 ):
-    task_id = str(uuid.uuid4())
-    await create_task(task_id)
+    await check_queue_capacity()
 
-    dataset_data = dataset.model_dump()
-    datadic_data = datadic.model_dump()
+    dataset_path = await asyncio.to_thread(spool_rows, dataset.rows, SPOOL_DIR)
+    try:
+        datadic_path = await asyncio.to_thread(spool_rows, datadic.rows, SPOOL_DIR)
+    except Exception:
+        remove_files(dataset_path)
+        raise
 
-    async def run_validation():
-        try:
-            await update_task(task_id, "RUNNING")
-            dataset_obj = DatasetRequest(**dataset_data)
-            datadic_obj = DataDictionaryRequest(**datadic_data)
-            result = await run_both_validations(dataset_obj, datadic_obj)
-            await update_task(task_id, "DONE", result=result)
-        except Exception as e:
-            await update_task(task_id, "ERROR", error=str(e))
-            logger.exception(f"[run_validation] ERROR | task_id={task_id}")
-        finally:
-            dataset_data.clear()
-            datadic_data.clear()
-
-    asyncio.create_task(run_validation())
+    task_id = await submit_task(dataset_path, datadic_path, options)
     return {"id": task_id}
 
 
+async def submit_batch(
+    dataset_paths: List[str], datadic_path: str, options: ValidationOptions
+):
+    """
+    One task per dataset, all sharing the spooled dictionary. Returns batch id and task ids.
+
+    The dictionary is checked once here, queued tasks carry its schema rows as their
+    initial result and only check their dataset.
+    """
+    batch_id = str(uuid.uuid4())
+    tasks = []
+    schema = None
+    try:
+        for dataset_path in dataset_paths:
+            task = {"id": str(uuid.uuid4())}
+            cached = await lookup_cached_validations(
+                dataset_path, datadic_path, options
+            )
+            if cached is not None:
+                summary, issues = await asyncio.to_thread(split_result, cached)
+                task.update(status="DONE", result=summary, issues=issues)
+            else:
+                if schema is None:
+                    schema = await run_schema_validation(datadic_path, options)
+                task.update(
+                    dataset_path=dataset_path,
+                    datadic_path=datadic_path,
+                    options=options.model_dump(exclude_none=True),
+                    result={"schema": schema},
+                )
+            tasks.append(task)
+        await store.create_tasks(tasks, batch_id)
+    except Exception:
+        remove_files(*dataset_paths, datadic_path)
+        raise
+
+    # cached tasks are done, their inputs are no longer needed
+    for task, dataset_path in zip(tasks, dataset_paths):
+        if task.get("status") == "DONE":
+            remove_files(dataset_path)
+    await release_inputs(None, datadic_path)
+    notify_workers()
+    return batch_id, [task["id"] for task in tasks]
+
+
+def wants_follow_up(options: ValidationOptions) -> bool:
+    return options.mode == "preview" and options.follow_up
+
+
+# preview answered, queue the full validation of the same inputs
+async def submit_follow_up(
+    dataset_path: str, datadic_path: str, options: ValidationOptions
+) -> str:
+    full = options.model_copy(
+        update={
+            "mode": "full",
+            "follow_up": False,
+            "preview_rows": None,
+            "preview_max_issues": None,
+        }
+    )
+    return await submit_task(dataset_path, datadic_path, full)
+
+
+def batch_status(tasks: list) -> str:
+    statuses = {task["status"] for task in tasks}
+    if statuses <= set(FINAL_STATUSES):
+        return "DONE"
+    if statuses == {"PENDING"}:
+        return "PENDING"
+    return "RUNNING"
+
+
+# ?wait=N long-polls: returns as soon as the task is DONE/ERROR, or after N seconds
 @app.get("/v1/validate/{task_id}")
-async def get_validation_task(task_id: str):
-    task = await get_task(task_id)
+async def get_validation_task(task_id: str, wait: Annotated[float, Query(ge=0)] = 0):
+    if wait:
+        task = await wait_for_task(task_id, min(wait, QUEUE_CONFIG["max_wait_seconds"]))
+    else:
+        task = await store.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return OrjsonResponse(task_response(task))
+
+
+# server-sent events: one "status" event per state change, stream ends when task is final
+@app.get("/v1/validate/{task_id}/events")
+async def stream_validation_task(task_id: str):
+    task = await store.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+
+    async def events():
+        current, status = task, None
+        while current is not None:
+            if current["status"] != status:
+                status = current["status"]
+                yield f"event: status\ndata: {dumps(task_response(current)).decode()}\n\n"
+            else:
+                yield ": keepalive\n\n"
+            if status in FINAL_STATUSES:
+                return
+            current = await wait_for_task(task_id, SSE_KEEPALIVE_SECONDS, status)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# batch: one dictionary, many datasets. Poll the batch or each task id
+@app.post("/v1/validate/batch")
+async def create_batch_validation(
+    batch: BatchRequest, options: Annotated[ValidationOptions, Query()]
+):
+    await check_queue_capacity(len(batch.datasets))
+
+    datadic_path = await asyncio.to_thread(spool_rows, batch.datadic.rows, SPOOL_DIR)
+    dataset_paths = []
+    try:
+        for dataset in batch.datasets:
+            dataset_paths.append(
+                await asyncio.to_thread(spool_rows, dataset.rows, SPOOL_DIR)
+            )
+    except Exception:
+        remove_files(*dataset_paths, datadic_path)
+        raise
+
+    batch_id, task_ids = await submit_batch(dataset_paths, datadic_path, options)
+    return {"id": batch_id, "tasks": task_ids}
+
+
+@app.get("/v1/validate/batch/{batch_id}")
+async def get_batch_validation(batch_id: str, wait: Annotated[float, Query(ge=0)] = 0):
+    tasks = await store.get_batch_tasks(batch_id)
+    if not tasks:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    if wait:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(wait, QUEUE_CONFIG["max_wait_seconds"])
+        for task in tasks:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            if task["status"] not in FINAL_STATUSES:
+                await wait_for_task(task["id"], remaining)
+        tasks = await store.get_batch_tasks(batch_id)
+
+    counts = {}
+    for task in tasks:
+        counts[task["status"]] = counts.get(task["status"], 0) + 1
     return {
-        "id": task["id"],
-        "status": task["status"],
-        "result": json.loads(task["result_json"]) if task["result_json"] else None,
-        "error": task["error"],
+        "id": batch_id,
+        "status": batch_status(tasks),
+        "counts": counts,
+        "tasks": tasks,
     }
 
 
+# full issue list of one check, paged. Task result only holds counts and first issues
+@app.get("/v1/validate/{task_id}/issues")
+async def get_validation_issues(
+    task_id: str,
+    check: str,
+    kind: Optional[str] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(gt=0, le=100000)] = 1000,
+):
+    page = await fetch_issues(task_id, check, kind, offset, limit)
+    if page is None:
+        # no stored chunks: unknown task or check, not finished, or no issues found
+        task = await store.get_task(task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if task["status"] != "DONE":
+            raise HTTPException(
+                status_code=409, detail=f"Task is {task['status']}, no issues yet"
+            )
+        summary = loads(task["result_json"]) if task["result_json"] else {}
+        found = [
+            k
+            for k, rows in summary.items()
+            if (kind is None or k == kind)
+            and isinstance(rows, list)
+            and any(row.get("check") == check for row in rows)
+        ]
+        if not found:
+            raise HTTPException(status_code=404, detail=f"Unknown check '{check}'")
+        page = {
+            "kind": found[0],
+            "check": check,
+            "total": 0,
+            "offset": offset,
+            "limit": limit,
+            "issues": [],
+        }
+    return OrjsonResponse({"id": task_id, **page})
+
+
 @app.post("/v1/validate/core", response_model=ValidationResponse)
-async def validate_both(dataset: DatasetRequest, datadic: DataDictionaryRequest):
+async def validate_both(
+    dataset: DatasetRequest,
+    datadic: DataDictionaryRequest,
+    options: Annotated[ValidationOptions, Query()],
+):
+    if wants_follow_up(options):
+        await check_queue_capacity()
     try:
-        result = await run_both_validations(dataset, datadic)
-        return ValidationResponse(**result)
+        result = await run_both_validations(dataset, datadic, options)
     except Exception as e:
         logger.exception("[validate/core] Error")
         raise HTTPException(status_code=400, detail=str(e))
 
+    if wants_follow_up(options):
+        dataset_path = await asyncio.to_thread(spool_rows, dataset.rows, SPOOL_DIR)
+        try:
+            datadic_path = await asyncio.to_thread(spool_rows, datadic.rows, SPOOL_DIR)
+        except Exception:
+            remove_files(dataset_path)
+            raise
+        result["task_id"] = await submit_follow_up(dataset_path, datadic_path, options)
+    return OrjsonResponse(ValidationResponse.model_construct(**result))
+
+
+@app.post("/v1/validate/batch/core", response_model=BatchValidationResponse)
+async def validate_batch(
+    batch: BatchRequest, options: Annotated[ValidationOptions, Query()]
+):
+    try:
+        datadic_df = await asyncio.to_thread(json_rows_to_df, batch.datadic.rows)
+        dataset_dfs = [
+            await asyncio.to_thread(json_rows_to_df, dataset.rows)
+            for dataset in batch.datasets
+        ]
+        result = await run_batch_validations(dataset_dfs, datadic_df, options)
+        return OrjsonResponse(BatchValidationResponse.model_construct(**result))
+    except Exception as e:
+        logger.exception("[validate/batch/core] Error")
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @app.post("/v1/validate/structure")
-async def validate_structure(dataset: DatasetRequest):
-    dataset_df = json_rows_to_df(dataset.rows)
-    dataset_csv = df_to_temp_csv(dataset_df)
+async def validate_structure(
+    dataset: DatasetRequest, options: Annotated[ValidationOptions, Query()]
+):
+    dataset_df = await asyncio.to_thread(json_rows_to_df, dataset.rows)
+    return OrjsonResponse(await run_structure_validation(dataset_df, options))
+
+
+@app.post("/v1/validate/schema")
+async def validate_schema(
+    datadic: DataDictionaryRequest, options: Annotated[ValidationOptions, Query()]
+):
+    datadic_df = await asyncio.to_thread(json_rows_to_df, datadic.rows)
+    return OrjsonResponse(await run_schema_validation(datadic_df, options))
+
+
+# upload routes: raw csv/parquet files, spooled to disk and scanned directly
+@app.post("/v1/validate/upload")
+async def create_upload_validation_task(
+    options: Annotated[ValidationOptions, Query()],
+    dataset: UploadFile = File(...),
+    datadic: UploadFile = File(...),
+):
+    await check_queue_capacity()
+
+    dataset_path = await spool_upload(dataset, SPOOL_DIR)
+    try:
+        datadic_path = await spool_upload(datadic, SPOOL_DIR)
+    except Exception:
+        remove_files(dataset_path)
+        raise
+
+    task_id = await submit_task(dataset_path, datadic_path, options)
+    return {"id": task_id}
+
+
+@app.post("/v1/validate/core/upload", response_model=ValidationResponse)
+async def validate_both_upload(
+    options: Annotated[ValidationOptions, Query()],
+    dataset: UploadFile = File(...),
+    datadic: UploadFile = File(...),
+):
+    follow_up = wants_follow_up(options)
+    if follow_up:
+        await check_queue_capacity()
+    # follow-up task takes over the spooled files, so spool where workers read them
+    spool_dir = SPOOL_DIR if follow_up else None
+    dataset_path = datadic_path = None
     try:
-        validator = StructureValidator()
-        return json.loads(validator.validate_csv(dataset_csv, as_json=True))
+        dataset_path = await spool_upload(dataset, spool_dir)
+        datadic_path = await spool_upload(datadic, spool_dir)
+        result = await run_file_validations(dataset_path, datadic_path, options)
+        if follow_up:
+            task_id = await submit_follow_up(dataset_path, datadic_path, options)
+            dataset_path = datadic_path = None  # owned by the task now
+            result["task_id"] = task_id
+        return OrjsonResponse(ValidationResponse.model_construct(**result))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[validate/core/upload] Error")
+        raise HTTPException(status_code=400, detail=str(e))
     finally:
-        try:
-            os.remove(dataset_csv)
-        except OSError:
-            pass
+        remove_files(dataset_path, datadic_path)
 
 
-@app.post("/v1/validate/schema")
-async def validate_schema(datadic: DataDictionaryRequest):
-    datadic_df = json_rows_to_df(datadic.rows)
-    datadic_csv = df_to_temp_csv(datadic_df)
+@app.post("/v1/validate/structure/upload")
+async def validate_structure_upload(
+    options: Annotated[ValidationOptions, Query()], dataset: UploadFile = File(...)
+):
+    dataset_path = None
     try:
-        validator = SchemaValidator()
-        return json.loads(validator.validate_csv(datadic_csv, as_json=True))
+        dataset_path = await spool_upload(dataset)
+        return OrjsonResponse(await run_structure_validation(dataset_path, options))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[validate/structure/upload] Error")
+        raise HTTPException(status_code=400, detail=str(e))
     finally:
-        try:
-            os.remove(datadic_csv)
-        except OSError:
-            pass
+        remove_files(dataset_path)
+
+
+@app.post("/v1/validate/schema/upload")
+async def validate_schema_upload(
+    options: Annotated[ValidationOptions, Query()], datadic: UploadFile = File(...)
+):
+    datadic_path = None
+    try:
+        datadic_path = await spool_upload(datadic)
+        return OrjsonResponse(await run_schema_validation(datadic_path, options))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[validate/schema/upload] Error")
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        remove_files(datadic_path)
+
+
+# admin: storage use and retention purge
+@app.get("/v1/admin/storage", dependencies=[Depends(require_admin)])
+async def admin_storage():
+    return {
+        "tables": await store.get_table_stats(),
+        "tasks_by_status": await store.count_tasks_by_status(),
+    }
+
+
+# prometheus scrape endpoint, also exported over OTLP when OTEL is set
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/v1/admin/memory", dependencies=[Depends(require_admin)])
+async def admin_memory():
+    return admission_stats()
+
+
+@app.get("/v1/admin/purge", dependencies=[Depends(require_admin)])
+async def admin_purge_stats():
+    return {
+        "retention_seconds": RETENTION_CONFIG["retention_seconds"],
+        "interval_seconds": RETENTION_CONFIG["interval_seconds"],
+        **purge_stats,
+    }
+
+
+@app.post("/v1/admin/purge", dependencies=[Depends(require_admin)])
+async def admin_purge():
+    if not RETENTION_CONFIG["retention_seconds"]:
+        raise HTTPException(status_code=409, detail="Retention is disabled")
+    deleted = await purge_expired()
+    return {"deleted": deleted, **purge_stats}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import importlib
+import orjson
+import polars as pl
+from typing import Callable, Dict
+
+# in-process task store, every request does the full work (no result cache)
+BENCH_ENV = {
+    "TASK_STORE": "memory",
+    "CACHE_ENABLED": "0",
+    "LOG_LEVEL": "WARNING",
+    "TASK_POLL_SECONDS": "0.05",
+}
+WAIT_SECONDS = 300
+
+
+def open_client():
+    """
+    TestClient for the app on the in-memory task store, use it as a context manager
+    so task workers run. Spool files go to a fresh temporary directory.
+    """
+    for key, value in BENCH_ENV.items():
+        os.environ[key] = value
+    os.environ.setdefault("TASK_SPOOL_DIR", tempfile.mkdtemp(prefix="qc_bench_"))
+
+    from fastapi.testclient import TestClient
+
+    # config is read on import, so after the environment is set
+    return TestClient(importlib.import_module("app").app)
+
+
+def endpoint_benchmarks(client, paths: Dict[str, str]) -> Dict[str, Callable]:
+    """
+    One benchmark per route, request to final response. Async routes are timed until the
+    task is DONE (long-poll or SSE), like a client waiting for the result.
+    """
+    dataset = {"rows": pl.read_csv(paths["csv"], infer_schema=False).to_dicts()}
+    datadic = {"rows": pl.read_csv(paths["datadic"], infer_schema=False).to_dicts()}
+    # serialized once, so the client side json encoding is not timed
+    core_body = orjson.dumps({"dataset": dataset, "datadic": datadic})
+    dataset_body = orjson.dumps(dataset)
+    datadic_body = orjson.dumps(datadic)
+    batch_body = orjson.dumps({"datadic": datadic, "datasets": [dataset, dataset]})
+
+    def post(url, body=None, files=None):
+        if files is not None:
+            response = client.post(url, files=files())
+        else:
+            response = client.post(
+                url, content=body, headers={"Content-Type": "application/json"}
+            )
+        response.raise_for_status()
+        return response.json()
+
+    def get(url, **params):
+        response = client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    # uploads sent from memory, named like the files so routes pick the format
+    contents = {}
+    for key in ("csv", "parquet", "datadic"):
+        with open(paths[key], "rb") as f:
+            contents[key] = (os.path.basename(paths[key]), f.read())
+
+    def upload(dataset_format="csv", datadic=True):
+        def files():
+            parts = {"dataset": contents[dataset_format]}
+            if datadic:
+                parts["datadic"] = contents["datadic"]
+            return parts
+
+        return files
+
+    def wait_task(task_id):
+        task = get(f"/v1/validate/{task_id}", wait=WAIT_SECONDS)
+        if task["status"] != "DONE":
+            raise RuntimeError(f"Task {task_id} is {task['status']}: {task['error']}")
+        return task
+
+    def stream_task(task_id):
+        with client.stream("GET", f"/v1/validate/{task_id}/events") as response:
+            for line in response.iter_lines():
+                if line.startswith("data:") and '"status":"DONE"' in line:
+                    return
+        raise RuntimeError(f"Task {task_id} stream ended before DONE")
+
+    def wait_batch(batch_id):
+        batch = get(f"/v1/validate/batch/{batch_id}", wait=WAIT_SECONDS)
+        if batch["status"] != "DONE":
+            raise RuntimeError(f"Batch {batch_id} is {batch['status']}")
+
+    # a finished task to page issues from
+    issues_task = wait_task(post("/v1/validate", core_body)["id"])["id"]
+
+    return {
+        "sync.core": lambda: post("/v1/validate/core", core_body),
+        "sync.core_preview": lambda: post("/v1/validate/core?mode=preview", core_body),
+        "sync.structure": lambda: post("/v1/validate/structure", dataset_body),
+        "sync.schema": lambda: post("/v1/validate/schema", datadic_body),
+        "sync.batch_core": lambda: post("/v1/validate/batch/core", batch_body),
+        "sync.core_upload_csv": lambda: post(
+            "/v1/validate/core/upload", files=upload("csv")
+        ),
+        "sync.core_upload_parquet": lambda: post(
+            "/v1/validate/core/upload", files=upload("parquet")
+        ),
+        "sync.structure_upload": lambda: post(
+            "/v1/validate/structure/upload", files=upload("csv", datadic=False)
+        ),
+        "sync.schema_upload": lambda: post(
+            "/v1/validate/schema/upload",
+            files=lambda: {"datadic": contents["datadic"]},
+        ),
+        "async.validate_wait": lambda: wait_task(post("/v1/validate", core_body)["id"]),
+        "async.validate_events": lambda: stream_task(
+            post("/v1/validate", core_body)["id"]
+        ),
+        "async.upload_wait": lambda: wait_task(
+            post("/v1/validate/upload", files=upload("parquet"))["id"]
+        ),
+        "async.batch_wait": lambda: wait_batch(
+            post("/v1/validate/batch", batch_body)["id"]
+        ),
+        "read.issues_page": lambda: get(
+            f"/v1/validate/{issues_task}/issues",
+            check="duplicated_row",
+            limit=1000,
+        ),
+        "read.metrics": lambda: client.get("/metrics").raise_for_status(),
+    }
@@ -0,0 +1,167 @@
+import argparse
+import os
+import polars as pl
+from typing import Dict
+
+from validators import MINIMAL_VARS
+
+GOLDEN = 0x9E3779B97F4A7C15
+# value kinds cycled over the generated columns, each has matching dictionary rules
+KINDS = ("integer", "numeric", "category", "text")
+CATEGORIES = ("A", "B", "C", "D", "E")
+
+
+def mix(i: pl.Expr, seed: int) -> pl.Expr:
+    """
+    splitmix64 of a UInt64 expression: same values on every platform and polars version.
+    """
+    z = i * pl.lit(GOLDEN, pl.UInt64) + pl.lit(seed * GOLDEN % 2**64, pl.UInt64)
+    z = (z ^ (z // 2**30)) * pl.lit(0xBF58476D1CE4E5B9, pl.UInt64)
+    z = (z ^ (z // 2**27)) * pl.lit(0x94D049BB133111EB, pl.UInt64)
+    return z ^ (z // 2**31)
+
+
+def column_names(columns: int, dup_columns: int) -> list:
+    # minimal variables first, so the datasets pass min_vars like real submissions
+    names = list(dict.fromkeys(MINIMAL_VARS))[: columns - dup_columns]
+    names += [f"var_{n}" for n in range(len(names), columns - dup_columns)]
+    return names
+
+
+def value_expr(kind: str, i: pl.Expr, seed: int) -> pl.Expr:
+    h = mix(i, seed)
+    if kind == "integer":
+        return (h % 1000).cast(pl.Utf8)
+    if kind == "numeric":
+        return ((h % 100000).cast(pl.Float64) / 100).round(2).cast(pl.Utf8)
+    if kind == "category":
+        return (h % len(CATEGORIES)).replace_strict(
+            dict(enumerate(CATEGORIES)), return_dtype=pl.Utf8
+        )
+    return pl.lit("t") + (h % 50000).cast(pl.Utf8)
+
+
+def generate_dataset(
+    rows: int = 10000,
+    columns: int = 30,
+    blank_ratio: float = 0.01,
+    dup_row_ratio: float = 0.01,
+    dup_column_ratio: float = 0.05,
+    seed: int = 0,
+) -> pl.DataFrame:
+    """
+    Synthetic dataset, all values as text like a csv read without type inference.
+
+    blank_ratio of cells are null, the last dup_row_ratio of rows repeat earlier rows and
+    the last dup_column_ratio of columns copy earlier columns (named <source>_copy).
+    """
+    dup_rows = max(min(int(rows * dup_row_ratio), rows - 1), 0)
+    dup_columns = min(int(columns * dup_column_ratio), columns // 2)
+    names = column_names(columns, dup_columns)
+    blank_threshold = int(blank_ratio * 2**32)
+
+    i = pl.int_range(rows - dup_rows, dtype=pl.UInt64)
+    exprs = []
+    for n, name in enumerate(names):
+        kind = KINDS[n % len(KINDS)]
+        value = value_expr(kind, i, seed * 1000003 + n)
+        blank = mix(i, seed * 1000003 + n + 500009) % 2**32 < blank_threshold
+        exprs.append(pl.when(blank).then(None).otherwise(value).alias(name))
+    df = pl.select(exprs)
+
+    if dup_rows:
+        repeated = pl.int_range(dup_rows) % df.height
+        df = pl.concat([df, df.select(pl.all().gather(repeated))])
+    if dup_columns:
+        df = df.with_columns(
+            pl.col(name).alias(f"{name}_copy") for name in names[:dup_columns]
+        )
+    return df
+
+
+def generate_datadic(
+    dataset: pl.DataFrame, invalid_ratio: float = 0.05
+) -> pl.DataFrame:
+    """
+    Dictionary for a generated dataset: every column plus the minimal variables, with
+    DataType/range/PermittedValues rules. invalid_ratio of rows break naming rules or
+    miss a title, so schema checks have issues to report.
+    """
+    names = list(dict.fromkeys([*dataset.columns, *MINIMAL_VARS]))
+    broken = max(1, int(len(names) * invalid_ratio)) if invalid_ratio else 0
+    # generated columns come first in the dataset, in the order their kinds were cycled
+    kinds = {name: KINDS[n % len(KINDS)] for n, name in enumerate(dataset.columns)}
+    rows = []
+    for n, name in enumerate(names):
+        kind = kinds.get(name.removesuffix("_copy"), "integer")
+        row = {
+            "VariableName": name,
+            "Title": name.replace("_", " "),
+            "Unit_of_Measure": "mm" if kind == "numeric" else None,
+            "Description": f"Generated {kind} variable",
+            "Comments": None,
+            "PermittedValues": ";".join(CATEGORIES) if kind == "category" else None,
+            "DataType": {"integer": "Integer", "numeric": "Numeric"}.get(
+                kind, "String"
+            ),
+            # slightly narrower than generated values so range issues are found
+            "MinimumValue": "0" if kind in ("integer", "numeric") else None,
+            "MaximumValue": {"integer": "990", "numeric": "990"}.get(kind),
+        }
+        if n >= len(names) - broken:
+            # alternate broken naming rules and a missing title
+            row["VariableName"] = ("_" if n % 2 else "bad name ") + name
+            row["Title"] = None if n % 3 == 0 else row["Title"]
+        rows.append(row)
+    return pl.DataFrame(rows, schema={key: pl.Utf8 for key in rows[0]})
+
+
+def write_inputs(
+    out_dir: str, name: str = "bench", formats=("csv", "parquet"), **params
+) -> Dict[str, str]:
+    """
+    Generate a dataset and its dictionary and write them, returns {format: path}
+    plus "datadic" (always csv, like dictionaries users upload).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    dataset = generate_dataset(**params)
+    paths = {}
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        getattr(dataset, f"write_{fmt}")(path)
+        paths[fmt] = path
+    paths["datadic"] = os.path.join(out_dir, f"{name}_datadic.csv")
+    generate_datadic(dataset).write_csv(paths["datadic"])
+    return paths
+
+
+def add_dataset_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=30)
+    parser.add_argument("--blank-ratio", type=float, default=0.01)
+    parser.add_argument("--dup-row-ratio", type=float, default=0.01)
+    parser.add_argument("--dup-column-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def dataset_params(args: argparse.Namespace) -> dict:
+    return {
+        "rows": args.rows,
+        "columns": args.columns,
+        "blank_ratio": args.blank_ratio,
+        "dup_row_ratio": args.dup_row_ratio,
+        "dup_column_ratio": args.dup_column_ratio,
+        "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic dataset and dictionary"
+    )
+    add_dataset_args(parser)
+    parser.add_argument("--out", default="./data/bench")
+    parser.add_argument("--name", default="bench")
+    args = parser.parse_args()
+    for fmt, path in write_inputs(args.out, args.name, **dataset_params(args)).items():
+        print(f"{fmt}: {path}")
@@ -0,0 +1,53 @@
+from typing import Callable, Dict
+
+from validators.base_validator import BaseValidator
+from validators.structure_validator import StructureValidator
+from validators.schema_validator import SchemaValidator
+from validators.conformance_validator import ConformanceValidator
+
+# small enough that the benchmark dataset is checked in several batches
+BATCHED_MEMORY_MB = 8
+
+
+def micro_benchmarks(paths: Dict[str, str]) -> Dict[str, Callable]:
+    """
+    One benchmark per check of every validator, on frames already in memory so only
+    the checks are timed, plus all checks together (and batched) per validator.
+    """
+    dataset = BaseValidator.scan_file(paths["csv"]).collect()
+    datadic = BaseValidator.scan_file(paths["datadic"]).collect()
+
+    def structure(checks="all", **kwargs):
+        return lambda: StructureValidator().validate_frame(
+            dataset, checks, as_rows=True, **kwargs
+        )
+
+    def schema(checks="all"):
+        return lambda: SchemaValidator().validate_frame(datadic, checks, as_rows=True)
+
+    def conformance(checks="all", **kwargs):
+        return lambda: ConformanceValidator().validate_frame(
+            dataset, datadic, checks=checks, as_rows=True, **kwargs
+        )
+
+    benches = {}
+    for check in sorted(StructureValidator.CHECKS):
+        benches[f"structure.{check}"] = structure([check])
+    benches["structure.all"] = structure()
+    benches["structure.all_batched"] = structure(max_memory_mb=BATCHED_MEMORY_MB)
+
+    for check in sorted(SchemaValidator.CHECKS):
+        benches[f"schema.{check}"] = schema([check])
+    benches["schema.all"] = schema()
+
+    for check in ConformanceValidator.ORDER:
+        benches[f"conformance.{check}"] = conformance([check])
+    benches["conformance.all"] = conformance()
+    benches["conformance.all_batched"] = conformance(max_memory_mb=BATCHED_MEMORY_MB)
+
+    # input side: scanning each format the upload routes accept
+    benches["scan.csv"] = lambda: BaseValidator.scan_file(paths["csv"]).collect()
+    benches["scan.parquet"] = lambda: BaseValidator.scan_file(
+        paths["parquet"]
+    ).collect()
+    return benches
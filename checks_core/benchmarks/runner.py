@@ -0,0 +1,150 @@
+import argparse
+import os
+import platform
+import statistics
+import tempfile
+import time
+import orjson
+import polars as pl
+from typing import Callable, Dict
+
+from benchmarks.generate import add_dataset_args, dataset_params, write_inputs
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, "default.json")
+# slower than baseline by more than this ratio is a regression
+DEFAULT_THRESHOLD = 1.3
+# below this absolute difference a ratio is noise, mostly sub-millisecond routes
+NOISE_SECONDS = 0.005
+
+
+def measure(fn: Callable, repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times)}
+
+
+def run_suite(benches: Dict[str, Callable], repeat: int, only: str = "") -> dict:
+    results = {}
+    for name, fn in benches.items():
+        if only and only not in name:
+            continue
+        results[name] = measure(fn, repeat)
+        print(f"{name:<40} {results[name]['median'] * 1000:10.2f} ms", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """
+    Benchmarks slower than their baseline median by more than the threshold ratio.
+    Per benchmark thresholds in baseline["thresholds"] override baseline["threshold"].
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        limit = baseline.get("thresholds", {}).get(
+            name, baseline.get("threshold", DEFAULT_THRESHOLD)
+        )
+        ratio = current["median"] / before["median"] if before["median"] else 1
+        if ratio > limit and current["median"] - before["median"] > NOISE_SECONDS:
+            regressions.append(
+                (name, before["median"], current["median"], ratio, limit)
+            )
+    return regressions
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Run check and endpoint benchmarks, compare with a stored baseline",
+    )
+    parser.add_argument("suite", nargs="?", choices=("micro", "endpoints", "all"))
+    add_dataset_args(parser)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only", default="", help="run benchmarks whose name contains this"
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save", action="store_true", help="store results as the new baseline"
+    )
+    parser.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args(argv)
+    suite = args.suite or "all"
+    params = dataset_params(args)
+
+    with tempfile.TemporaryDirectory(prefix="qc_bench_data_") as data_dir:
+        paths = write_inputs(data_dir, **params)
+        results = {}
+        if suite in ("micro", "all"):
+            from benchmarks.micro import micro_benchmarks
+
+            results.update(run_suite(micro_benchmarks(paths), args.repeat, args.only))
+        if suite in ("endpoints", "all"):
+            from benchmarks.endpoints import endpoint_benchmarks, open_client
+
+            with open_client() as client:
+                benches = endpoint_benchmarks(client, paths)
+                results.update(run_suite(benches, args.repeat, args.only))
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "rb") as f:
+                baseline = orjson.loads(f.read())
+        if baseline.get("params", params) != params:
+            baseline = {}  # other dataset, old results are not comparable
+        baseline.update(
+            params=params,
+            environment=environment(),
+            threshold=args.threshold or baseline.get("threshold", DEFAULT_THRESHOLD),
+            results={**baseline.get("results", {}), **results},
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "wb") as f:
+            f.write(
+                orjson.dumps(
+                    baseline, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+                )
+            )
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save to create it")
+        return 0
+    with open(args.baseline, "rb") as f:
+        baseline = orjson.loads(f.read())
+    if baseline["params"] != params:
+        print(f"baseline was measured with {baseline['params']}, not comparable")
+        return 2
+    if baseline.get("environment") != environment():
+        print(f"warning: baseline environment differs {baseline.get('environment')}")
+    if args.threshold:
+        baseline["threshold"] = args.threshold
+
+    regressions = compare(results, baseline)
+    for name, before, after, ratio, limit in regressions:
+        print(
+            f"REGRESSION {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms "
+            f"({ratio:.2f}x, limit {limit}x)"
+        )
+    if not regressions:
+        print(f"no regressions against {args.baseline}")
+    return 1 if regressions else 0
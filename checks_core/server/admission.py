@@ -0,0 +1,163 @@
+import asyncio
+import os
+import logging
+import psutil
+import polars as pl
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+from dotenv import load_dotenv
+from starlette.datastructures import Headers
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONFIG = {
+    # process memory budget shared by sync requests and running tasks, 0 = no admission control
+    "budget_bytes": int(float(os.getenv("MEMORY_BUDGET_MB", 0)) * 1024**2),
+    # sync requests wait this long for room before 429, queued tasks wait as long as needed
+    "max_wait_seconds": float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", 10)),
+    "retry_after_seconds": 5,
+    "recheck_seconds": 0.5,
+    # estimated memory per body byte: json rows become python dicts, files are scanned by polars
+    "json_factor": float(os.getenv("ADMISSION_JSON_FACTOR", 10)),
+    "file_factor": float(os.getenv("ADMISSION_FILE_FACTOR", 3)),
+    # assumed ratio for gzip/zstd bodies, the decompressed size is not known up front
+    "compression_ratio": float(os.getenv("ADMISSION_COMPRESSION_RATIO", 8)),
+    # duplicate row index and row mask kept for every row, whatever the batch size
+    "row_bytes": 16,
+    # chunked bodies without Content-Length
+    "unknown_length_bytes": 64 * 1024**2,
+}
+
+# routes that only spool the body to disk, their task reserves memory when it runs
+SPOOL_ONLY_PATHS = ("/v1/validate/upload",)
+
+_process = psutil.Process(os.getpid())
+reserved = 0
+# rss with nothing reserved, reservations count on top of it until they show up in rss
+baseline_rss = _process.memory_info().rss
+changed = asyncio.Condition()
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+def current_usage() -> int:
+    return max(_process.memory_info().rss, baseline_rss + reserved)
+
+
+def fits(nbytes: int) -> bool:
+    # nothing in flight: always admit, a request larger than the budget runs alone
+    return reserved == 0 or current_usage() + nbytes <= ADMISSION_CONFIG["budget_bytes"]
+
+
+async def acquire(nbytes: int, wait: Optional[float] = None) -> int:
+    """
+    Reserve nbytes of the budget, waiting up to wait seconds (None = no limit) for room.
+    Returns the amount reserved, pass it to release.
+    """
+    global reserved
+    budget = ADMISSION_CONFIG["budget_bytes"]
+    if not budget or nbytes <= 0:
+        return 0
+    nbytes = min(nbytes, budget)
+
+    loop = asyncio.get_running_loop()
+    deadline = None if wait is None else loop.time() + wait
+    async with changed:
+        # rss also drops without a release (freed buffers), so re-check periodically
+        while not fits(nbytes):
+            timeout = ADMISSION_CONFIG["recheck_seconds"]
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise MemoryBudgetExceeded(
+                        f"Memory budget full ({current_usage() // 1024**2}MB in use, "
+                        f"{nbytes // 1024**2}MB needed of {budget // 1024**2}MB)"
+                    )
+                timeout = min(timeout, remaining)
+            try:
+                await asyncio.wait_for(changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        reserved += nbytes
+    return nbytes
+
+
+async def release(nbytes: int):
+    global reserved, baseline_rss
+    if not nbytes:
+        return
+    async with changed:
+        reserved -= nbytes
+        if reserved == 0:
+            baseline_rss = _process.memory_info().rss
+        changed.notify_all()
+
+
+@asynccontextmanager
+async def reserve(nbytes: int, wait: Optional[float] = None):
+    amount = await acquire(nbytes, wait)
+    try:
+        yield
+    finally:
+        await release(amount)
+
+
+def admission_stats() -> dict:
+    return {
+        "budget_bytes": ADMISSION_CONFIG["budget_bytes"],
+        "reserved_bytes": reserved,
+        "baseline_rss_bytes": baseline_rss,
+        "rss_bytes": _process.memory_info().rss,
+    }
+
+
+def estimate_request(method: str, path: str, headers: Headers) -> int:
+    """
+    Memory a request needs while it runs, from Content-Length and optional X-Row-Count.
+    """
+    if method != "POST" or not path.startswith("/v1/validate"):
+        return 0
+    if path in SPOOL_ONLY_PATHS:
+        return 0
+
+    length = headers.get("content-length")
+    body = int(length) if length else ADMISSION_CONFIG["unknown_length_bytes"]
+    if headers.get("content-encoding", "identity") != "identity":
+        body *= ADMISSION_CONFIG["compression_ratio"]
+    content_type = headers.get("content-type", "")
+    factor = ADMISSION_CONFIG[
+        "json_factor" if content_type.startswith("application/json") else "file_factor"
+    ]
+    rows = headers.get("x-row-count", "")
+    rows = int(rows) if rows.isdigit() else 0
+    return int(body * factor) + rows * ADMISSION_CONFIG["row_bytes"]
+
+
+def estimate_task(
+    dataset_path: Optional[str],
+    datadic_path: Optional[str],
+    max_memory_mb: Optional[int] = None,
+) -> int:
+    """
+    Memory a queued task needs, from its spooled input sizes and row count.
+    With a memory budget the data is checked in batches, so only the row index grows.
+    """
+    rows = 0
+    size = 0
+    for path in (dataset_path, datadic_path):
+        if path and os.path.exists(path):
+            size += os.path.getsize(path)
+    if dataset_path and Path(dataset_path).suffix.lower() in (".parquet", ".pq"):
+        try:
+            # parquet footer only, no data read
+            rows = pl.scan_parquet(dataset_path).select(pl.len()).collect().item()
+        except Exception:
+            logger.exception("[admission] row count failed")
+    row_state = rows * ADMISSION_CONFIG["row_bytes"]
+    if max_memory_mb:
+        return max_memory_mb * 1024**2 + row_state
+    return int(size * ADMISSION_CONFIG["file_factor"]) + row_state
@@ -0,0 +1,208 @@
+import asyncio
+import os
+import json
+import time
+import hashlib
+import logging
+import polars as pl
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+
+from server.results import decompress_issues, split_result
+
+# aliased, store() below writes a result
+from server.store import store as task_store
+from validators import VALIDATOR_VERSION
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG = {
+    "enabled": os.getenv("CACHE_ENABLED", "1") not in ("0", "false", "False", ""),
+    "ttl_seconds": int(os.getenv("CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+    "max_entries": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+    "evict_interval_seconds": 60,
+}
+CHUNK_SIZE = 1024 * 1024  # 1MB
+FRAME_HASH_SEEDS = (11, 23, 37, 53)  # 4 x 64 bit
+
+Source = Union[str, pl.DataFrame, pl.LazyFrame]
+# (check, chunk, n_issues, zlib compressed json list), issues of one cached result
+CacheChunk = Tuple[str, int, int, bytes]
+
+_last_evict = 0.0
+# computations running now, same key awaits the first instead of recomputing
+inflight: Dict[str, asyncio.Future] = {}
+
+
+def fingerprint_file(path: str) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint_frame(df: pl.DataFrame) -> str:
+    """
+    Content hash of dataframe: schema, height and order sensitive row hashes with several seeds.
+    """
+    h = hashlib.blake2b(digest_size=32)
+    h.update(repr(list(df.schema.items())).encode())
+    h.update(str(df.height).encode())
+    if df.width:
+        digests = df.select(
+            pl.struct(pl.all()).hash(seed=s).implode().hash(seed=s + 1).alias(str(s))
+            for s in FRAME_HASH_SEEDS
+        ).row(0)
+        h.update(repr(digests).encode())
+    return h.hexdigest()
+
+
+def fingerprint(source: Union[Source, tuple]) -> Optional[str]:
+    # file path or in-memory frame, lazy plans can't be hashed without running them
+    if isinstance(source, tuple):
+        # checks over several inputs, e.g. dataset against dictionary
+        parts = [fingerprint(s) for s in source]
+        return None if None in parts else ":".join(parts)
+    if isinstance(source, str):
+        return fingerprint_file(source)
+    if isinstance(source, pl.DataFrame):
+        return fingerprint_frame(source)
+    return None
+
+
+def cache_key(kind: str, source_fingerprint: str, params: dict) -> str:
+    """
+    Key = input content + check set/params + validator and polars version.
+    """
+    h = hashlib.blake2b(digest_size=32)
+    h.update(
+        json.dumps(
+            {
+                "kind": kind,
+                "input": source_fingerprint,
+                "params": params,
+                "validator": VALIDATOR_VERSION,
+                "polars": pl.__version__,
+            },
+            sort_keys=True,
+        ).encode()
+    )
+    return h.hexdigest()
+
+
+async def source_cache_key(
+    kind: str, source: Union[Source, tuple], params: dict
+) -> Optional[str]:
+    if not CACHE_CONFIG["enabled"]:
+        return None
+    source_fingerprint = await asyncio.to_thread(fingerprint, source)
+    if source_fingerprint is None:
+        return None
+    return cache_key(kind, source_fingerprint, params)
+
+
+def split_rows(kind: str, rows: list) -> Tuple[list, List[CacheChunk]]:
+    """
+    Summary rows as in task results, and chunks of the issue lists cut from them.
+    """
+    summary, chunks = split_result({kind: rows})
+    # a list shown in full inline needs no chunks
+    truncated = {row["check"] for row in summary[kind] if row["truncated"]}
+    return summary[kind], [
+        (check, chunk, n_issues, blob)
+        for _, check, chunk, n_issues, blob in chunks
+        if check in truncated
+    ]
+
+
+def join_rows(summary: list, chunks: List[CacheChunk]) -> list:
+    """
+    Rows as computed again, split_rows undone. Entries stored whole are returned as is.
+    """
+    issues: Dict[str, list] = {}
+    for check, _, _, blob in sorted(chunks, key=lambda c: (c[0], c[1])):
+        issues.setdefault(check, []).extend(decompress_issues(blob))
+    rows = []
+    for row in summary:
+        row = {**row}
+        row.pop("issue_total", None)
+        if row.pop("truncated", False):
+            row["issue"] = issues.get(row["check"], [])
+        rows.append(row)
+    return rows
+
+
+async def lookup(key: Optional[str]) -> Optional[Any]:
+    if key is None:
+        return None
+    try:
+        hit = await task_store.get_cached_result(key, CACHE_CONFIG["ttl_seconds"])
+    except Exception:
+        logger.exception("[cache] lookup failed")
+        return None
+    if hit is None:
+        return None
+    return await asyncio.to_thread(join_rows, *hit)
+
+
+async def store(key: Optional[str], kind: str, result: Any):
+    global _last_evict
+    if key is None:
+        return
+    try:
+        summary, chunks = await asyncio.to_thread(split_rows, kind, result)
+        await task_store.store_cached_result(key, kind, summary, chunks)
+        # TTL + LRU eviction, at most once per interval
+        now = time.monotonic()
+        if now - _last_evict > CACHE_CONFIG["evict_interval_seconds"]:
+            _last_evict = now
+            await task_store.evict_cache(
+                CACHE_CONFIG["ttl_seconds"], CACHE_CONFIG["max_entries"]
+            )
+    except Exception:
+        logger.exception("[cache] store failed")
+
+
+async def cached_result(
+    kind: str,
+    source: Union[Source, tuple],
+    params: dict,
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Return cached result for source + params, else compute and store it.
+
+    Cache errors never fail the validation, they only cost a recompute.
+    """
+    key = await source_cache_key(kind, source, params)
+    hit = await lookup(key)
+    if hit is not None:
+        logger.info(f"[cache] hit | kind={kind}")
+        return hit
+    if key is None:
+        return await compute()
+
+    # e.g. a batch: many tasks sharing one dictionary validate it once
+    if key in inflight:
+        logger.info(f"[cache] joined running | kind={kind}")
+        return await asyncio.shield(inflight[key])
+
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    try:
+        result = await compute()
+        future.set_result(result)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # retrieved, no warning when nobody joined
+        raise
+    finally:
+        del inflight[key]
+
+    await store(key, kind, result)
+    return result
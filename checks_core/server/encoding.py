@@ -0,0 +1,108 @@
+import os
+import zlib
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # python 3.14+
+    from compression import zstd
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+ENCODING_CONFIG = {
+    # decompressed request body cap, guards against compression bombs. 0 = no limit
+    "max_body_bytes": int(float(os.getenv("REQUEST_MAX_BODY_MB", 0)) * 1024**2),
+}
+
+
+def decompressor(encoding: str):
+    """
+    Incremental decompressor for a Content-Encoding, None when unsupported.
+    """
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    if encoding == "zstd":
+        if zstd is not None:
+            return zstd.ZstdDecompressor()
+        if zstandard is not None:
+            return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+def supported_encodings() -> list:
+    encodings = ["gzip", "deflate"]
+    if zstd is not None or zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+class DecompressionMiddleware:
+    """
+    Decode Content-Encoding request bodies chunk by chunk as the app reads them,
+    the whole decompressed body is never buffered here. Routes see a plain body.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = None
+        headers = []
+        for name, value in scope["headers"]:
+            if name == b"content-encoding":
+                encoding = value.decode("latin-1").strip().lower()
+            elif name != b"content-length":
+                headers.append((name, value))
+        if encoding in (None, "", "identity"):
+            return await self.app(scope, receive, send)
+
+        decoder = decompressor(encoding)
+        if decoder is None:
+            response = PlainTextResponse(
+                f"Unsupported Content-Encoding '{encoding}', "
+                f"use {', '.join(supported_encodings())}",
+                status_code=415,
+                headers={"Accept-Encoding": ", ".join(supported_encodings())},
+            )
+            return await response(scope, receive, send)
+
+        # body length changes, routes must read until more_body is False
+        scope = {**scope, "headers": headers}
+        max_bytes = ENCODING_CONFIG["max_body_bytes"]
+        decoded = 0
+
+        # errors surface as HTTPException while the route reads its body
+        async def decoded_receive() -> Message:
+            nonlocal decoded
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            last = not message.get("more_body", False)
+            try:
+                body = decoder.decompress(message.get("body", b""))
+                if last and hasattr(decoder, "flush"):
+                    body += decoder.flush()
+            except Exception as e:
+                raise HTTPException(400, f"Invalid {encoding} body: {e}")
+            if last and getattr(decoder, "eof", True) is False:
+                raise HTTPException(400, f"Truncated {encoding} body")
+            decoded += len(body)
+            if max_bytes and decoded > max_bytes:
+                raise HTTPException(
+                    413, f"Decompressed body larger than {max_bytes} bytes"
+                )
+            return {**message, "body": body}
+
+        await self.app(scope, decoded_receive, send)
@@ -1,6 +1,8 @@
+import orjson
 import polars as pl
-import tempfile
 from typing import List, Dict, Any
+from pydantic import BaseModel
+from starlette.responses import Response
 
 
 def _format_bytes(num_bytes: float) -> str:
@@ -21,12 +23,31 @@ def json_rows_to_df(rows: List[Dict[str, Any]]) -> pl.DataFrame:
     return pl.DataFrame(rows)
 
 
-def df_to_temp_csv(df: pl.DataFrame) -> str:
+def _json_default(obj: Any) -> Any:
+    # unvalidated response models (model_construct), fields only, values go to orjson as is
+    if isinstance(obj, BaseModel):
+        return dict(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
     """
-    Write polars dataframe to temporary CSV file and return its path. Caller is responsible for deleting file.
+    Serialize to json bytes with orjson, stored json can be embedded with orjson.Fragment.
     """
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-    tmp.close()
-    df.write_csv(tmp.name)
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def loads(data: str | bytes) -> Any:
+    return orjson.loads(data)
+
+
+class OrjsonResponse(Response):
+    """
+    Result rows are plain dicts and lists, orjson writes them in one pass.
+    Returned directly so FastAPI skips jsonable_encoder and response model validation.
+    """
+
+    media_type = "application/json"
 
-    return tmp.name
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
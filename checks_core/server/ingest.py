@@ -0,0 +1,179 @@
+import os
+import asyncio
+import tempfile
+import orjson
+import polars as pl
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+
+from server.helper import json_rows_to_df
+
+load_dotenv()
+
+# upload formats the validators can scan directly from disk
+# arrow bytes are spooled as sent and memory mapped or read by polars, never re-encoded
+UPLOAD_SUFFIXES = {
+    ".csv": ".csv",
+    ".parquet": ".parquet",
+    ".pq": ".parquet",
+    ".arrow": ".arrow",
+    ".arrows": ".arrows",
+    ".feather": ".arrow",
+    ".ipc": ".arrow",
+    ".ndjson": ".ndjson",
+    ".jsonl": ".ndjson",
+}
+UPLOAD_CONTENT_TYPES = {
+    "text/csv": ".csv",
+    "application/csv": ".csv",
+    "application/vnd.apache.parquet": ".parquet",
+    "application/x-parquet": ".parquet",
+    "application/vnd.apache.arrow.stream": ".arrows",
+    "application/vnd.apache.arrow.file": ".arrow",
+    "application/x-ndjson": ".ndjson",
+    "application/ndjson": ".ndjson",
+    "application/jsonl": ".ndjson",
+}
+CHUNK_SIZE = 1024 * 1024  # 1MB
+# ndjson rows parsed per batch while the upload streams in, bounds ingestion memory
+NDJSON_BATCH_ROWS = int(os.getenv("NDJSON_BATCH_ROWS", 50000))
+
+
+def upload_suffix(upload: UploadFile) -> str:
+    """
+    Pick file suffix for an upload from its filename, fall back to content type.
+    """
+    suffix = Path(upload.filename or "").suffix.lower()
+    if suffix in UPLOAD_SUFFIXES:
+        return UPLOAD_SUFFIXES[suffix]
+
+    content_type = (upload.content_type or "").split(";")[0].strip().lower()
+    if content_type in UPLOAD_CONTENT_TYPES:
+        return UPLOAD_CONTENT_TYPES[content_type]
+
+    raise HTTPException(
+        status_code=415,
+        detail=f"Unsupported upload '{upload.filename}'. Use .csv, .parquet, .arrow or .ndjson",
+    )
+
+
+async def spool_upload(upload: UploadFile, dir: Optional[str] = None) -> str:
+    """
+    Copy upload to temporary file in chunks and return its path. Caller is responsible for deleting file.
+    """
+    suffix = upload_suffix(upload)
+    if suffix == ".ndjson":
+        return await spool_ndjson(upload, dir)
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=dir)
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            tmp.write(chunk)
+    except Exception:
+        tmp.close()
+        remove_files(tmp.name)
+        raise
+    finally:
+        tmp.close()
+        await upload.close()
+
+    return tmp.name
+
+
+async def spool_ndjson(upload: UploadFile, dir: Optional[str] = None) -> str:
+    """
+    Convert ndjson upload (one row object per line) to temporary parquet file and return its path.
+
+    Lines are checked NDJSON_BATCH_ROWS at a time as the upload streams in, only their keys are kept,
+    then polars reads every key as text, like csv uploads. Caller is responsible for deleting file.
+    """
+    raw = tempfile.NamedTemporaryFile(delete=False, suffix=".ndjson", dir=dir)
+    columns = {}  # every key seen, in order of first appearance
+    batch, line_no = [], 0
+    tail = b""
+    try:
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop() if chunk else b""
+            line_no += len(lines)
+            # blank lines dropped, polars rejects whitespace only lines
+            batch.extend(line for line in lines if line.strip())
+            if len(batch) >= NDJSON_BATCH_ROWS or (not chunk and batch):
+                names = await asyncio.to_thread(ndjson_columns, batch, line_no)
+                columns.update(dict.fromkeys(names))
+                raw.write(b"\n".join(batch) + b"\n")
+                batch = []
+            if not chunk:
+                break
+        raw.close()
+
+        out = tempfile.NamedTemporaryFile(delete=False, suffix=".parquet", dir=dir)
+        out.close()
+        try:
+            await asyncio.to_thread(
+                ndjson_to_parquet, raw.name, out.name, list(columns)
+            )
+        except Exception:
+            remove_files(out.name)
+            raise
+    finally:
+        raw.close()
+        await upload.close()
+        remove_files(raw.name)
+
+    return out.name
+
+
+# key union of every line, no dtype inference: keys may first appear or change type anywhere
+def ndjson_columns(lines: List[bytes], line_no: int) -> List[str]:
+    columns = {}
+    for line in lines:
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid NDJSON before line {line_no + 1}: {e}",
+            )
+        if not isinstance(row, dict):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid NDJSON before line {line_no + 1}: each line must be an object",
+            )
+        columns.update(dict.fromkeys(row))
+    return list(columns)
+
+
+def ndjson_to_parquet(src: str, dst: str, columns: List[str]) -> None:
+    if not columns:
+        pl.DataFrame().write_parquet(dst)
+        return
+    # streaming rewrite, string schema so no dtype is inferred from the first rows
+    pl.scan_ndjson(src, schema={c: pl.String for c in columns}).sink_parquet(dst)
+
+
+def spool_rows(rows: List[Dict[str, Any]], dir: Optional[str] = None) -> str:
+    """
+    Write json rows to temporary parquet file and return its path. Caller is responsible for deleting file.
+    """
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".parquet", dir=dir)
+    tmp.close()
+    try:
+        json_rows_to_df(rows).write_parquet(tmp.name)
+    except Exception:
+        remove_files(tmp.name)
+        raise
+
+    return tmp.name
+
+
+def remove_files(*paths: str | None) -> None:
+    for path in paths:
+        if not path:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
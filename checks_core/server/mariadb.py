@@ -1,10 +1,15 @@
 import asyncio
+import random
 import os
-import json
 import aiomysql
+from pymysql.constants import CLIENT
 from typing import Optional
 from dotenv import load_dotenv
 
+from server.helper import dumps, loads
+from server.notify import task_changed
+from server.store import TaskStore, result_json
+
 load_dotenv()
 
 DB_CONFIG = {
@@ -15,87 +20,575 @@ DB_CONFIG = {
     "db": os.getenv("DB_NAME"),
 }
 
-pool: Optional[aiomysql.Pool] = None
 
+class MariaDBTaskStore(TaskStore):
+    """
+    Shared by every server instance, the queue uses row locks so workers never collide.
+    """
 
-# setup global pool
-async def init_db_pool():
-    global pool
-    if pool is None:
-        pool = await aiomysql.create_pool(
-            **DB_CONFIG,
-            minsize=1,
-            maxsize=int(os.getenv("DB_POOL_MAXSIZE", 20)),
-            autocommit=False,  # enable RLS, handle in update_task
-        )
+    def __init__(self):
+        self.pool: Optional[aiomysql.Pool] = None
 
+    # setup pool
+    async def open(self):
+        if self.pool is None:
+            self.pool = await aiomysql.create_pool(
+                **DB_CONFIG,
+                minsize=1,
+                maxsize=int(os.getenv("DB_POOL_MAXSIZE", 20)),
+                autocommit=False,  # enable RLS, handle in update_tasks
+                client_flag=CLIENT.FOUND_ROWS,  # rowcount = matched rows, for lease checks
+            )
 
-async def close_db_pool():
-    global pool
-    if pool:
-        pool.close()
-        await pool.wait_closed()
+    async def close(self):
+        if self.pool:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
 
+    # insert several tasks in one transaction, a batch becomes visible to workers all at once
+    async def create_tasks(self, tasks: list, batch_id: Optional[str] = None):
+        async with self.pool.acquire() as conn:
+            try:
+                async with conn.cursor() as cur:
+                    await cur.executemany(
+                        """
+                        INSERT INTO validation_tasks
+                            (id, status, dataset_path, datadic_path, options_json,
+                             result_json, batch_id, batch_index)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        """,
+                        [
+                            (
+                                task["id"],
+                                task.get("status", "PENDING"),
+                                task.get("dataset_path"),
+                                task.get("datadic_path"),
+                                dumps(task["options"]).decode()
+                                if task.get("options")
+                                else None,
+                                dumps(task["result"]).decode()
+                                if task.get("result")
+                                else None,
+                                batch_id,
+                                n if batch_id else None,
+                            )
+                            for n, task in enumerate(tasks)
+                        ],
+                    )
+                    await self.insert_issues(cur, tasks)
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
 
-async def create_task(task_id: str):
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                "INSERT INTO validation_tasks (id, status) VALUES (%s, %s)",
-                (task_id, "PENDING"),
+    # issue chunks: (kind, check, chunk, n_issues, compressed issues), replaced on every write
+    async def insert_issues(self, cur, tasks: list):
+        replaced = [task["id"] for task in tasks if task.get("issues") is not None]
+        if not replaced:
+            return
+        placeholders = ", ".join(["%s"] * len(replaced))
+        await cur.execute(
+            f"DELETE FROM validation_issues WHERE task_id IN ({placeholders})", replaced
+        )
+        chunks = [
+            (task["id"], *chunk) for task in tasks for chunk in task.get("issues") or ()
+        ]
+        if chunks:
+            await cur.executemany(
+                """
+                INSERT INTO validation_issues
+                    (task_id, kind, check_name, chunk, n_issues, issues)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """,
+                chunks,
             )
-        await conn.commit()
 
+    async def update_tasks(self, updates: list, retries: int = 3) -> list:
+        for attempt in range(retries):
+            lost = []
+            try:
+                async with self.pool.acquire() as conn:
+                    try:
+                        async with conn.cursor() as cur:
+                            for update in updates:
+                                owner = update.get("lease_owner")
+                                # found rows, not changed rows: a rewrite of the same values counts
+                                await cur.execute(
+                                    """
+                                    UPDATE validation_tasks
+                                    SET status=%s, result_json=%s, error=%s,
+                                        lease_owner=IF(%s IN ('DONE', 'ERROR'), NULL, lease_owner),
+                                        lease_expires_at=IF(%s IN ('DONE', 'ERROR'), NULL, lease_expires_at)
+                                    WHERE id=%s AND (%s IS NULL OR lease_owner=%s
+                                        OR (lease_owner IS NULL AND status=%s))
+                                    """,
+                                    (
+                                        update["status"],
+                                        result_json(update),
+                                        update.get("error"),
+                                        update["status"],
+                                        update["status"],
+                                        update["id"],
+                                        owner,
+                                        owner,
+                                        update["status"],
+                                    ),
+                                )
+                                if cur.rowcount == 0:
+                                    lost.append(update["id"])
+                            await self.insert_issues(
+                                cur, [u for u in updates if u["id"] not in lost]
+                            )
+                        await conn.commit()
+                    except Exception:
+                        await conn.rollback()
+                        raise
+                break
+            except aiomysql.OperationalError as e:
+                # 1020: row changed by another transaction, back off before retrying
+                if e.args[0] == 1020 and attempt < retries - 1:
+                    await asyncio.sleep(0.05 * 2**attempt * (1 + random.random()))
+                    continue
+                raise
+        for update in updates:
+            task_changed(update["id"])
+        return lost
+
+    async def get_task(self, task_id: str):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(
+                    "SELECT * FROM validation_tasks WHERE id=%s",
+                    (task_id,),
+                )
+                task = await cur.fetchone()
+            # ends the read transaction, else the pool closes the connection on release
+            await conn.commit()
+        return task
+
+    async def get_batch_tasks(self, batch_id: str) -> list:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(
+                    """
+                    SELECT id, status, error FROM validation_tasks
+                    WHERE batch_id=%s ORDER BY batch_index
+                    """,
+                    (batch_id,),
+                )
+                rows = await cur.fetchall()
+            await conn.commit()
+        return list(rows)
+
+    # shared batch dictionary is deleted only once no unfinished task reads it
+    async def datadic_in_use(self, datadic_path: str) -> bool:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    SELECT 1 FROM validation_tasks
+                    WHERE status IN ('PENDING', 'RUNNING') AND datadic_path=%s
+                    LIMIT 1
+                    """,
+                    (datadic_path,),
+                )
+                row = await cur.fetchone()
+            await conn.commit()
+        return row is not None
+
+    # issue paging: chunk sizes first (no blobs), then only the chunks a page needs
+    async def get_issue_chunk_sizes(
+        self, task_id: str, check: str, kind: Optional[str] = None
+    ):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    SELECT kind, chunk, n_issues FROM validation_issues
+                    WHERE task_id=%s AND check_name=%s AND (%s IS NULL OR kind=%s)
+                    ORDER BY kind, chunk
+                    """,
+                    (task_id, check, kind, kind),
+                )
+                rows = await cur.fetchall()
+            await conn.commit()
+        return rows
+
+    async def get_issue_chunks(self, task_id: str, check: str, kind: str, chunks: list):
+        if not chunks:
+            return []
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    f"""
+                    SELECT issues FROM validation_issues
+                    WHERE task_id=%s AND check_name=%s AND kind=%s
+                        AND chunk IN ({", ".join(["%s"] * len(chunks))})
+                    ORDER BY chunk
+                    """,
+                    (task_id, check, kind, *chunks),
+                )
+                rows = await cur.fetchall()
+            await conn.commit()
+        return [row[0] for row in rows]
+
+    # queue: claim oldest pending (or lease expired) task, locked rows are skipped so workers never collide
+    async def claim_task(self, worker_id: str, lease_seconds: int, max_attempts: int):
+        async with self.pool.acquire() as conn:
+            try:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    await cur.execute(
+                        """
+                        SELECT id, dataset_path, datadic_path, options_json, result_json, attempts
+                        FROM validation_tasks
+                        WHERE status='PENDING'
+                            OR (status='RUNNING' AND lease_expires_at < NOW())
+                        ORDER BY created_at
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                        """
+                    )
+                    task = await cur.fetchone()
+                    if task is None:
+                        await conn.commit()
+                        return None
+
+                    # crashed too many times, give up on it
+                    if task["attempts"] >= max_attempts:
+                        await cur.execute(
+                            """
+                            UPDATE validation_tasks
+                            SET status='ERROR', result_json=NULL, error=%s,
+                                lease_owner=NULL, lease_expires_at=NULL
+                            WHERE id=%s
+                            """,
+                            (
+                                f"Task abandoned after {task['attempts']} attempts",
+                                task["id"],
+                            ),
+                        )
+                        await conn.commit()
+                        task_changed(task["id"])
+                        task["status"] = "ERROR"
+                        return task
 
-async def update_task(task_id, status, result=None, error=None, retries=3):
-    for attempt in range(retries):
-        try:
-            async with pool.acquire() as conn:
-                async with conn.cursor() as cur:
                     await cur.execute(
                         """
                         UPDATE validation_tasks
-                        SET status=%s, result_json=%s, error=%s
+                        SET status='RUNNING', attempts=attempts+1, lease_owner=%s,
+                            lease_expires_at=NOW() + INTERVAL %s SECOND,
+                            heartbeat_at=NOW()
                         WHERE id=%s
                         """,
-                        (
-                            status,
-                            json.dumps(result) if result else None,
-                            error,
-                            task_id,
-                        ),
+                        (worker_id, lease_seconds, task["id"]),
                     )
+                    await conn.commit()
+                    task_changed(task["id"])
+                    task["status"] = "RUNNING"
+                    task["attempts"] += 1
+                    return task
+            except Exception:
+                await conn.rollback()
+                raise
+
+    # extend lease while task is running, False if task was taken over
+    async def heartbeat_task(
+        self, task_id: str, worker_id: str, lease_seconds: int
+    ) -> bool:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    UPDATE validation_tasks
+                    SET lease_expires_at=NOW() + INTERVAL %s SECOND, heartbeat_at=NOW()
+                    WHERE id=%s AND status='RUNNING' AND lease_owner=%s
+                    """,
+                    (lease_seconds, task_id, worker_id),
+                )
+                updated = cur.rowcount
+            await conn.commit()
+        return updated > 0
+
+    # graceful shutdown: hand running tasks back to the queue without burning an attempt
+    async def release_tasks(self, worker_id: str):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    UPDATE validation_tasks
+                    SET status='PENDING', attempts=GREATEST(attempts - 1, 0),
+                        lease_owner=NULL, lease_expires_at=NULL
+                    WHERE status='RUNNING' AND lease_owner=%s
+                    """,
+                    (worker_id,),
+                )
+            await conn.commit()
+
+    async def count_pending_tasks(self) -> int:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "SELECT COUNT(*) FROM validation_tasks WHERE status='PENDING'"
+                )
+                (count,) = await cur.fetchone()
+            await conn.commit()
+        return count
+
+    # metrics: queue depth and how long the oldest pending task has waited
+    async def queue_stats(self) -> dict:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    SELECT COUNT(*), TIMESTAMPDIFF(SECOND, MIN(created_at), NOW())
+                    FROM validation_tasks WHERE status='PENDING'
+                    """
+                )
+                pending, oldest = await cur.fetchone()
+            await conn.commit()
+        return {"pending": pending, "oldest_pending_seconds": oldest or 0}
+
+    def pool_stats(self) -> dict:
+        if self.pool is None:
+            return super().pool_stats()
+        return {
+            "used": self.pool.size - self.pool.freesize,
+            "idle": self.pool.freesize,
+            "max": self.pool.maxsize,
+        }
+
+    # retention: one batch of finished tasks older than retention, with their issue chunks
+    async def purge_tasks(self, retention_seconds: int, batch_size: int) -> int:
+        async with self.pool.acquire() as conn:
+            try:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        """
+                        SELECT id FROM validation_tasks
+                        WHERE status IN ('DONE', 'ERROR')
+                            AND updated_at < NOW() - INTERVAL %s SECOND
+                        ORDER BY updated_at
+                        LIMIT %s
+                        """,
+                        (retention_seconds, batch_size),
+                    )
+                    ids = [row[0] for row in await cur.fetchall()]
+                    if ids:
+                        marks = ", ".join(["%s"] * len(ids))
+                        await cur.execute(
+                            f"DELETE FROM validation_issues WHERE task_id IN ({marks})",
+                            ids,
+                        )
+                        await cur.execute(
+                            f"DELETE FROM validation_tasks WHERE id IN ({marks})", ids
+                        )
                 await conn.commit()
-            return
-        except aiomysql.OperationalError as e:
-            if e.args[0] == 1020 and attempt < retries - 1:
-                await asyncio.sleep(0.1)  # backoff
-                continue
-            raise
-
-
-async def get_task(task_id: str):
-    async with pool.acquire() as conn:
-        async with conn.cursor(aiomysql.DictCursor) as cur:
-            await cur.execute(
-                "SELECT * FROM validation_tasks WHERE id=%s",
-                (task_id,),
-            )
-            return await cur.fetchone()
-
-
-# create single export table if dne
-async def create_table():
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute("""
-            CREATE TABLE IF NOT EXISTS validation_tasks (
-                id VARCHAR(36) PRIMARY KEY,
-                status VARCHAR(20) NOT NULL,
-                result_json JSON DEFAULT NULL,
-                error TEXT DEFAULT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            );
-            """)
-        await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        return len(ids)
+
+    # admin: size on disk (approximate, from table statistics) and task counts
+    async def get_table_stats(self) -> list:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(
+                    """
+                    SELECT table_name AS `table`, table_rows AS `rows`,
+                        data_length AS data_bytes, index_length AS index_bytes
+                    FROM information_schema.tables
+                    WHERE table_schema = DATABASE()
+                        AND table_name IN ('validation_tasks', 'validation_issues',
+                            'validation_cache', 'validation_cache_issues')
+                    ORDER BY table_name
+                    """
+                )
+                rows = await cur.fetchall()
+            await conn.commit()
+        return list(rows)
+
+    async def count_tasks_by_status(self) -> dict:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "SELECT status, COUNT(*) FROM validation_tasks GROUP BY status"
+                )
+                rows = await cur.fetchall()
+            await conn.commit()
+        return {status: count for status, count in rows}
+
+    # result cache, hit refreshes last_hit_at for LRU eviction
+    async def get_cached_result(self, cache_key: str, ttl_seconds: int):
+        chunks = ()
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    SELECT result_json FROM validation_cache
+                    WHERE cache_key=%s AND created_at > NOW() - INTERVAL %s SECOND
+                    """,
+                    (cache_key, ttl_seconds),
+                )
+                row = await cur.fetchone()
+                if row is not None:
+                    await cur.execute(
+                        """
+                        SELECT check_name, chunk, n_issues, issues
+                        FROM validation_cache_issues WHERE cache_key=%s
+                        """,
+                        (cache_key,),
+                    )
+                    chunks = await cur.fetchall()
+                    await cur.execute(
+                        """
+                        UPDATE validation_cache SET hits=hits+1, last_hit_at=NOW()
+                        WHERE cache_key=%s
+                        """,
+                        (cache_key,),
+                    )
+            await conn.commit()
+        return (loads(row[0]), [tuple(chunk) for chunk in chunks]) if row else None
+
+    async def store_cached_result(
+        self, cache_key: str, kind: str, summary, chunks: list
+    ):
+        async with self.pool.acquire() as conn:
+            try:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        """
+                        INSERT INTO validation_cache (cache_key, kind, result_json)
+                        VALUES (%s, %s, %s)
+                        ON DUPLICATE KEY UPDATE result_json=VALUES(result_json),
+                            created_at=NOW(), last_hit_at=NOW()
+                        """,
+                        (cache_key, kind, dumps(summary).decode()),
+                    )
+                    await cur.execute(
+                        "DELETE FROM validation_cache_issues WHERE cache_key=%s",
+                        (cache_key,),
+                    )
+                    if chunks:
+                        await cur.executemany(
+                            """
+                            INSERT INTO validation_cache_issues
+                                (cache_key, check_name, chunk, n_issues, issues)
+                            VALUES (%s, %s, %s, %s, %s)
+                            """,
+                            [(cache_key, *chunk) for chunk in chunks],
+                        )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+    # drop expired entries, then least recently used ones above max_entries
+    async def evict_cache(self, ttl_seconds: int, max_entries: int) -> int:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "DELETE FROM validation_cache WHERE created_at < NOW() - INTERVAL %s SECOND",
+                    (ttl_seconds,),
+                )
+                deleted = cur.rowcount
+                await cur.execute("SELECT COUNT(*) FROM validation_cache")
+                (count,) = await cur.fetchone()
+                if count > max_entries:
+                    await cur.execute(
+                        "DELETE FROM validation_cache ORDER BY last_hit_at LIMIT %s",
+                        (count - max_entries,),
+                    )
+                    deleted += cur.rowcount
+                if deleted:
+                    await cur.execute(
+                        """
+                        DELETE i FROM validation_cache_issues i
+                        LEFT JOIN validation_cache c ON c.cache_key = i.cache_key
+                        WHERE c.cache_key IS NULL
+                        """
+                    )
+            await conn.commit()
+        return deleted
+
+    # create single export table if dne
+    async def create_table(self):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                CREATE TABLE IF NOT EXISTS validation_tasks (
+                    id VARCHAR(36) PRIMARY KEY,
+                    status VARCHAR(20) NOT NULL,
+                    result_json JSON DEFAULT NULL,
+                    error TEXT DEFAULT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                );
+                """)
+                # queue columns, also added to tables created before the queue existed
+                await cur.execute("""
+                ALTER TABLE validation_tasks
+                    ADD COLUMN IF NOT EXISTS dataset_path VARCHAR(1024) DEFAULT NULL,
+                    ADD COLUMN IF NOT EXISTS datadic_path VARCHAR(1024) DEFAULT NULL,
+                    ADD COLUMN IF NOT EXISTS options_json JSON DEFAULT NULL,
+                    ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0,
+                    ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(255) DEFAULT NULL,
+                    ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP NULL DEFAULT NULL,
+                    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP NULL DEFAULT NULL,
+                    ADD COLUMN IF NOT EXISTS batch_id VARCHAR(36) DEFAULT NULL,
+                    ADD COLUMN IF NOT EXISTS batch_index INT DEFAULT NULL;
+                """)
+                await cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_validation_tasks_queue
+                    ON validation_tasks (status, created_at);
+                """)
+                # retention purge scans finished tasks by finish time
+                await cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_validation_tasks_finished
+                    ON validation_tasks (status, updated_at);
+                """)
+                await cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_validation_tasks_batch
+                    ON validation_tasks (batch_id, batch_index);
+                """)
+                await cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_validation_tasks_created
+                    ON validation_tasks (created_at);
+                """)
+                # full issue lists, task result_json keeps counts and first issues only
+                await cur.execute("""
+                CREATE TABLE IF NOT EXISTS validation_issues (
+                    task_id VARCHAR(36) NOT NULL,
+                    kind VARCHAR(20) NOT NULL,
+                    check_name VARCHAR(64) NOT NULL,
+                    chunk INT NOT NULL,
+                    n_issues INT NOT NULL,
+                    issues LONGBLOB NOT NULL,
+                    PRIMARY KEY (task_id, check_name, kind, chunk)
+                );
+                """)
+                # content addressed results, structure and schema stored separately
+                await cur.execute("""
+                CREATE TABLE IF NOT EXISTS validation_cache (
+                    cache_key CHAR(64) PRIMARY KEY,
+                    kind VARCHAR(20) NOT NULL,
+                    result_json JSON NOT NULL,
+                    hits INT NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_hit_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_validation_cache_created (created_at),
+                    INDEX idx_validation_cache_last_hit (last_hit_at)
+                );
+                """)
+                # issue lists of cached results, result_json keeps the summary rows
+                await cur.execute("""
+                CREATE TABLE IF NOT EXISTS validation_cache_issues (
+                    cache_key CHAR(64) NOT NULL,
+                    check_name VARCHAR(64) NOT NULL,
+                    chunk INT NOT NULL,
+                    n_issues INT NOT NULL,
+                    issues LONGBLOB NOT NULL,
+                    PRIMARY KEY (cache_key, check_name, chunk)
+                );
+                """)
+            await conn.commit()
@@ -0,0 +1,258 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from server.helper import dumps, loads
+from server.notify import task_changed
+from server.store import STORE_CONFIG, TaskStore, result_json
+
+FINAL_STATUSES = ("DONE", "ERROR")
+
+
+class MemoryTaskStore(TaskStore):
+    """
+    Everything in dicts of this process: no round trips, nothing survives a restart.
+
+    For a single server, local runs and benchmarks. Finished tasks beyond
+    TASK_STORE_MAX_TASKS are dropped least recently read first, unfinished ones are kept.
+    """
+
+    def __init__(self, max_tasks: Optional[int] = None):
+        self.max_tasks = max_tasks or STORE_CONFIG["memory_max_tasks"]
+        self.tasks = OrderedDict()  # id -> row, least recently used first
+        self.issues = {}  # task_id -> {(check, kind, chunk): (n_issues, blob)}
+        # cache_key -> (summary json, issue chunks, created_at)
+        self.cache = OrderedDict()
+
+    async def create_tasks(self, tasks: list, batch_id: Optional[str] = None):
+        now = time.time()
+        for n, task in enumerate(tasks):
+            self.tasks[task["id"]] = {
+                "id": task["id"],
+                "status": task.get("status", "PENDING"),
+                "result_json": dumps(task["result"]).decode()
+                if task.get("result")
+                else None,
+                "error": None,
+                "dataset_path": task.get("dataset_path"),
+                "datadic_path": task.get("datadic_path"),
+                "options_json": dumps(task["options"]).decode()
+                if task.get("options")
+                else None,
+                "attempts": 0,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "batch_id": batch_id,
+                "batch_index": n if batch_id else None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            self.insert_issues(task["id"], task.get("issues"))
+        self.evict_tasks()
+
+    def insert_issues(self, task_id: str, issues: Optional[list]):
+        if issues is None:
+            return
+        self.issues[task_id] = {
+            (check, kind, chunk): (n_issues, blob)
+            for kind, check, chunk, n_issues, blob in issues
+        }
+
+    def evict_tasks(self):
+        excess = len(self.tasks) - self.max_tasks
+        if excess <= 0:
+            return
+        finished = [
+            task_id
+            for task_id, task in self.tasks.items()
+            if task["status"] in FINAL_STATUSES
+        ]
+        for task_id in finished[:excess]:
+            del self.tasks[task_id]
+            self.issues.pop(task_id, None)
+
+    async def update_tasks(self, updates: list) -> list:
+        now = time.time()
+        lost = []
+        for update in updates:
+            task = self.tasks.get(update["id"])
+            owner = update.get("lease_owner")
+            if task is None or (
+                owner is not None
+                and task["lease_owner"] != owner
+                and (
+                    task["lease_owner"] is not None
+                    or task["status"] != update["status"]
+                )
+            ):
+                lost.append(update["id"])
+                continue
+            task.update(
+                status=update["status"],
+                result_json=result_json(update),
+                error=update.get("error"),
+                updated_at=now,
+            )
+            if update["status"] in FINAL_STATUSES:
+                task.update(lease_owner=None, lease_expires_at=None)
+            self.insert_issues(update["id"], update.get("issues"))
+            task_changed(update["id"])
+        return lost
+
+    async def get_task(self, task_id: str):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        self.tasks.move_to_end(task_id)
+        return dict(task)
+
+    async def get_batch_tasks(self, batch_id: str) -> list:
+        rows = [t for t in self.tasks.values() if t["batch_id"] == batch_id]
+        return [
+            {"id": t["id"], "status": t["status"], "error": t["error"]}
+            for t in sorted(rows, key=lambda t: t["batch_index"])
+        ]
+
+    async def datadic_in_use(self, datadic_path: str) -> bool:
+        return any(
+            t["status"] in ("PENDING", "RUNNING") and t["datadic_path"] == datadic_path
+            for t in self.tasks.values()
+        )
+
+    async def get_issue_chunk_sizes(
+        self, task_id: str, check: str, kind: Optional[str] = None
+    ):
+        return sorted(
+            (chunk_kind, chunk, n_issues)
+            for (chunk_check, chunk_kind, chunk), (n_issues, _) in self.issues.get(
+                task_id, {}
+            ).items()
+            if chunk_check == check and kind in (None, chunk_kind)
+        )
+
+    async def get_issue_chunks(self, task_id: str, check: str, kind: str, chunks: list):
+        stored = self.issues.get(task_id, {})
+        return [stored[(check, kind, chunk)][1] for chunk in sorted(chunks)]
+
+    async def claim_task(self, worker_id: str, lease_seconds: int, max_attempts: int):
+        now = time.time()
+        # insertion order is reordered by reads, so pick by creation time
+        candidates = [
+            t
+            for t in self.tasks.values()
+            if t["status"] == "PENDING"
+            or (t["status"] == "RUNNING" and t["lease_expires_at"] < now)
+        ]
+        if not candidates:
+            return None
+        task = min(candidates, key=lambda t: t["created_at"])
+        if task["attempts"] >= max_attempts:
+            task.update(
+                status="ERROR",
+                result_json=None,
+                error=f"Task abandoned after {task['attempts']} attempts",
+                lease_owner=None,
+                lease_expires_at=None,
+                updated_at=now,
+            )
+        else:
+            task.update(
+                status="RUNNING",
+                attempts=task["attempts"] + 1,
+                lease_owner=worker_id,
+                lease_expires_at=now + lease_seconds,
+            )
+        task_changed(task["id"])
+        return dict(task)
+
+    async def heartbeat_task(
+        self, task_id: str, worker_id: str, lease_seconds: int
+    ) -> bool:
+        task = self.tasks.get(task_id)
+        if not task or task["status"] != "RUNNING" or task["lease_owner"] != worker_id:
+            return False
+        task["lease_expires_at"] = time.time() + lease_seconds
+        return True
+
+    async def release_tasks(self, worker_id: str):
+        for task in self.tasks.values():
+            if task["status"] == "RUNNING" and task["lease_owner"] == worker_id:
+                task.update(
+                    status="PENDING",
+                    attempts=max(task["attempts"] - 1, 0),
+                    lease_owner=None,
+                    lease_expires_at=None,
+                )
+
+    async def count_pending_tasks(self) -> int:
+        return sum(t["status"] == "PENDING" for t in self.tasks.values())
+
+    async def queue_stats(self) -> dict:
+        pending = [
+            t["created_at"] for t in self.tasks.values() if t["status"] == "PENDING"
+        ]
+        return {
+            "pending": len(pending),
+            "oldest_pending_seconds": int(time.time() - min(pending)) if pending else 0,
+        }
+
+    async def purge_tasks(self, retention_seconds: int, batch_size: int) -> int:
+        cutoff = time.time() - retention_seconds
+        expired = sorted(
+            (
+                t
+                for t in self.tasks.values()
+                if t["status"] in FINAL_STATUSES and t["updated_at"] < cutoff
+            ),
+            key=lambda t: t["updated_at"],
+        )[:batch_size]
+        for task in expired:
+            del self.tasks[task["id"]]
+            self.issues.pop(task["id"], None)
+        return len(expired)
+
+    async def get_table_stats(self) -> list:
+        return [
+            {"table": "validation_cache", "rows": len(self.cache)},
+            {
+                "table": "validation_cache_issues",
+                "rows": sum(len(chunks) for _, chunks, _ in self.cache.values()),
+            },
+            {
+                "table": "validation_issues",
+                "rows": sum(len(chunks) for chunks in self.issues.values()),
+            },
+            {"table": "validation_tasks", "rows": len(self.tasks)},
+        ]
+
+    async def count_tasks_by_status(self) -> dict:
+        counts = {}
+        for task in self.tasks.values():
+            counts[task["status"]] = counts.get(task["status"], 0) + 1
+        return counts
+
+    async def get_cached_result(self, cache_key: str, ttl_seconds: int):
+        entry = self.cache.get(cache_key)
+        if entry is None or entry[2] < time.time() - ttl_seconds:
+            return None
+        self.cache.move_to_end(cache_key)
+        return loads(entry[0]), list(entry[1])
+
+    async def store_cached_result(
+        self, cache_key: str, kind: str, summary, chunks: list
+    ):
+        self.cache[cache_key] = (dumps(summary).decode(), list(chunks), time.time())
+        self.cache.move_to_end(cache_key)
+
+    async def evict_cache(self, ttl_seconds: int, max_entries: int) -> int:
+        cutoff = time.time() - ttl_seconds
+        expired = [
+            key for key, (_, _, created) in self.cache.items() if created < cutoff
+        ]
+        for key in expired:
+            del self.cache[key]
+        evicted = len(expired)
+        while len(self.cache) > max_entries:
+            self.cache.popitem(last=False)
+            evicted += 1
+        return evicted
@@ -0,0 +1,266 @@
+import asyncio
+import os
+import logging
+from bisect import bisect_left
+from typing import Iterable, List, Optional
+from dotenv import load_dotenv
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from server import queue
+from server.admission import admission_stats
+from server.store import store
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+METRICS_CONFIG = {
+    # queue stats need a query, refreshed in the background instead of per scrape
+    "refresh_seconds": float(os.getenv("METRICS_REFRESH_SECONDS", 15)),
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+RATE_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+BYTES_BUCKETS = tuple(1024**2 * mb for mb in (1, 10, 100, 500, 1024, 4096, 16384))
+
+# exported by the global provider when OTEL is configured, a no-op otherwise
+meter = metrics.get_meter("qctapi")
+
+
+class Histogram:
+    """
+    Cumulative histogram kept in process for /metrics, mirrored to an OTel histogram.
+    """
+
+    def __init__(self, name: str, help: str, unit: str, buckets: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [bucket counts..., +Inf], sum
+        self.otel = meter.create_histogram(
+            name,
+            unit=unit,
+            description=help,
+            explicit_bucket_boundaries_advisory=self.buckets,
+        )
+
+    def observe(self, value: float, **labels):
+        self.otel.record(value, labels)
+        key = tuple(sorted(labels.items()))
+        counts, total = self.series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect_left(self.buckets, value)] += 1
+        self.series[key] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else format_value(bound)
+                lines.append(
+                    f"{self.name}_bucket{format_labels(key + (('le', le),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{format_labels(key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Last value per label set, mirrored to an OTel gauge.
+    """
+
+    def __init__(self, name: str, help: str, unit: str):
+        self.name = name
+        self.help = help
+        self.series = {}
+        self.otel = meter.create_gauge(name, unit=unit, description=help)
+
+    def set(self, value: float, **labels):
+        self.otel.set(value, labels)
+        self.series[tuple(sorted(labels.items()))] = value
+
+    def render(self) -> List[str]:
+        return render_gauge(self.name, self.help, self.series.items())
+
+
+duration = Histogram(
+    "qc_validation_duration_seconds",
+    "Time spent per validation stage, stage total is the whole kind",
+    "s",
+    DURATION_BUCKETS,
+)
+throughput = Histogram(
+    "qc_validation_rows_per_second",
+    "Rows processed per second by stages that scan the data",
+    "{row}/s",
+    RATE_BUCKETS,
+)
+input_size = Histogram(
+    "qc_validation_input_bytes",
+    "Input size per validation, file size or estimated frame size",
+    "By",
+    BYTES_BUCKETS,
+)
+peak_rss = Gauge(
+    "qc_validation_peak_rss_bytes",
+    "Peak resident memory of the process while the last validation ran",
+    "By",
+)
+
+queue_cache = {"pending": 0, "oldest_pending_seconds": 0}
+refresher: Optional[asyncio.Task] = None
+
+
+def record_stage(
+    kind: str, stage: str, seconds: float, rows: Optional[int] = None, **labels
+):
+    duration.observe(seconds, kind=kind, stage=stage, **labels)
+    if rows and seconds > 0:
+        throughput.observe(rows / seconds, kind=kind, stage=stage, **labels)
+
+
+def record_validation(
+    kind: str, seconds: float, input_bytes: Optional[int], timings: List[dict]
+):
+    """
+    Record one validation run: its total, each timed stage and the input size.
+    """
+    rows = None
+    peaks = []
+    for record in timings:
+        record_stage(kind, record["stage"], record["seconds"], record["rows"])
+        rows = record["rows"] or rows
+        if record.get("peak_rss_bytes") is not None:
+            peaks.append(record["peak_rss_bytes"])
+    if peaks:
+        peak_rss.set(max(peaks), kind=kind)
+    record_stage(kind, "total", seconds, rows)
+    if input_bytes is not None:
+        input_size.observe(input_bytes, kind=kind)
+
+
+# server state gauges, read when scraped or exported
+def server_gauges() -> List[tuple]:
+    """
+    (name, help, unit, [(labels, value), ...]) for every server state gauge.
+    """
+    pool = store.pool_stats()
+    memory = admission_stats()
+    return [
+        (
+            "qc_tasks_in_flight",
+            "Tasks running on this server",
+            "{task}",
+            [((), len(queue.running))],
+        ),
+        (
+            "qc_task_queue_pending",
+            "Tasks waiting to be claimed, all servers",
+            "{task}",
+            [((), queue_cache["pending"])],
+        ),
+        (
+            "qc_task_queue_oldest_age_seconds",
+            "Age of the oldest pending task",
+            "s",
+            [((), queue_cache["oldest_pending_seconds"])],
+        ),
+        (
+            "qc_db_pool_connections",
+            "Task store pool connections by state, 0 without a pool",
+            "{connection}",
+            [((("state", state),), pool[state]) for state in ("used", "idle", "max")],
+        ),
+        (
+            "qc_memory_reserved_bytes",
+            "Memory reserved by admitted requests and tasks",
+            "By",
+            [((), memory["reserved_bytes"])],
+        ),
+        (
+            "qc_process_rss_bytes",
+            "Resident memory of the server process",
+            "By",
+            [((), memory["rss_bytes"])],
+        ),
+    ]
+
+
+def observe_gauge(name: str):
+    def callback(_options: CallbackOptions):
+        for gauge, _, _, values in server_gauges():
+            if gauge == name:
+                return [Observation(value, dict(labels)) for labels, value in values]
+        return []
+
+    return callback
+
+
+for _name, _help, _unit, _ in server_gauges():
+    meter.create_observable_gauge(
+        _name, callbacks=[observe_gauge(_name)], unit=_unit, description=_help
+    )
+
+
+def start_metrics():
+    global refresher
+    refresher = asyncio.create_task(refresh_loop())
+
+
+async def stop_metrics():
+    global refresher
+    if refresher is not None:
+        refresher.cancel()
+        await asyncio.gather(refresher, return_exceptions=True)
+        refresher = None
+
+
+async def refresh_loop():
+    while True:
+        try:
+            queue_cache.update(await store.queue_stats())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("[metrics] queue stats failed")
+        await asyncio.sleep(METRICS_CONFIG["refresh_seconds"])
+
+
+def render_prometheus() -> str:
+    """
+    All metrics in the Prometheus text format, works without any collector.
+    """
+    lines = []
+    for histogram in (duration, throughput, input_size):
+        lines += histogram.render()
+    lines += peak_rss.render()
+    for name, help, _, values in server_gauges():
+        lines += render_gauge(name, help, values)
+    return "\n".join(lines) + "\n"
+
+
+def render_gauge(name: str, help: str, values: Iterable[tuple]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    for key, value in sorted(values):
+        lines.append(f"{name}{format_labels(key)} {format_value(value)}")
+    return lines
+
+
+def format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for _, value in key
+    )
+    return (
+        "{"
+        + ",".join(f'{name}="{value}"' for (name, _), value in zip(key, escaped))
+        + "}"
+    )
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -1,7 +1,10 @@
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Dict, Any, Literal, Optional
 from enum import Enum
 
+from validators.base_validator import CheckResult
+from validators.registry import unknown_checks
+
 
 class DatasetRequest(BaseModel):
     rows: List[Dict[str, Any]]
@@ -11,9 +14,53 @@ class DataDictionaryRequest(BaseModel):
     rows: List[Dict[str, Any]]
 
 
+# many datasets checked against one dictionary
+class BatchRequest(BaseModel):
+    datadic: DataDictionaryRequest
+    datasets: List[DatasetRequest] = Field(min_length=1)
+
+
+# per request options, query params on validate routes
+class ValidationOptions(BaseModel):
+    # structure checks read dataset in batches sized to stay within this budget
+    max_memory_mb: Optional[int] = Field(default=None, gt=0)
+    # result check names (?checks=blank_header&checks=duplicated_row or comma separated), None = all
+    checks: Optional[List[str]] = None
+    # preview: first preview_rows rows only, issue lists cut at preview_max_issues, result marked partial
+    mode: Literal["full", "preview"] = "full"
+    preview_rows: Optional[int] = Field(default=None, gt=0)
+    preview_max_issues: Optional[int] = Field(default=None, gt=0)
+    # sync routes in preview mode: also queue the full validation, its task id is returned
+    follow_up: bool = False
+
+    @field_validator("checks")
+    @classmethod
+    def known_checks(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        if v is None:
+            return None
+        names = [n.strip() for item in v for n in item.split(",") if n.strip()]
+        unknown = unknown_checks(names)
+        if unknown:
+            raise ValueError(f"Unknown checks: {', '.join(unknown)}")
+        return sorted(set(names))
+
+
 class ValidationResponse(BaseModel):
-    structure: Any
-    schema: Any
+    structure: List[CheckResult]
+    schema: List[CheckResult]
+    conformance: Optional[List[CheckResult]] = None
+    partial: bool = False
+    preview: Optional[Dict[str, Any]] = None
+    task_id: Optional[str] = None  # full validation queued after a preview
+
+
+# schema once, structure per dataset in request order
+class BatchValidationResponse(BaseModel):
+    schema: List[CheckResult]
+    structure: List[List[CheckResult]]
+    conformance: List[List[CheckResult]] = []
+    partial: bool = False
+    preview: Optional[Dict[str, Any]] = None
 
 
 class TaskStatus(str, Enum):
@@ -0,0 +1,25 @@
+import asyncio
+from typing import Dict, Set
+
+# in-process task state change notifications for long-poll / SSE waiters.
+# other server instances are not notified, waiters re-check the DB periodically for those
+waiters: Dict[str, Set[asyncio.Event]] = {}
+
+
+def subscribe(task_id: str) -> asyncio.Event:
+    event = asyncio.Event()
+    waiters.setdefault(task_id, set()).add(event)
+    return event
+
+
+def unsubscribe(task_id: str, event: asyncio.Event):
+    events = waiters.get(task_id)
+    if events is not None:
+        events.discard(event)
+        if not events:
+            del waiters[task_id]
+
+
+def task_changed(task_id: str):
+    for event in waiters.get(task_id, ()):
+        event.set()
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import socket
+import logging
+import tempfile
+from typing import Awaitable, Callable, List, Optional, Set
+from dotenv import load_dotenv
+
+from server.ingest import remove_files
+from server.results import split_result
+from server.store import store
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+QUEUE_CONFIG = {
+    "max_in_flight": int(os.getenv("TASK_MAX_IN_FLIGHT", 2)),
+    "max_queued": int(os.getenv("TASK_MAX_QUEUED", 0)),  # 0 = unbounded
+    "max_attempts": int(os.getenv("TASK_MAX_ATTEMPTS", 3)),
+    "lease_seconds": int(os.getenv("TASK_LEASE_SECONDS", 60)),
+    "poll_seconds": float(os.getenv("TASK_POLL_SECONDS", 1.0)),
+    # long-poll / SSE: longest ?wait=, and DB re-check for tasks finished on other instances
+    "max_wait_seconds": float(os.getenv("TASK_MAX_WAIT_SECONDS", 60)),
+    "wait_recheck_seconds": float(os.getenv("TASK_WAIT_RECHECK_SECONDS", 5)),
+}
+
+# task inputs live here until the task finishes, keep on persistent disk to survive restarts
+SPOOL_DIR = os.getenv("TASK_SPOOL_DIR") or os.path.join(
+    tempfile.gettempdir(), "qc_api_tasks"
+)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+TaskHandler = Callable[[dict], Awaitable[dict]]
+
+workers: List[asyncio.Task] = []
+# ids of tasks running on this server
+running: Set[str] = set()
+# finished tasks waiting for their final status to be stored before inputs are released
+finishing: Set[asyncio.Task] = set()
+wakeup: Optional[asyncio.Event] = None
+
+
+class QueueFullError(Exception):
+    pass
+
+
+async def start_workers(handler: TaskHandler):
+    global wakeup
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    wakeup = asyncio.Event()
+    for n in range(QUEUE_CONFIG["max_in_flight"]):
+        workers.append(asyncio.create_task(worker_loop(n, handler)))
+
+
+async def stop_workers():
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    workers.clear()
+    if finishing:
+        await asyncio.wait(set(finishing), timeout=QUEUE_CONFIG["lease_seconds"])
+    # tasks cut short by shutdown go back to PENDING for the next start
+    await store.release_tasks(WORKER_ID)
+
+
+# backpressure: refuse new tasks instead of piling up spooled inputs
+async def ensure_capacity(n: int = 1):
+    max_queued = QUEUE_CONFIG["max_queued"]
+    if max_queued and await store.count_pending_tasks() + n > max_queued:
+        raise QueueFullError(f"Task queue is full ({max_queued} pending)")
+
+
+# new task submitted, wake an idle worker instead of waiting for next poll
+def notify_workers():
+    if wakeup is not None:
+        wakeup.set()
+
+
+async def worker_loop(n: int, handler: TaskHandler):
+    worker_id = f"{WORKER_ID}:{n}"
+    while True:
+        try:
+            task = await store.claim_task(
+                WORKER_ID,
+                QUEUE_CONFIG["lease_seconds"],
+                QUEUE_CONFIG["max_attempts"],
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"[queue] claim failed | worker={worker_id}")
+            task = None
+
+        if task is None:
+            try:
+                await asyncio.wait_for(wakeup.wait(), QUEUE_CONFIG["poll_seconds"])
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            continue
+
+        if task["status"] == "ERROR":
+            logger.error(f"[queue] abandoned | task_id={task['id']}")
+            await release_inputs(task["dataset_path"], task["datadic_path"])
+            continue
+
+        try:
+            await run_task(task, handler, worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"[queue] task failed | task_id={task['id']}")
+
+
+async def run_task(task: dict, handler: TaskHandler, worker_id: str):
+    task_id = task["id"]
+    heartbeat = asyncio.create_task(keep_lease(task_id))
+    running.add(task_id)
+    logger.info(
+        f"[queue] running | task_id={task_id} worker={worker_id} attempt={task['attempts']}"
+    )
+    try:
+        result = await handler(task)
+        summary, issues = await asyncio.to_thread(split_result, result)
+        stored = await store.update_task(
+            task_id, "DONE", result=summary, issues=issues, lease_owner=WORKER_ID
+        )
+    except asyncio.CancelledError:
+        raise  # shutdown, inputs kept so task can be retried
+    except Exception as e:
+        stored = await store.update_task(
+            task_id, "ERROR", error=str(e), lease_owner=WORKER_ID
+        )
+        logger.exception(f"[run_validation] ERROR | task_id={task_id}")
+    finally:
+        heartbeat.cancel()
+        running.discard(task_id)
+
+    if not stored:
+        logger.warning(f"[queue] lease lost, result dropped | task_id={task_id}")
+        return  # inputs belong to the worker that took the task over
+
+    # worker moves on, inputs go once the final status is stored
+    finish = asyncio.create_task(release_when_stored(task))
+    finishing.add(finish)
+    finish.add_done_callback(finishing.discard)
+
+
+# a retry needs the inputs until the final status is stored
+async def release_when_stored(task: dict):
+    if not await store.flush(task["id"]):
+        logger.warning(f"[queue] lease lost, result dropped | task_id={task['id']}")
+        return
+    await release_inputs(task["dataset_path"], task["datadic_path"])
+
+
+# call after the task is final: dataset is per task, dictionary may be shared by a batch
+async def release_inputs(dataset_path: Optional[str], datadic_path: Optional[str]):
+    remove_files(dataset_path)
+    try:
+        if datadic_path and await store.datadic_in_use(datadic_path):
+            return
+    except Exception:
+        logger.exception("[queue] dictionary usage check failed, keeping file")
+        return
+    remove_files(datadic_path)
+
+
+async def keep_lease(task_id: str):
+    interval = QUEUE_CONFIG["lease_seconds"] / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await store.heartbeat_task(
+                task_id, WORKER_ID, QUEUE_CONFIG["lease_seconds"]
+            ):
+                logger.warning(f"[queue] lease lost | task_id={task_id}")
+                return
+        except Exception:
+            logger.exception(f"[queue] heartbeat failed | task_id={task_id}")
@@ -0,0 +1,108 @@
+import os
+import zlib
+import asyncio
+from typing import Any, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from server.helper import dumps, loads
+from server.store import store
+
+load_dotenv()
+
+RESULT_CONFIG = {
+    # issues kept inline in the task summary, the rest only via /issues
+    "inline_issues": int(os.getenv("RESULT_INLINE_ISSUES", 100)),
+    # issues per stored chunk, a page reads only the chunks it overlaps
+    "chunk_issues": int(os.getenv("RESULT_CHUNK_ISSUES", 10000)),
+}
+
+# (kind, check, chunk, n_issues, zlib compressed json list)
+IssueChunk = Tuple[str, str, int, int, bytes]
+
+
+def compress_issues(issues: list) -> bytes:
+    return zlib.compress(dumps(issues), 6)
+
+
+def decompress_issues(blob: bytes) -> list:
+    return loads(zlib.decompress(blob))
+
+
+def split_result(result: dict) -> Tuple[dict, List[IssueChunk]]:
+    """
+    Split {"structure": rows, "schema": rows} into a summary (counts plus first issues)
+    and compressed issue chunks for the issues table.
+    """
+    inline = RESULT_CONFIG["inline_issues"]
+    size = RESULT_CONFIG["chunk_issues"]
+    summary = {}
+    chunks = []
+    for kind, rows in result.items():
+        if not isinstance(rows, list):
+            summary[kind] = rows
+            continue
+        summary[kind] = []
+        for row in rows:
+            issues = row.get("issue") or []
+            summary[kind].append(
+                {
+                    **row,
+                    "issue": issues[:inline],
+                    "issue_total": len(issues),
+                    "truncated": len(issues) > inline,
+                }
+            )
+            for n, start in enumerate(range(0, len(issues), size)):
+                part = issues[start : start + size]
+                chunks.append((kind, row["check"], n, len(part), compress_issues(part)))
+    return summary, chunks
+
+
+def page_chunks(sizes: List[Tuple[int, int]], offset: int, limit: int):
+    """
+    Pick stored chunks overlapping [offset, offset+limit) from (chunk, n_issues) pairs.
+
+    Returns the chunk numbers to read and how many issues to skip in the first one.
+    """
+    wanted = []
+    skip = 0
+    start = 0
+    for chunk, n in sizes:
+        end = start + n
+        if end > offset and start < offset + limit:
+            if not wanted:
+                skip = offset - start
+            wanted.append(chunk)
+        start = end
+    return wanted, skip
+
+
+def page_issues(blobs: List[bytes], skip: int, limit: int) -> list:
+    issues: List[Any] = []
+    for blob in blobs:
+        issues.extend(decompress_issues(blob))
+    return issues[skip : skip + limit]
+
+
+async def fetch_issues(
+    task_id: str, check: str, kind: Optional[str], offset: int, limit: int
+) -> Optional[dict]:
+    """
+    One page of a check's issues, None if the task stored no issues for that check.
+    """
+    rows = await store.get_issue_chunk_sizes(task_id, check, kind)
+    if not rows:
+        return None
+    kind = rows[0][0]
+    sizes = [(chunk, n) for k, chunk, n in rows if k == kind]
+    wanted, skip = page_chunks(sizes, offset, limit)
+    blobs = await store.get_issue_chunks(task_id, check, kind, wanted)
+    issues = await asyncio.to_thread(page_issues, blobs, skip, limit)
+    return {
+        "kind": kind,
+        "check": check,
+        "total": sum(n for _, n in sizes),
+        "offset": offset,
+        "limit": limit,
+        "issues": issues,
+    }
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+import logging
+from typing import Optional
+from dotenv import load_dotenv
+
+from server.store import store
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+RETENTION_CONFIG = {
+    # finished tasks (and their issues) are deleted this long after completion, 0 = keep forever
+    "retention_seconds": int(float(os.getenv("TASK_RETENTION_DAYS", 0)) * 24 * 3600),
+    "interval_seconds": float(os.getenv("TASK_PURGE_INTERVAL_SECONDS", 3600)),
+    # small batches keep locks and undo log short, pause between them lets other queries in
+    "batch_size": int(os.getenv("TASK_PURGE_BATCH_SIZE", 500)),
+    "batch_pause_seconds": 0.1,
+}
+
+purge_stats = {
+    "runs": 0,
+    "total_deleted": 0,
+    "last_deleted": 0,
+    "last_started_at": None,
+    "last_duration_seconds": None,
+    "last_error": None,
+}
+
+purger: Optional[asyncio.Task] = None
+purge_lock = asyncio.Lock()
+
+
+def start_purger():
+    global purger
+    if RETENTION_CONFIG["retention_seconds"] > 0:
+        purger = asyncio.create_task(purge_loop())
+
+
+async def stop_purger():
+    global purger
+    if purger is not None:
+        purger.cancel()
+        await asyncio.gather(purger, return_exceptions=True)
+        purger = None
+
+
+async def purge_loop():
+    while True:
+        try:
+            await purge_expired()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("[retention] purge failed")
+        await asyncio.sleep(RETENTION_CONFIG["interval_seconds"])
+
+
+async def purge_expired() -> int:
+    """
+    Delete expired tasks batch by batch until none are left, returns number deleted.
+    """
+    async with purge_lock:
+        started = time.time()
+        purge_stats["last_started_at"] = started
+        deleted = 0
+        try:
+            while True:
+                n = await store.purge_tasks(
+                    RETENTION_CONFIG["retention_seconds"],
+                    RETENTION_CONFIG["batch_size"],
+                )
+                deleted += n
+                if n < RETENTION_CONFIG["batch_size"]:
+                    break
+                await asyncio.sleep(RETENTION_CONFIG["batch_pause_seconds"])
+            purge_stats["last_error"] = None
+        except Exception as e:
+            purge_stats["last_error"] = str(e)
+            raise
+        finally:
+            purge_stats["runs"] += 1
+            purge_stats["last_deleted"] = deleted
+            purge_stats["total_deleted"] += deleted
+            purge_stats["last_duration_seconds"] = round(time.time() - started, 3)
+
+    if deleted:
+        logger.info(f"[retention] purged {deleted} tasks")
+    return deleted
@@ -0,0 +1,504 @@
+import asyncio
+import os
+import time
+import aiosqlite
+from typing import Optional
+
+from server.helper import dumps, loads
+from server.notify import task_changed
+from server.store import STORE_CONFIG, TaskStore, result_json
+
+FINAL_STATUSES = ("DONE", "ERROR")
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    One database file on local disk, for single node deployments without MariaDB.
+
+    One connection, statements of a transaction run under a lock so concurrent requests
+    never interleave. Timestamps are unix seconds.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or STORE_CONFIG["sqlite_path"]
+        self.db: Optional[aiosqlite.Connection] = None
+        self.lock = asyncio.Lock()
+
+    async def open(self):
+        if self.db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # autocommit, transactions are opened explicitly
+            self.db = await aiosqlite.connect(self.path, isolation_level=None)
+            self.db.row_factory = aiosqlite.Row
+            await self.db.execute("PRAGMA journal_mode=WAL")
+            await self.db.execute("PRAGMA synchronous=NORMAL")
+            await self.db.execute("PRAGMA busy_timeout=5000")
+
+    async def close(self):
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+    # query_* inside a transaction, fetch* alone: never reads another write half done
+    async def query_one(self, sql: str, params: tuple = ()):
+        async with self.db.execute(sql, params) as cur:
+            row = await cur.fetchone()
+        return dict(row) if row is not None else None
+
+    async def query_all(self, sql: str, params: tuple = ()) -> list:
+        async with self.db.execute(sql, params) as cur:
+            return [dict(row) for row in await cur.fetchall()]
+
+    async def fetchone(self, sql: str, params: tuple = ()):
+        async with self.lock:
+            return await self.query_one(sql, params)
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> list:
+        async with self.lock:
+            return await self.query_all(sql, params)
+
+    async def transaction(self, fn):
+        """
+        Run fn() in one write transaction, IMMEDIATE takes the write lock up front.
+        """
+        async with self.lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = await fn()
+                await self.db.execute("COMMIT")
+            except BaseException:
+                await self.db.execute("ROLLBACK")
+                raise
+        return result
+
+    async def create_tasks(self, tasks: list, batch_id: Optional[str] = None):
+        now = time.time()
+
+        async def insert():
+            await self.db.executemany(
+                """
+                INSERT INTO validation_tasks
+                    (id, status, dataset_path, datadic_path, options_json,
+                     result_json, batch_id, batch_index, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        task["id"],
+                        task.get("status", "PENDING"),
+                        task.get("dataset_path"),
+                        task.get("datadic_path"),
+                        dumps(task["options"]).decode()
+                        if task.get("options")
+                        else None,
+                        dumps(task["result"]).decode() if task.get("result") else None,
+                        batch_id,
+                        n if batch_id else None,
+                        now,
+                        now,
+                    )
+                    for n, task in enumerate(tasks)
+                ],
+            )
+            await self.insert_issues(tasks)
+
+        await self.transaction(insert)
+
+    # issue chunks are replaced on every write, call inside a transaction
+    async def insert_issues(self, tasks: list):
+        replaced = [task["id"] for task in tasks if task.get("issues") is not None]
+        if not replaced:
+            return
+        placeholders = ", ".join("?" * len(replaced))
+        await self.db.execute(
+            f"DELETE FROM validation_issues WHERE task_id IN ({placeholders})", replaced
+        )
+        chunks = [
+            (task["id"], *chunk) for task in tasks for chunk in task.get("issues") or ()
+        ]
+        if chunks:
+            await self.db.executemany(
+                """
+                INSERT INTO validation_issues
+                    (task_id, kind, check_name, chunk, n_issues, issues)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                chunks,
+            )
+
+    async def update_tasks(self, updates: list) -> list:
+        now = time.time()
+        lost = []
+
+        async def update():
+            for update in updates:
+                owner = update.get("lease_owner")
+                async with self.db.execute(
+                    """
+                    UPDATE validation_tasks
+                    SET status=?, result_json=?, error=?, updated_at=?,
+                        lease_owner=CASE WHEN ? THEN NULL ELSE lease_owner END,
+                        lease_expires_at=CASE WHEN ? THEN NULL ELSE lease_expires_at END
+                    WHERE id=? AND (? IS NULL OR lease_owner=?
+                        OR (lease_owner IS NULL AND status=?))
+                    """,
+                    (
+                        update["status"],
+                        result_json(update),
+                        update.get("error"),
+                        now,
+                        update["status"] in FINAL_STATUSES,
+                        update["status"] in FINAL_STATUSES,
+                        update["id"],
+                        owner,
+                        owner,
+                        update["status"],
+                    ),
+                ) as cur:
+                    if cur.rowcount == 0:
+                        lost.append(update["id"])
+            await self.insert_issues([u for u in updates if u["id"] not in lost])
+
+        await self.transaction(update)
+        for update in updates:
+            task_changed(update["id"])
+        return lost
+
+    async def get_task(self, task_id: str):
+        return await self.fetchone(
+            "SELECT * FROM validation_tasks WHERE id=?", (task_id,)
+        )
+
+    async def get_batch_tasks(self, batch_id: str) -> list:
+        return await self.fetchall(
+            """
+            SELECT id, status, error FROM validation_tasks
+            WHERE batch_id=? ORDER BY batch_index
+            """,
+            (batch_id,),
+        )
+
+    async def datadic_in_use(self, datadic_path: str) -> bool:
+        row = await self.fetchone(
+            """
+            SELECT 1 FROM validation_tasks
+            WHERE status IN ('PENDING', 'RUNNING') AND datadic_path=?
+            LIMIT 1
+            """,
+            (datadic_path,),
+        )
+        return row is not None
+
+    async def get_issue_chunk_sizes(
+        self, task_id: str, check: str, kind: Optional[str] = None
+    ):
+        rows = await self.fetchall(
+            """
+            SELECT kind, chunk, n_issues FROM validation_issues
+            WHERE task_id=? AND check_name=? AND (? IS NULL OR kind=?)
+            ORDER BY kind, chunk
+            """,
+            (task_id, check, kind, kind),
+        )
+        return [(row["kind"], row["chunk"], row["n_issues"]) for row in rows]
+
+    async def get_issue_chunks(self, task_id: str, check: str, kind: str, chunks: list):
+        if not chunks:
+            return []
+        rows = await self.fetchall(
+            f"""
+            SELECT issues FROM validation_issues
+            WHERE task_id=? AND check_name=? AND kind=?
+                AND chunk IN ({", ".join(["?"] * len(chunks))})
+            ORDER BY chunk
+            """,
+            (task_id, check, kind, *chunks),
+        )
+        return [row["issues"] for row in rows]
+
+    async def claim_task(self, worker_id: str, lease_seconds: int, max_attempts: int):
+        now = time.time()
+
+        async def claim():
+            task = await self.query_one(
+                """
+                SELECT id, dataset_path, datadic_path, options_json, result_json, attempts
+                FROM validation_tasks
+                WHERE status='PENDING'
+                    OR (status='RUNNING' AND lease_expires_at < ?)
+                ORDER BY created_at
+                LIMIT 1
+                """,
+                (now,),
+            )
+            if task is None:
+                return None
+            # crashed too many times, give up on it
+            if task["attempts"] >= max_attempts:
+                await self.db.execute(
+                    """
+                    UPDATE validation_tasks
+                    SET status='ERROR', result_json=NULL, error=?, updated_at=?,
+                        lease_owner=NULL, lease_expires_at=NULL
+                    WHERE id=?
+                    """,
+                    (
+                        f"Task abandoned after {task['attempts']} attempts",
+                        now,
+                        task["id"],
+                    ),
+                )
+                task["status"] = "ERROR"
+                return task
+            await self.db.execute(
+                """
+                UPDATE validation_tasks
+                SET status='RUNNING', attempts=attempts+1, lease_owner=?,
+                    lease_expires_at=?, heartbeat_at=?
+                WHERE id=?
+                """,
+                (worker_id, now + lease_seconds, now, task["id"]),
+            )
+            task["status"] = "RUNNING"
+            task["attempts"] += 1
+            return task
+
+        task = await self.transaction(claim)
+        if task is not None:
+            task_changed(task["id"])
+        return task
+
+    async def heartbeat_task(
+        self, task_id: str, worker_id: str, lease_seconds: int
+    ) -> bool:
+        now = time.time()
+        async with self.lock:
+            cur = await self.db.execute(
+                """
+                UPDATE validation_tasks SET lease_expires_at=?, heartbeat_at=?
+                WHERE id=? AND status='RUNNING' AND lease_owner=?
+                """,
+                (now + lease_seconds, now, task_id, worker_id),
+            )
+        return cur.rowcount > 0
+
+    async def release_tasks(self, worker_id: str):
+        async with self.lock:
+            await self.db.execute(
+                """
+                UPDATE validation_tasks
+                SET status='PENDING', attempts=MAX(attempts - 1, 0),
+                    lease_owner=NULL, lease_expires_at=NULL
+                WHERE status='RUNNING' AND lease_owner=?
+                """,
+                (worker_id,),
+            )
+
+    async def count_pending_tasks(self) -> int:
+        row = await self.fetchone(
+            "SELECT COUNT(*) AS n FROM validation_tasks WHERE status='PENDING'"
+        )
+        return row["n"]
+
+    async def queue_stats(self) -> dict:
+        row = await self.fetchone(
+            """
+            SELECT COUNT(*) AS pending, MIN(created_at) AS oldest
+            FROM validation_tasks WHERE status='PENDING'
+            """
+        )
+        oldest = int(time.time() - row["oldest"]) if row["oldest"] else 0
+        return {"pending": row["pending"], "oldest_pending_seconds": oldest}
+
+    async def purge_tasks(self, retention_seconds: int, batch_size: int) -> int:
+        cutoff = time.time() - retention_seconds
+
+        async def purge():
+            rows = await self.query_all(
+                """
+                SELECT id FROM validation_tasks
+                WHERE status IN ('DONE', 'ERROR') AND updated_at < ?
+                ORDER BY updated_at
+                LIMIT ?
+                """,
+                (cutoff, batch_size),
+            )
+            ids = [row["id"] for row in rows]
+            if ids:
+                marks = ", ".join(["?"] * len(ids))
+                await self.db.execute(
+                    f"DELETE FROM validation_issues WHERE task_id IN ({marks})", ids
+                )
+                await self.db.execute(
+                    f"DELETE FROM validation_tasks WHERE id IN ({marks})", ids
+                )
+            return len(ids)
+
+        return await self.transaction(purge)
+
+    async def get_table_stats(self) -> list:
+        stats = []
+        for table in (
+            "validation_cache",
+            "validation_cache_issues",
+            "validation_issues",
+            "validation_tasks",
+        ):
+            row = await self.fetchone(f"SELECT COUNT(*) AS n FROM {table}")
+            stats.append({"table": table, "rows": row["n"]})
+        return stats
+
+    async def count_tasks_by_status(self) -> dict:
+        rows = await self.fetchall(
+            "SELECT status, COUNT(*) AS n FROM validation_tasks GROUP BY status"
+        )
+        return {row["status"]: row["n"] for row in rows}
+
+    async def get_cached_result(self, cache_key: str, ttl_seconds: int):
+        now = time.time()
+
+        async def hit():
+            row = await self.query_one(
+                """
+                SELECT result_json FROM validation_cache
+                WHERE cache_key=? AND created_at > ?
+                """,
+                (cache_key, now - ttl_seconds),
+            )
+            if row is None:
+                return None
+            chunks = await self.query_all(
+                """
+                SELECT check_name, chunk, n_issues, issues FROM validation_cache_issues
+                WHERE cache_key=?
+                """,
+                (cache_key,),
+            )
+            await self.db.execute(
+                """
+                UPDATE validation_cache SET hits=hits+1, last_hit_at=?
+                WHERE cache_key=?
+                """,
+                (now, cache_key),
+            )
+            return loads(row["result_json"]), [
+                (c["check_name"], c["chunk"], c["n_issues"], c["issues"])
+                for c in chunks
+            ]
+
+        return await self.transaction(hit)
+
+    async def store_cached_result(
+        self, cache_key: str, kind: str, summary, chunks: list
+    ):
+        now = time.time()
+
+        async def put():
+            await self.db.execute(
+                """
+                INSERT INTO validation_cache (cache_key, kind, result_json, created_at, last_hit_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET result_json=excluded.result_json,
+                    created_at=excluded.created_at, last_hit_at=excluded.last_hit_at
+                """,
+                (cache_key, kind, dumps(summary).decode(), now, now),
+            )
+            await self.db.execute(
+                "DELETE FROM validation_cache_issues WHERE cache_key=?", (cache_key,)
+            )
+            await self.db.executemany(
+                """
+                INSERT INTO validation_cache_issues
+                    (cache_key, check_name, chunk, n_issues, issues)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [(cache_key, *chunk) for chunk in chunks],
+            )
+
+        await self.transaction(put)
+
+    async def evict_cache(self, ttl_seconds: int, max_entries: int) -> int:
+        async def evict():
+            cur = await self.db.execute(
+                "DELETE FROM validation_cache WHERE created_at < ?",
+                (time.time() - ttl_seconds,),
+            )
+            deleted = cur.rowcount
+            cur = await self.db.execute(
+                """
+                DELETE FROM validation_cache WHERE cache_key IN (
+                    SELECT cache_key FROM validation_cache
+                    ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (max_entries,),
+            )
+            deleted += cur.rowcount
+            if deleted:
+                await self.db.execute(
+                    """
+                    DELETE FROM validation_cache_issues WHERE cache_key NOT IN (
+                        SELECT cache_key FROM validation_cache
+                    )
+                    """
+                )
+            return deleted
+
+        return await self.transaction(evict)
+
+    async def create_table(self):
+        await self.db.executescript("""
+        CREATE TABLE IF NOT EXISTS validation_tasks (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            result_json TEXT DEFAULT NULL,
+            error TEXT DEFAULT NULL,
+            dataset_path TEXT DEFAULT NULL,
+            datadic_path TEXT DEFAULT NULL,
+            options_json TEXT DEFAULT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT DEFAULT NULL,
+            lease_expires_at REAL DEFAULT NULL,
+            heartbeat_at REAL DEFAULT NULL,
+            batch_id TEXT DEFAULT NULL,
+            batch_index INTEGER DEFAULT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_validation_tasks_queue
+            ON validation_tasks (status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_validation_tasks_finished
+            ON validation_tasks (status, updated_at);
+        CREATE INDEX IF NOT EXISTS idx_validation_tasks_batch
+            ON validation_tasks (batch_id, batch_index);
+        CREATE TABLE IF NOT EXISTS validation_issues (
+            task_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            check_name TEXT NOT NULL,
+            chunk INTEGER NOT NULL,
+            n_issues INTEGER NOT NULL,
+            issues BLOB NOT NULL,
+            PRIMARY KEY (task_id, check_name, kind, chunk)
+        );
+        CREATE TABLE IF NOT EXISTS validation_cache (
+            cache_key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            result_json TEXT NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            last_hit_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_validation_cache_created
+            ON validation_cache (created_at);
+        CREATE INDEX IF NOT EXISTS idx_validation_cache_last_hit
+            ON validation_cache (last_hit_at);
+        CREATE TABLE IF NOT EXISTS validation_cache_issues (
+            cache_key TEXT NOT NULL,
+            check_name TEXT NOT NULL,
+            chunk INTEGER NOT NULL,
+            n_issues INTEGER NOT NULL,
+            issues BLOB NOT NULL,
+            PRIMARY KEY (cache_key, check_name, chunk)
+        );
+        """)
@@ -0,0 +1,217 @@
+import os
+import importlib
+from typing import Any, Optional, Tuple
+from dotenv import load_dotenv
+
+from server.helper import dumps
+
+load_dotenv()
+
+STORE_CONFIG = {
+    # mariadb (shared by several servers), sqlite (one node, on disk) or memory (one process)
+    "backend": os.getenv("TASK_STORE", "mariadb").lower(),
+    "sqlite_path": os.getenv("TASK_STORE_PATH", "qc_tasks.db"),
+    # memory backend: finished tasks beyond this are dropped, least recently read first
+    "memory_max_tasks": int(os.getenv("TASK_STORE_MAX_TASKS", 10000)),
+    # status updates are buffered this long and written in one batch, 0 = write through
+    "write_behind_ms": float(os.getenv("TASK_WRITE_BEHIND_MS", 20)),
+    "write_behind_max_batch": int(os.getenv("TASK_WRITE_BEHIND_MAX_BATCH", 200)),
+}
+
+BACKENDS = {
+    "mariadb": ("server.mariadb", "MariaDBTaskStore"),
+    "sqlite": ("server.sqlite_store", "SQLiteTaskStore"),
+    "memory": ("server.memory_store", "MemoryTaskStore"),
+}
+
+
+def result_json(update: dict) -> Optional[str]:
+    # serialized once, write-behind does it when it buffers the update
+    if "result_json" in update:
+        return update["result_json"]
+    return dumps(update["result"]).decode() if update.get("result") else None
+
+
+class TaskStore:
+    """
+    Tasks, their issue chunks and cached results.
+
+    Rows are dicts with the validation_tasks columns, issue chunks are
+    (kind, check, chunk, n_issues, blob). Backends call notify.task_changed after
+    every status change so waiting requests wake up.
+    """
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def create_table(self):
+        pass
+
+    def pool_stats(self) -> dict:
+        # connections in use, only meaningful for pooled backends
+        return {"used": 0, "idle": 0, "max": 0}
+
+    async def create_task(
+        self,
+        task_id: str,
+        dataset_path: Optional[str] = None,
+        datadic_path: Optional[str] = None,
+        options: Optional[dict] = None,
+        status: str = "PENDING",
+        result=None,
+        issues: Optional[list] = None,
+    ):
+        await self.create_tasks(
+            [
+                {
+                    "id": task_id,
+                    "dataset_path": dataset_path,
+                    "datadic_path": datadic_path,
+                    "options": options,
+                    "status": status,
+                    "result": result,
+                    "issues": issues,
+                }
+            ]
+        )
+
+    # insert several tasks at once, a batch becomes visible to workers all at once
+    async def create_tasks(self, tasks: list, batch_id: Optional[str] = None):
+        raise NotImplementedError
+
+    # False when lease_owner is given and no longer holds the lease
+    async def update_task(
+        self,
+        task_id,
+        status,
+        result=None,
+        error=None,
+        issues=None,
+        lease_owner: Optional[str] = None,
+    ) -> bool:
+        lost = await self.update_tasks(
+            [
+                {
+                    "id": task_id,
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "issues": issues,
+                    "lease_owner": lease_owner,
+                }
+            ]
+        )
+        return not lost
+
+    # several status changes in one transaction, issues None keeps the stored chunks.
+    # an update with a lease_owner only applies while that worker holds the lease (or the
+    # same final status is already stored), returns the ids of those not applied
+    async def update_tasks(self, updates: list) -> list:
+        raise NotImplementedError
+
+    # wait until buffered writes (of one task, or all) are stored, only write behind buffers.
+    # False when the task's update was dropped because its lease was lost
+    async def flush(self, task_id: Optional[str] = None) -> bool:
+        return True
+
+    async def get_task(self, task_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_batch_tasks(self, batch_id: str) -> list:
+        raise NotImplementedError
+
+    # shared batch dictionary is deleted only once no unfinished task reads it
+    async def datadic_in_use(self, datadic_path: str) -> bool:
+        raise NotImplementedError
+
+    # issue paging: (kind, chunk, n_issues) first, then only the chunks a page needs
+    async def get_issue_chunk_sizes(
+        self, task_id: str, check: str, kind: Optional[str] = None
+    ) -> list:
+        raise NotImplementedError
+
+    async def get_issue_chunks(
+        self, task_id: str, check: str, kind: str, chunks: list
+    ) -> list:
+        raise NotImplementedError
+
+    # queue: oldest pending (or lease expired) task, never handed to two workers
+    async def claim_task(
+        self, worker_id: str, lease_seconds: int, max_attempts: int
+    ) -> Optional[dict]:
+        raise NotImplementedError
+
+    # extend lease while task is running, False if task was taken over
+    async def heartbeat_task(
+        self, task_id: str, worker_id: str, lease_seconds: int
+    ) -> bool:
+        raise NotImplementedError
+
+    # graceful shutdown: hand running tasks back to the queue without burning an attempt
+    async def release_tasks(self, worker_id: str):
+        raise NotImplementedError
+
+    async def count_pending_tasks(self) -> int:
+        raise NotImplementedError
+
+    # metrics: {"pending": n, "oldest_pending_seconds": s}
+    async def queue_stats(self) -> dict:
+        raise NotImplementedError
+
+    # retention: one batch of finished tasks older than retention, with their issue chunks
+    async def purge_tasks(self, retention_seconds: int, batch_size: int) -> int:
+        raise NotImplementedError
+
+    # admin: [{"table", "rows", ...}] and task counts by status
+    async def get_table_stats(self) -> list:
+        raise NotImplementedError
+
+    async def count_tasks_by_status(self) -> dict:
+        raise NotImplementedError
+
+    # result cache, a hit refreshes the entry for LRU eviction
+    async def get_cached_result(
+        self, cache_key: str, ttl_seconds: int
+    ) -> Optional[Tuple[Any, list]]:
+        """
+        Summary rows and their (check, chunk, n_issues, blob) issue chunks, None if missing or expired.
+        """
+        raise NotImplementedError
+
+    # replaces the entry and all of its chunks
+    async def store_cached_result(
+        self, cache_key: str, kind: str, summary, chunks: list
+    ):
+        raise NotImplementedError
+
+    # drop expired entries, then least recently used ones above max_entries
+    async def evict_cache(self, ttl_seconds: int, max_entries: int) -> int:
+        raise NotImplementedError
+
+
+def create_store(backend: Optional[str] = None) -> TaskStore:
+    backend = backend or STORE_CONFIG["backend"]
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown TASK_STORE '{backend}', use {', '.join(sorted(BACKENDS))}"
+        )
+    # imported on demand, aiosqlite is only needed by the sqlite backend
+    module, name = BACKENDS[backend]
+    store = getattr(importlib.import_module(module), name)()
+    # memory writes cost nothing, buffering them would only delay other readers
+    if STORE_CONFIG["write_behind_ms"] > 0 and backend != "memory":
+        from server.write_behind import WriteBehindTaskStore
+
+        store = WriteBehindTaskStore(store)
+    return store
+
+
+def __getattr__(name: str):
+    # `store` is created on first import of it, so a backend module can be imported first
+    if name == "store":
+        globals()["store"] = create_store()
+        return globals()["store"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
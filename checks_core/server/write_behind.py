@@ -0,0 +1,246 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+from server.notify import task_changed
+from server.store import STORE_CONFIG, TaskStore, result_json
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ("DONE", "ERROR")
+# failed batch is retried after this, doubling up to the max
+RETRY_SECONDS = 0.5
+MAX_RETRY_SECONDS = 30
+
+
+class WriteBehindTaskStore:
+    """
+    Buffers task status updates in process and writes them in batches.
+
+    Updates of one task within a flush interval collapse into the last one, and all
+    buffered tasks are written with one update_tasks transaction. Reads of this server
+    see buffered updates right away, other servers once they are written. Anything not
+    defined here goes straight to the wrapped store.
+    """
+
+    def __init__(
+        self,
+        inner: TaskStore,
+        interval_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+    ):
+        self.inner = inner
+        self.interval = (interval_ms or STORE_CONFIG["write_behind_ms"]) / 1000
+        self.max_batch = max_batch or STORE_CONFIG["write_behind_max_batch"]
+        self.pending: Dict[str, dict] = {}  # task id -> latest update, not written yet
+        self.writing: Dict[str, dict] = {}  # batch being written, still read from here
+        self.lost: Set[str] = set()  # updates refused, lease taken over, until flushed
+        self.dirty: Optional[asyncio.Event] = None
+        self.full: Optional[asyncio.Event] = None
+        self.written: Optional[asyncio.Condition] = None
+        self.write_lock: Optional[asyncio.Lock] = None
+        self.flusher: Optional[asyncio.Task] = None
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    async def open(self):
+        await self.inner.open()
+        if self.flusher is None:
+            self.dirty = asyncio.Event()
+            self.full = asyncio.Event()
+            self.written = asyncio.Condition()
+            self.write_lock = asyncio.Lock()
+            self.flusher = asyncio.create_task(self.flush_loop())
+
+    async def close(self):
+        if self.flusher is not None:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None  # a batch cut short is back in pending
+            await self.write_pending()
+            if self.pending:
+                logger.error(
+                    f"[write_behind] {len(self.pending)} task updates lost on close"
+                )
+        await self.inner.close()
+
+    # True once buffered, flush(task_id) tells whether the lease still held when written
+    async def update_task(
+        self,
+        task_id,
+        status,
+        result=None,
+        error=None,
+        issues=None,
+        lease_owner: Optional[str] = None,
+    ) -> bool:
+        lost = await self.update_tasks(
+            [
+                {
+                    "id": task_id,
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "issues": issues,
+                    "lease_owner": lease_owner,
+                }
+            ]
+        )
+        return not lost
+
+    async def update_tasks(self, updates: list) -> list:
+        if self.flusher is None:  # not opened, nothing would write the buffer
+            return await self.inner.update_tasks(updates)
+        for update in updates:
+            update = {**update, "result_json": result_json(update)}
+            previous = self.pending.get(update["id"])
+            if previous is not None and update.get("issues") is None:
+                update["issues"] = previous["issues"]
+            self.pending[update["id"]] = update
+            task_changed(update["id"])
+        self.dirty.set()
+        if len(self.pending) >= self.max_batch:
+            self.full.set()
+        return []
+
+    async def flush(self, task_id: Optional[str] = None) -> bool:
+        if self.written is None:
+            return True
+        async with self.written:
+            await self.written.wait_for(lambda: not self.buffered(task_id))
+        if task_id in self.lost:
+            self.lost.discard(task_id)
+            return False
+        return True
+
+    def buffered(self, task_id: Optional[str] = None) -> bool:
+        if task_id is None:
+            return bool(self.pending or self.writing)
+        return task_id in self.pending or task_id in self.writing
+
+    def overlay(self, task_id: str) -> Optional[dict]:
+        return self.pending.get(task_id) or self.writing.get(task_id)
+
+    # a newer update without issues leaves those of the batch being written in place
+    def overlay_issues(self, task_id: str) -> Optional[list]:
+        for updates in (self.pending, self.writing):
+            if updates.get(task_id, {}).get("issues") is not None:
+                return updates[task_id]["issues"]
+        return None
+
+    async def flush_loop(self):
+        retry = RETRY_SECONDS
+        while True:
+            await self.dirty.wait()
+            # first update waits one interval for others, a full buffer goes at once
+            try:
+                await asyncio.wait_for(self.full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.dirty.clear()
+            self.full.clear()
+            if await self.write_pending():
+                retry = RETRY_SECONDS
+            else:
+                self.dirty.set()
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, MAX_RETRY_SECONDS)
+
+    async def write_pending(self) -> bool:
+        async with self.write_lock:
+            if not self.pending:
+                return True
+            self.writing, self.pending = self.pending, {}
+            try:
+                lost = await self.inner.update_tasks(list(self.writing.values()))
+                if lost:
+                    logger.warning(
+                        f"[write_behind] lease lost, updates dropped | tasks={lost}"
+                    )
+                    self.lost.update(lost)
+                return True
+            except BaseException as e:
+                self.requeue()
+                if not isinstance(e, Exception):
+                    raise
+                logger.exception(
+                    f"[write_behind] write failed, retrying | tasks={len(self.writing)}"
+                )
+                return False
+            finally:
+                self.writing = {}
+                async with self.written:
+                    self.written.notify_all()
+
+    # failed batch goes back, newer updates win but keep its issues unless replaced
+    def requeue(self):
+        for task_id, update in self.writing.items():
+            newer = self.pending.get(task_id)
+            if newer is None:
+                self.pending[task_id] = update
+            elif newer.get("issues") is None:
+                newer["issues"] = update["issues"]
+
+    async def get_task(self, task_id: str) -> Optional[dict]:
+        # taken before the read, a write finishing meanwhile is then seen either way
+        update = self.overlay(task_id)
+        task = await self.inner.get_task(task_id)
+        if task is None or update is None:
+            return task
+        task = dict(task)
+        task.update(
+            status=update["status"],
+            result_json=update["result_json"],
+            error=update.get("error"),
+        )
+        if update["status"] in FINAL_STATUSES:
+            task.update(lease_owner=None, lease_expires_at=None)
+        return task
+
+    async def get_batch_tasks(self, batch_id: str) -> list:
+        updates = {**self.writing, **self.pending}
+        tasks = await self.inner.get_batch_tasks(batch_id)
+        return [
+            {**task, "status": update["status"], "error": update.get("error")}
+            if (update := updates.get(task["id"])) is not None
+            else task
+            for task in tasks
+        ]
+
+    async def get_issue_chunk_sizes(
+        self, task_id: str, check: str, kind: Optional[str] = None
+    ) -> list:
+        issues = self.overlay_issues(task_id)
+        if issues is None:
+            return await self.inner.get_issue_chunk_sizes(task_id, check, kind)
+        return sorted(
+            (chunk_kind, chunk, n_issues)
+            for chunk_kind, chunk_check, chunk, n_issues, _ in issues
+            if chunk_check == check and kind in (None, chunk_kind)
+        )
+
+    async def get_issue_chunks(
+        self, task_id: str, check: str, kind: str, chunks: list
+    ) -> list:
+        issues = self.overlay_issues(task_id)
+        if issues is None:
+            return await self.inner.get_issue_chunks(task_id, check, kind, chunks)
+        stored = {
+            chunk: blob
+            for chunk_kind, chunk_check, chunk, _, blob in issues
+            if chunk_check == check and chunk_kind == kind
+        }
+        return [stored[chunk] for chunk in sorted(chunks)]
+
+    # buffered updates first, a task finished here should not go back to the queue
+    async def release_tasks(self, worker_id: str):
+        if self.write_lock is not None:
+            await self.write_pending()
+        await self.inner.release_tasks(worker_id)
+
+    # counts come from stored rows, a buffered task would still count as RUNNING
+    async def count_tasks_by_status(self) -> dict:
+        if self.write_lock is not None:
+            await self.write_pending()
+        return await self.inner.count_tasks_by_status()
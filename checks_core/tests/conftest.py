@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# config is read on import: in-process task store, spool apart from a running server
+os.environ["TASK_STORE"] = "memory"
+os.environ["TASK_SPOOL_DIR"] = tempfile.mkdtemp(prefix="qc_test_spool_")
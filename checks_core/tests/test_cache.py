@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import polars as pl
+import pytest
+
+from server import cache
+from server.memory_store import MemoryTaskStore
+from server.sqlite_store import SQLiteTaskStore
+
+ROWS = [
+    {"check": "dup", "issue_type": "count", "count": 250, "issue": list(range(250))},
+    {"check": "blank", "issue_type": "count", "count": 2, "issue": ["a", "b"]},
+    {"check": "empty", "issue_type": "count", "count": 0, "issue": []},
+]
+
+
+def test_key_follows_file_content(tmp_path):
+    a, b, c = tmp_path / "a.csv", tmp_path / "b.csv", tmp_path / "c.csv"
+    a.write_text("x,y\n1,2\n")
+    b.write_text("x,y\n1,2\n")
+    c.write_text("x,y\n1,3\n")
+    keys = [
+        cache.cache_key("structure", cache.fingerprint(str(p)), {}) for p in (a, b, c)
+    ]
+    assert keys[0] == keys[1]
+    assert keys[0] != keys[2]
+
+
+def test_key_follows_kind_and_params():
+    key = cache.cache_key("structure", "f", {"checks": ["blank"]})
+    assert key == cache.cache_key("structure", "f", {"checks": ["blank"]})
+    assert key != cache.cache_key("schema", "f", {"checks": ["blank"]})
+    assert key != cache.cache_key("structure", "f", {"checks": ["dup"]})
+
+
+def test_frame_fingerprint_is_content_and_order_sensitive():
+    df = pl.DataFrame({"x": ["1", "2"], "y": ["a", "b"]})
+    assert cache.fingerprint(df) == cache.fingerprint(df.clone())
+    assert cache.fingerprint(df) != cache.fingerprint(df.reverse())
+    assert cache.fingerprint(df) != cache.fingerprint(df.cast({"x": pl.Int64}))
+    assert (
+        cache.fingerprint((df, df))
+        == f"{cache.fingerprint(df)}:{cache.fingerprint(df)}"
+    )
+    # a lazy plan would have to run to be hashed
+    assert cache.fingerprint(df.lazy()) is None
+    assert cache.fingerprint((df, df.lazy())) is None
+
+
+def test_long_issue_lists_go_to_chunks():
+    summary, chunks = cache.split_rows("structure", ROWS)
+    assert [row["truncated"] for row in summary] == [True, False, False]
+    assert len(summary[0]["issue"]) < 250
+    assert {chunk[0] for chunk in chunks} == {"dup"}
+    assert cache.join_rows(summary, chunks) == ROWS
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def task_store(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        store = MemoryTaskStore()
+    else:
+        store = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    asyncio.run(store.open())
+    asyncio.run(store.create_table())
+    monkeypatch.setattr(cache, "task_store", store)
+    monkeypatch.setitem(cache.CACHE_CONFIG, "enabled", True)
+    yield store
+    asyncio.run(store.close())
+
+
+def test_result_computed_once(task_store, tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("x\n1\n")
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        return ROWS
+
+    async def main():
+        first = await cache.cached_result("structure", str(path), {}, compute)
+        second = await cache.cached_result("structure", str(path), {}, compute)
+        other = await cache.cached_result("schema", str(path), {}, compute)
+        return first, second, other
+
+    first, second, other = asyncio.run(main())
+    assert first == second == other == ROWS
+    assert len(computed) == 2  # once per kind
+
+
+def test_eviction_drops_expired_then_least_recently_hit(task_store):
+    async def main():
+        for key in ("a", "b", "c"):
+            summary, chunks = cache.split_rows("structure", ROWS)
+            await task_store.store_cached_result(key, "structure", summary, chunks)
+            time.sleep(0.01)  # distinct hit times
+        await task_store.get_cached_result("a", 60)
+        evicted = await task_store.evict_cache(60, 2)
+        kept = [k for k in "abc" if await task_store.get_cached_result(k, 60)]
+        expired = await task_store.evict_cache(0, 10)
+        stats = {s["table"]: s["rows"] for s in await task_store.get_table_stats()}
+        return evicted, kept, expired, stats
+
+    evicted, kept, expired, stats = asyncio.run(main())
+    assert evicted == 1
+    assert kept == ["a", "c"]
+    assert expired == 2
+    assert stats["validation_cache"] == 0
+    assert stats["validation_cache_issues"] == 0
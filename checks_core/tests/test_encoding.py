@@ -0,0 +1,85 @@
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from server import encoding
+from server.encoding import DecompressionMiddleware, supported_encodings
+
+BODY = b'{"rows": [' + b",".join(b'{"a": "%d"}' % i for i in range(5000)) + b"]}"
+
+echo = FastAPI()
+echo.add_middleware(DecompressionMiddleware)
+
+
+@echo.post("/echo")
+async def echo_body(request: Request):
+    return Response(await request.body())
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(echo) as client:
+        yield client
+
+
+def compress(name: str, body: bytes) -> bytes:
+    if name == "gzip":
+        return gzip.compress(body)
+    if name == "deflate":
+        return zlib.compress(body)
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(body)
+
+
+@pytest.mark.parametrize("name", ["gzip", "deflate", "zstd"])
+def test_body_is_decoded(client, name):
+    r = client.post(
+        "/echo", content=compress(name, BODY), headers={"Content-Encoding": name}
+    )
+    assert r.status_code == 200
+    assert r.content == BODY
+
+
+@pytest.mark.parametrize("name", ["gzip", "zstd"])
+def test_body_streamed_in_pieces_is_decoded(client, name):
+    data = compress(name, BODY)
+    pieces = (data[i : i + 1000] for i in range(0, len(data), 1000))
+    r = client.post("/echo", content=pieces, headers={"Content-Encoding": name})
+    assert r.status_code == 200
+    assert r.content == BODY
+
+
+def test_plain_body_passes_through(client):
+    r = client.post("/echo", content=BODY)
+    assert r.content == BODY
+
+
+def test_unsupported_encoding(client):
+    r = client.post("/echo", content=BODY, headers={"Content-Encoding": "br"})
+    assert r.status_code == 415
+    assert r.headers["Accept-Encoding"] == ", ".join(supported_encodings())
+
+
+def test_corrupt_body(client):
+    r = client.post(
+        "/echo", content=b"not gzip at all", headers={"Content-Encoding": "gzip"}
+    )
+    assert r.status_code == 400
+
+
+def test_truncated_body(client):
+    data = gzip.compress(BODY)
+    r = client.post("/echo", content=data[:-20], headers={"Content-Encoding": "gzip"})
+    assert r.status_code == 400
+    assert "Truncated" in r.text
+
+
+def test_decompressed_size_limit(client, monkeypatch):
+    monkeypatch.setitem(encoding.ENCODING_CONFIG, "max_body_bytes", len(BODY) - 1)
+    r = client.post(
+        "/echo", content=gzip.compress(BODY), headers={"Content-Encoding": "gzip"}
+    )
+    assert r.status_code == 413
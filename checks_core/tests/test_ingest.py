@@ -0,0 +1,39 @@
+import asyncio
+import io
+
+import polars as pl
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from server.ingest import spool_ndjson, remove_files
+
+
+def spool(body: bytes, tmp_path) -> pl.DataFrame:
+    upload = UploadFile(io.BytesIO(body), filename="rows.ndjson")
+    path = asyncio.run(spool_ndjson(upload, str(tmp_path)))
+    try:
+        return pl.read_parquet(path)
+    finally:
+        remove_files(path)
+
+
+def test_key_first_seen_late_is_kept(tmp_path):
+    lines = [b'{"a": "%d"}' % i for i in range(150)] + [b'{"a": "x", "late": "y"}']
+    df = spool(b"\n".join(lines), tmp_path)
+    assert df.columns == ["a", "late"]
+    assert df["late"].null_count() == 150
+    assert df["late"][-1] == "y"
+
+
+def test_type_change_after_first_rows(tmp_path):
+    lines = [b'{"x": %d}' % i for i in range(150)] + [b'{"x": "na"}']
+    df = spool(b"\n".join(lines), tmp_path)
+    assert df.schema == {"x": pl.String}
+    assert df["x"][0] == "0"
+    assert df["x"][-1] == "na"
+
+
+def test_invalid_line_is_rejected(tmp_path):
+    with pytest.raises(HTTPException) as e:
+        spool(b'{"a": 1}\n{"a": \n', tmp_path)
+    assert e.value.status_code == 400
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from server import queue
+from server.memory_store import MemoryTaskStore
+from server.sqlite_store import SQLiteTaskStore
+from server.write_behind import WriteBehindTaskStore
+
+
+@pytest.fixture(params=["memory", "sqlite", "sqlite+write_behind"])
+def open_store(request, tmp_path):
+    path = str(tmp_path / "tasks.db")
+
+    async def opened():
+        if request.param == "memory":
+            store = MemoryTaskStore()
+        elif request.param == "sqlite":
+            store = SQLiteTaskStore(path)
+        else:
+            store = WriteBehindTaskStore(SQLiteTaskStore(path), interval_ms=10)
+        await store.open()
+        await store.create_table()
+        return store
+
+    return opened
+
+
+def test_update_after_lease_taken_over_is_refused(open_store):
+    async def main():
+        store = await open_store()
+        try:
+            await store.create_task("t")
+            await store.claim_task("w1", -1, 3)  # expired right away
+            await store.claim_task("w2", 60, 3)
+            stale = await store.update_task(
+                "t", "DONE", result={"by": "w1"}, lease_owner="w1"
+            )
+            stale = stale and await store.flush("t")
+            fresh = await store.update_task(
+                "t", "DONE", result={"by": "w2"}, lease_owner="w2"
+            )
+            fresh = fresh and await store.flush("t")
+            # a retried write of the same final status still counts as stored
+            again = await store.update_task(
+                "t", "DONE", result={"by": "w2"}, lease_owner="w2"
+            )
+            again = again and await store.flush("t")
+            return stale, fresh, again, await store.get_task("t")
+        finally:
+            await store.close()
+
+    stale, fresh, again, task = asyncio.run(main())
+    assert (stale, fresh, again) == (False, True, True)
+    assert task["status"] == "DONE"
+    assert task["result_json"] == '{"by":"w2"}'
+    assert task["lease_owner"] is None
+
+
+def test_task_abandoned_after_max_attempts(open_store):
+    async def main():
+        store = await open_store()
+        try:
+            await store.create_task("t")
+            claims = [await store.claim_task("w", -1, 2) for _ in range(3)]
+            return claims, await store.get_task("t")
+        finally:
+            await store.close()
+
+    claims, task = asyncio.run(main())
+    assert [c["status"] for c in claims] == ["RUNNING", "RUNNING", "ERROR"]
+    assert task["status"] == "ERROR"
+    assert "abandoned after 2 attempts" in task["error"]
+
+
+def test_release_puts_running_tasks_back(open_store):
+    async def main():
+        store = await open_store()
+        try:
+            await store.create_task("t")
+            await store.claim_task("w", 60, 3)
+            await store.release_tasks("w")
+            released = await store.get_task("t")
+            claimed = await store.claim_task("w2", 60, 3)
+            return released, claimed
+        finally:
+            await store.close()
+
+    released, claimed = asyncio.run(main())
+    assert released["status"] == "PENDING"
+    assert released["lease_owner"] is None
+    assert claimed["id"] == "t"
+
+
+def inputs(tmp_path):
+    paths = []
+    for name in ("dataset.csv", "datadic.csv"):
+        path = tmp_path / name
+        path.write_text("a\n1\n")
+        paths.append(str(path))
+    return paths
+
+
+async def finished():
+    await asyncio.gather(*queue.finishing)
+
+
+def test_run_task_stores_result_and_releases_inputs(tmp_path, monkeypatch):
+    store = MemoryTaskStore()
+    monkeypatch.setattr(queue, "store", store)
+    dataset_path, datadic_path = inputs(tmp_path)
+
+    async def handler(task):
+        return {"structure": [{"check": "c", "count": 1, "issue": [1]}]}
+
+    async def main():
+        await store.create_task("t", dataset_path, datadic_path)
+        task = await store.claim_task(queue.WORKER_ID, 60, 3)
+        await queue.run_task(task, handler, queue.WORKER_ID)
+        await finished()
+        return await store.get_task("t")
+
+    task = asyncio.run(main())
+    assert task["status"] == "DONE"
+    assert not (tmp_path / "dataset.csv").exists()
+    assert not (tmp_path / "datadic.csv").exists()
+
+
+def test_run_task_keeps_inputs_when_lease_lost(tmp_path, monkeypatch):
+    store = MemoryTaskStore()
+    monkeypatch.setattr(queue, "store", store)
+    dataset_path, datadic_path = inputs(tmp_path)
+
+    async def handler(task):
+        # lease ran out meanwhile and another worker took the task
+        await store.claim_task("other", 60, 3)
+        return {"structure": []}
+
+    async def main():
+        await store.create_task("t", dataset_path, datadic_path)
+        task = await store.claim_task(queue.WORKER_ID, -1, 3)
+        await queue.run_task(task, handler, queue.WORKER_ID)
+        await finished()
+        return await store.get_task("t")
+
+    task = asyncio.run(main())
+    assert task["status"] == "RUNNING"
+    assert task["lease_owner"] == "other"
+    assert (tmp_path / "dataset.csv").exists()
+    assert (tmp_path / "datadic.csv").exists()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from server.queue import SPOOL_DIR
+
+DATASET = ("dataset.csv", b"SubjectID,x\n1,a\n2,b\n", "text/csv")
+DATADIC = (
+    "datadic.csv",
+    b"VariableName,Title,Description\nSubjectID,t,d\n",
+    "text/csv",
+)
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app_module.app) as client:
+        yield client
+
+
+@pytest.fixture
+def tmp_dir(tmp_path, monkeypatch):
+    # sync upload routes spool to the default temp dir
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def spooled() -> list:
+    return os.listdir(SPOOL_DIR)
+
+
+def test_upload_queues_task(client):
+    r = client.post(
+        "/v1/validate/upload", files={"dataset": DATASET, "datadic": DATADIC}
+    )
+    assert r.status_code == 200
+    task = client.get(f"/v1/validate/{r.json()['id']}", params={"wait": 30}).json()
+    assert task["status"] == "DONE"
+
+
+def test_upload_unsupported_file_type(client):
+    before = spooled()
+    r = client.post(
+        "/v1/validate/upload",
+        files={
+            "dataset": DATASET,
+            "datadic": ("datadic.xlsx", b"x", "application/zip"),
+        },
+    )
+    assert r.status_code == 415
+    assert spooled() == before  # dataset spooled first is removed again
+
+
+def test_upload_invalid_ndjson(client):
+    before = spooled()
+    r = client.post(
+        "/v1/validate/upload",
+        files={
+            "dataset": ("rows.ndjson", b'{"a": 1}\n{"a": \n', "application/x-ndjson"),
+            "datadic": DATADIC,
+        },
+    )
+    assert r.status_code == 400
+    assert spooled() == before
+
+
+@pytest.mark.parametrize(
+    "route, field",
+    [
+        ("/v1/validate/structure/upload", "dataset"),
+        ("/v1/validate/schema/upload", "datadic"),
+    ],
+)
+def test_unreadable_file_is_bad_request(client, tmp_dir, route, field):
+    r = client.post(route, files={field: ("bad.parquet", b"not parquet", "")})
+    assert r.status_code == 400
+    assert os.listdir(tmp_dir) == []
+
+
+def test_empty_csv_is_bad_request(client, tmp_dir):
+    r = client.post(
+        "/v1/validate/structure/upload",
+        files={"dataset": ("empty.csv", b"", "text/csv")},
+    )
+    assert r.status_code == 400
+    assert os.listdir(tmp_dir) == []
+
+
+def test_core_upload_unreadable_dictionary(client, tmp_dir):
+    r = client.post(
+        "/v1/validate/core/upload",
+        files={"dataset": DATASET, "datadic": ("datadic.parquet", b"not parquet", "")},
+    )
+    assert r.status_code == 400
+    assert os.listdir(tmp_dir) == []
+
+
+def test_missing_file_is_unprocessable(client):
+    r = client.post("/v1/validate/upload", files={"dataset": DATASET})
+    assert r.status_code == 422
@@ -0,0 +1,121 @@
+import asyncio
+
+from server import write_behind
+from server.memory_store import MemoryTaskStore
+from server.write_behind import WriteBehindTaskStore
+
+CHUNKS = [("structure", "blank", 0, 2, b"x")]
+
+
+async def opened(interval_ms: float = 50, max_batch: int = 200):
+    store = WriteBehindTaskStore(MemoryTaskStore(), interval_ms, max_batch)
+    await store.open()
+    return store
+
+
+def test_buffered_update_is_read_before_written():
+    async def main():
+        store = await opened()
+        try:
+            await store.create_task("t")
+            await store.update_task("t", "DONE", result={"n": 1}, issues=CHUNKS)
+            buffered = await store.get_task("t"), await store.inner.get_task("t")
+            sizes = await store.get_issue_chunk_sizes("t", "blank")
+            await store.flush("t")
+            return buffered, sizes, await store.inner.get_task("t")
+        finally:
+            await store.close()
+
+    (overlay, stored), sizes, written = asyncio.run(main())
+    assert overlay["status"] == "DONE"
+    assert overlay["result_json"] == '{"n":1}'
+    assert stored["status"] == "PENDING"
+    assert sizes == [("structure", 0, 2)]
+    assert written["status"] == "DONE"
+    assert written["result_json"] == '{"n":1}'
+
+
+def test_updates_collapse_into_one_write():
+    async def main():
+        store = await opened()
+        batches = []
+        write = store.inner.update_tasks
+
+        async def counted(updates):
+            batches.append(len(updates))
+            return await write(updates)
+
+        store.inner.update_tasks = counted
+        try:
+            await store.create_tasks([{"id": f"t{n}"} for n in range(10)])
+            for n in range(10):
+                await store.update_task(f"t{n}", "RUNNING")
+                await store.update_task(f"t{n}", "DONE", result={"n": n})
+            await store.flush()
+            return batches, await store.count_tasks_by_status()
+        finally:
+            await store.close()
+
+    batches, counts = asyncio.run(main())
+    assert batches == [10]
+    assert counts == {"DONE": 10}
+
+
+def test_newer_update_keeps_buffered_issues():
+    async def main():
+        store = await opened()
+        try:
+            await store.create_task("t")
+            await store.update_task("t", "DONE", result={"n": 1}, issues=CHUNKS)
+            await store.update_task("t", "DONE", result={"n": 2})
+            await store.flush("t")
+            task = await store.get_task("t")
+            return task, await store.get_issue_chunks("t", "blank", "structure", [0])
+        finally:
+            await store.close()
+
+    task, chunks = asyncio.run(main())
+    assert task["result_json"] == '{"n":2}'
+    assert chunks == [b"x"]
+
+
+def test_failed_write_is_retried(monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_SECONDS", 0.01)
+
+    async def main():
+        store = await opened(interval_ms=10)
+        attempts = []
+        write = store.inner.update_tasks
+
+        async def flaky(updates):
+            attempts.append(len(updates))
+            if len(attempts) == 1:
+                raise RuntimeError("db down")
+            return await write(updates)
+
+        store.inner.update_tasks = flaky
+        try:
+            await store.create_task("t")
+            await store.update_task("t", "ERROR", error="boom")
+            await store.flush("t")
+            return attempts, await store.inner.get_task("t")
+        finally:
+            await store.close()
+
+    attempts, task = asyncio.run(main())
+    assert attempts == [1, 1]
+    assert task["status"] == "ERROR"
+    assert task["error"] == "boom"
+
+
+def test_close_writes_buffered_updates():
+    async def main():
+        # interval far longer than the test: only close can write it
+        store = await opened(interval_ms=60000)
+        await store.create_task("t")
+        await store.update_task("t", "DONE", result={"n": 1})
+        await store.close()
+        return await store.inner.get_task("t")
+
+    task = asyncio.run(main())
+    assert task["status"] == "DONE"
@@ -1,3 +1,6 @@
+# bump when check logic or result format changes, invalidates cached results
+VALIDATOR_VERSION = "1"
+
 MINIMAL_VARS = [
     "SubjectID",
     "SpeciesTyp",
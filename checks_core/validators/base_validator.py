@@ -1,10 +1,158 @@
+import time
+import threading
+import psutil
 import polars as pl
-from typing import Union
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Union
+from typing_extensions import NotRequired, TypedDict
+
+BATCH_SAMPLE_ROWS = 1000
+MIN_BATCH_ROWS = 1000
+# ipc file (random access, memory mapped) or stream format, told apart by the file magic
+ARROW_SUFFIXES = (".arrow", ".arrows", ".feather", ".ipc")
+ARROW_FILE_MAGIC = b"ARROW1"
+# rss is sampled this often while a stage runs
+RSS_SAMPLE_SECONDS = 0.05
+
+
+class CheckResult(TypedDict):
+    """
+    One row of the long table, plain dict at runtime so it goes to json (orjson) as is.
+    """
+
+    check: str
+    issue_type: str
+    count: int
+    issue: List[Any]
+    # set by the server: preview rows and rows whose full issue list is stored apart
+    partial: NotRequired[bool]
+    truncated: NotRequired[bool]
+    issue_total: NotRequired[int]
+
+
+class RssSampler:
+    """
+    Highest resident memory of this process while the block runs, sampled from a thread.
+    Includes whatever else the process runs meanwhile (other jobs in thread mode).
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = self.process.memory_info().rss
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self) -> "RssSampler":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
 
 
 class BaseValidator:
+    def __init__(self):
+        # one record per timed stage, read by the caller for metrics
+        self.timings: List[dict] = []
+
+    @contextmanager
+    def timed(self, stage: str, checks: Iterable[str]):
+        """
+        Time one stage of a validation, the stage may set record["rows"] when it knows the row count.
+        Checks fused into one query share a stage, stages without selected checks are not recorded.
+        """
+        record = {
+            "validator": type(self).__name__,
+            "stage": stage,
+            "checks": sorted(checks),
+            "rows": None,
+        }
+        start = time.perf_counter()
+        sampler = RssSampler()
+        try:
+            with sampler:
+                yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            record["peak_rss_bytes"] = sampler.peak
+            if record["checks"]:
+                self.timings.append(record)
+
+    @staticmethod
+    def scan_file(file_path: str) -> pl.LazyFrame:
+        """
+        Lazy scan of csv, parquet or arrow ipc file, picked by file extension.
+
+        csv columns are read as strings, checks compare text so no type inference is needed.
+        parquet and arrow keep the producer's dtypes.
+        """
+        suffix = Path(file_path).suffix.lower()
+        if suffix in (".parquet", ".pq"):
+            return pl.scan_parquet(file_path)
+        if suffix in ARROW_SUFFIXES:
+            with open(file_path, "rb") as f:
+                is_ipc_file = f.read(len(ARROW_FILE_MAGIC)) == ARROW_FILE_MAGIC
+            if is_ipc_file:
+                return pl.scan_ipc(file_path)  # memory mapped, batches read lazily
+            # stream format has no footer to map batches from, read once
+            return pl.read_ipc_stream(file_path).lazy()
+
+        return pl.scan_csv(file_path, infer_schema=False)
+
+    @staticmethod
+    def select(checks: Union[str, Iterable[str]], all_checks: set) -> set:
+        """
+        Checks to run: "all", any other string = all but min_vars (legacy), or explicit ids.
+        """
+        if isinstance(checks, str):
+            return set(all_checks) if checks == "all" else all_checks - {"min_vars"}
+        return all_checks.intersection(checks)
+
+    def validate_frame(self, df: Union[pl.DataFrame, pl.LazyFrame], *args, **kwargs):
+        """
+        Run checks on in-memory polars frame, no temp file or re-parse needed.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def batch_rows(
+        ldf: pl.LazyFrame, max_memory_mb: int, extra_row_bytes: int = 0
+    ) -> int:
+        """
+        Rows per batch so batch plus check intermediates stay within memory budget (estimate).
+        """
+        sample = ldf.head(BATCH_SAMPLE_ROWS).collect()
+        row_bytes = sample.estimated_size() / max(sample.height, 1)
+        # concatenated row strings are about one row again
+        row_bytes = 2 * row_bytes + extra_row_bytes
+        # half the budget for the batch, rest for polars buffers and allocator slack
+        return max(MIN_BATCH_ROWS, int(max_memory_mb * 1024**2 / 2 / max(row_bytes, 1)))
+
+    @staticmethod
+    def iter_batches(ldf: pl.LazyFrame, batch_rows: int) -> Iterator[pl.DataFrame]:
+        if hasattr(ldf, "collect_batches"):
+            yield from ldf.collect_batches(chunk_size=batch_rows)
+            return
+
+        # older polars: bounded slices, slice is pushed down into the scan
+        offset = 0
+        while True:
+            batch = ldf.slice(offset, batch_rows).collect()
+            if batch.height == 0:
+                return
+            yield batch
+            offset += batch.height
+
     def _collect(self, df: Union[pl.DataFrame, pl.LazyFrame]) -> pl.DataFrame:
-        return df.collect() if isinstance(df, pl.LazyFrame) else df
+        return df.collect(engine="streaming") if isinstance(df, pl.LazyFrame) else df
 
     @staticmethod
     def is_blank_expr(col: str) -> pl.Expr:
@@ -12,13 +160,11 @@ class BaseValidator:
         Blank detection: NULL, "", "na" (case-insensitive).
         """
         s = pl.col(col).cast(pl.Utf8, strict=False)
-        return s.is_null() | (s == "") | (s.str.to_lowercase() == "na")
+        return s.is_null() | s.is_in(["", "na", "NA", "Na", "nA"])
 
     @staticmethod
-    def export_long_table(results: dict, as_json: bool = False):
-        import json
-
-        rows = [
+    def export_rows(results: dict) -> List[CheckResult]:
+        return [
             {
                 "check": check,
                 "issue_type": "count",
@@ -28,6 +174,18 @@ class BaseValidator:
             for check, payload in results.items()
         ]
 
+    @classmethod
+    def export_long_table(
+        cls, results: dict, as_json: bool = False, as_rows: bool = False
+    ):
+        """
+        Results as polars frame, json string, or result rows (as_rows, nothing serialized).
+        """
+        import json
+
+        rows = cls.export_rows(results)
+        if as_rows:
+            return rows
         if as_json:
             return json.dumps(rows, indent=4)
 
@@ -0,0 +1,237 @@
+import re
+import polars as pl
+from typing import Iterable, List, Optional, Union
+
+from .base_validator import BaseValidator
+
+SAMPLE_ROWS = 10  # row indices kept per variable and check
+PERMITTED_SEPARATORS = re.compile(r"[;|]")
+INTEGER_TYPES = {"integer", "int"}
+NUMERIC_TYPES = {
+    "numeric",
+    "number",
+    "float",
+    "double",
+    "decimal",
+    "continuous",
+    "real",
+}
+
+
+class ConformanceValidator(BaseValidator):
+    """
+    Dataset against dictionary: DataType, MinimumValue/MaximumValue and PermittedValues.
+
+    Each dictionary row becomes polars expressions, all evaluated in one pass over the dataset.
+    Blank cells are never violations, missingness is reported by the structure checks.
+    """
+
+    CHECKS = {"datatype", "range", "permitted_values"}
+    ORDER = ("datatype", "range", "permitted_values")
+
+    def validate_csv(
+        self,
+        dataset_path: str,
+        datadic_path: str,
+        as_json: bool = False,
+        max_memory_mb: Optional[int] = None,
+        checks: Union[str, Iterable[str]] = "all",
+    ):
+        return self.validate_frame(
+            self.scan_file(dataset_path),
+            self.scan_file(datadic_path),
+            as_json,
+            max_memory_mb,
+            checks,
+        )
+
+    def validate_frame(
+        self,
+        df: Union[pl.DataFrame, pl.LazyFrame],
+        datadic: Union[pl.DataFrame, pl.LazyFrame],
+        as_json: bool = False,
+        max_memory_mb: Optional[int] = None,
+        checks: Union[str, Iterable[str]] = "all",
+        as_rows: bool = False,
+    ):
+        checks = self.select(checks, self.CHECKS)
+        ldf = df.lazy()
+        columns, masks = [], []
+        if checks:
+            with self.timed("rules", checks):
+                schema = ldf.collect_schema()
+                rules = self.dictionary_rules(datadic, schema)
+                columns, masks = self.violation_masks(rules, schema, checks)
+
+        counts = [0] * len(masks)
+        samples = [[] for _ in masks]
+        if masks:
+            with self.timed("scan", checks) as record:
+                record["rows"] = 0
+                ldf = ldf.with_row_index("__row")
+                if max_memory_mb:
+                    # parsed columns and masks per row
+                    extra_row_bytes = 16 * len(columns) + len(masks)
+                    batch_rows = self.batch_rows(ldf, max_memory_mb, extra_row_bytes)
+                    batches = (
+                        self.conformance_plan(batch.lazy(), columns, masks).collect()
+                        for batch in self.iter_batches(ldf, batch_rows)
+                    )
+                else:
+                    batches = [
+                        self._collect(self.conformance_plan(ldf, columns, masks))
+                    ]
+
+                for out in batches:
+                    row = out.row(0)
+                    record["rows"] += row[-1]
+                    for n in range(len(masks)):
+                        counts[n] += row[2 * n]
+                        if len(samples[n]) < SAMPLE_ROWS:
+                            samples[n].extend(
+                                row[2 * n + 1][: SAMPLE_ROWS - len(samples[n])]
+                            )
+
+        results = {
+            check: {"count": 0, "issues": []} for check in self.ORDER if check in checks
+        }
+        for (check, variable, _), count, rows in zip(masks, counts, samples):
+            if count:
+                results[check]["count"] += count
+                results[check]["issues"].append(
+                    {"variable": variable, "count": count, "rows": rows}
+                )
+
+        return self.export_long_table(results, as_json, as_rows)
+
+    def dictionary_rules(
+        self, datadic: Union[pl.DataFrame, pl.LazyFrame], schema: pl.Schema
+    ) -> List[dict]:
+        """
+        One rule per dictionary variable present in the dataset, first row wins on duplicates.
+        """
+        dic = datadic.lazy()
+        headers = dic.collect_schema().names()
+        if "VariableName" not in headers:
+            return []
+
+        fields = ["DataType", "MinimumValue", "MaximumValue", "PermittedValues"]
+        rows = self._collect(
+            dic.select(
+                pl.col("VariableName").cast(pl.Utf8),
+                *(
+                    pl.col(f).cast(pl.Utf8)
+                    if f in headers
+                    else pl.lit(None, pl.Utf8).alias(f)
+                    for f in fields
+                ),
+            )
+            .filter(pl.col("VariableName").is_in(schema.names()))
+            .unique("VariableName", keep="first", maintain_order=True)
+        ).to_dicts()
+
+        rules = []
+        for row in rows:
+            permitted = [
+                v.strip()
+                for v in PERMITTED_SEPARATORS.split(row["PermittedValues"] or "")
+                if v.strip()
+            ]
+            rules.append(
+                {
+                    "variable": row["VariableName"],
+                    "datatype": (row["DataType"] or "").strip().lower(),
+                    "min": self.parse_number(row["MinimumValue"]),
+                    "max": self.parse_number(row["MaximumValue"]),
+                    "permitted": permitted,
+                }
+            )
+        return rules
+
+    @staticmethod
+    def parse_number(value: Optional[str]) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def violation_masks(
+        self, rules: List[dict], schema: pl.Schema, checks: set = CHECKS
+    ) -> tuple:
+        """
+        Per variable parsed columns (number, stripped text, present) and
+        (check, variable, boolean expression) masks on them, True where a cell violates a rule.
+        """
+        columns = []
+        masks = []
+        for i, rule in enumerate(rules):
+            c = rule["variable"]
+            present = pl.col(f"__present_{i}")
+            text = pl.col(f"__text_{i}")
+            num = pl.col(f"__num_{i}")
+            valid_num = num.is_not_null() & num.is_finite()
+            has_range = "range" in checks and (
+                rule["min"] is not None or rule["max"] is not None
+            )
+            numeric = "datatype" in checks and (
+                rule["datatype"] in INTEGER_TYPES | NUMERIC_TYPES
+            )
+            permitted = "permitted_values" in checks and rule["permitted"]
+
+            # parse each cell once, masks below only compare
+            if numeric or permitted:
+                columns.append((~self.is_blank_expr(c)).alias(f"__present_{i}"))
+            stripped = pl.col(c).cast(pl.Utf8).str.strip_chars()
+            if permitted:
+                columns.append(stripped.alias(f"__text_{i}"))
+            if numeric or has_range:
+                columns.append(
+                    (pl.col(c) if schema[c].is_numeric() else stripped)
+                    .cast(pl.Float64, strict=False)
+                    .alias(f"__num_{i}")
+                )
+
+            if numeric and rule["datatype"] in INTEGER_TYPES:
+                ok = valid_num & (num == num.floor())
+                masks.append(("datatype", c, present & ~ok.fill_null(False)))
+            elif numeric:
+                masks.append(("datatype", c, present & ~valid_num))
+
+            if has_range:
+                out_of_range = pl.lit(False)
+                if rule["min"] is not None:
+                    out_of_range = out_of_range | (num < rule["min"])
+                if rule["max"] is not None:
+                    out_of_range = out_of_range | (num > rule["max"])
+                masks.append(("range", c, valid_num & out_of_range.fill_null(False)))
+
+            if permitted:
+                not_allowed = ~text.is_in(rule["permitted"]).fill_null(False)
+                masks.append(("permitted_values", c, present & not_allowed))
+        return columns, masks
+
+    @staticmethod
+    def conformance_plan(ldf: pl.LazyFrame, columns: list, masks: list) -> pl.LazyFrame:
+        """
+        Parse, then masks, then violation count and first row indices per mask, row count last.
+        Separate stages so each parsed column is computed once however many masks use it.
+        """
+        mask_exprs = [pl.col("__row")] + [
+            expr.fill_null(False).alias(f"__m_{n}")
+            for n, (_, _, expr) in enumerate(masks)
+        ]
+        agg_exprs = []
+        for n in range(len(masks)):
+            m = pl.col(f"__m_{n}")
+            agg_exprs += [
+                m.sum().alias(f"__count_{n}"),
+                pl.col("__row")
+                .filter(m)
+                .head(SAMPLE_ROWS)
+                .implode()
+                .alias(f"__rows_{n}"),
+            ]
+        agg_exprs.append(pl.len().alias("__rows"))
+        return (
+            ldf.select(pl.col("__row"), *columns).select(mask_exprs).select(agg_exprs)
+        )
@@ -0,0 +1,65 @@
+from enum import IntEnum
+from typing import Dict, Iterable, NamedTuple, Optional, Set
+
+
+class Cost(IntEnum):
+    HEADER = 0  # column names only, data never read
+    SCAN = 1  # one streaming pass over the data
+    HEAVY = 2  # per row state (hash index) or a second pass over candidate columns
+
+
+class Check(NamedTuple):
+    kind: str  # structure, schema or conformance
+    id: str  # name inside the validator
+    cost: Cost
+
+
+# keyed by the name shown as "check" in results, which is also what the API accepts
+CHECKS: Dict[str, Check] = {
+    "blank_header": Check("structure", "blank_header", Cost.HEADER),
+    "duplicated_header": Check("structure", "dup_header", Cost.HEADER),
+    "minimal_var": Check("structure", "min_vars", Cost.HEADER),
+    "blank_row": Check("structure", "blank_row", Cost.SCAN),
+    "blank_column": Check("structure", "blank_column", Cost.SCAN),
+    "duplicated_row": Check("structure", "dup_row", Cost.HEAVY),
+    "duplicated_column": Check("structure", "dup_column", Cost.HEAVY),
+    "data_dic_headers": Check("schema", "dic_header", Cost.HEADER),
+    "missing_minimal_var": Check("schema", "min_vars", Cost.SCAN),
+    "missing_title": Check("schema", "miss_title", Cost.SCAN),
+    "missing_description": Check("schema", "miss_description", Cost.SCAN),
+    "other_symbols": Check("schema", "other_symbols", Cost.SCAN),
+    "pos1_char": Check("schema", "pos1_char", Cost.SCAN),
+    "under_64char": Check("schema", "under_64char", Cost.SCAN),
+    "datatype": Check("conformance", "datatype", Cost.SCAN),
+    "range": Check("conformance", "range", Cost.SCAN),
+    "permitted_values": Check("conformance", "permitted_values", Cost.SCAN),
+}
+
+KINDS = ("structure", "schema", "conformance")
+
+
+def unknown_checks(names: Iterable[str]) -> list:
+    return [n for n in names if n not in CHECKS]
+
+
+def select_checks(
+    kind: str, names: Optional[Iterable[str]] = None
+) -> Optional[Set[str]]:
+    """
+    Validator check ids of kind for the requested check names, None = validator defaults.
+    """
+    if names is None:
+        return None
+    return {CHECKS[n].id for n in names if CHECKS[n].kind == kind}
+
+
+def kind_cost(kind: str, names: Optional[Iterable[str]] = None) -> Optional[Cost]:
+    """
+    Most expensive requested check of kind, None when nothing of kind is requested.
+    """
+    costs = [
+        c.cost
+        for n, c in CHECKS.items()
+        if c.kind == kind and (names is None or n in names)
+    ]
+    return max(costs) if costs else None
@@ -1,10 +1,20 @@
 import polars as pl
+from typing import Iterable, Union
 
 from .base_validator import BaseValidator
 from . import MINIMAL_VARS
 
 
 class SchemaValidator(BaseValidator):
+    CHECKS = {
+        "dic_header",
+        "min_vars",
+        "miss_title",
+        "miss_description",
+        "other_symbols",
+        "pos1_char",
+        "under_64char",
+    }
     STANDARD_HEADERS = [
         "VariableName",
         "Title",
@@ -18,127 +28,92 @@ class SchemaValidator(BaseValidator):
     ]
 
     def validate_csv(
-        self, datadic_path: str, sch_checks: str = "all", as_json: bool = False
+        self,
+        datadic_path: str,
+        sch_checks: Union[str, Iterable[str]] = "all",
+        as_json: bool = False,
     ):
-        ldf = pl.scan_csv(datadic_path)
+        return self.validate_frame(self.scan_file(datadic_path), sch_checks, as_json)
+
+    def validate_frame(
+        self,
+        df: Union[pl.DataFrame, pl.LazyFrame],
+        sch_checks: Union[str, Iterable[str]] = "all",
+        as_json: bool = False,
+        as_rows: bool = False,
+    ):
+        ldf = df.lazy()
         headers = ldf.collect_schema().names()
 
-        checks = (
-            {
-                "dic_header",
-                "min_vars",
-                "miss_title",
-                "miss_description",
-                "other_symbols",
-                "pos1_char",
-                "under_64char",
-            }
-            if sch_checks == "all"
-            else {
-                "dic_header",
-                "miss_title",
-                "miss_description",
-                "other_symbols",
-                "pos1_char",
-                "under_64char",
-            }
-        )
+        checks = self.select(sch_checks, self.CHECKS)
 
         results = {}
 
         # Required headers
         if "dic_header" in checks:
-            missing = [h for h in self.STANDARD_HEADERS if h not in headers]
-            results["data_dic_headers"] = {
-                "count": len(missing),
-                "issues": missing,
-            }
-
-        if "VariableName" not in headers:
-            return self.export_long_table(results, as_json)
-
-        # Collect required columns only
-        df = ldf.select(
-            pl.col("VariableName"),
-            pl.col("Title") if "Title" in headers else pl.lit(None).alias("Title"),
-            pl.col("Description")
+            with self.timed("header", {"dic_header"}):
+                missing = [h for h in self.STANDARD_HEADERS if h not in headers]
+                results["data_dic_headers"] = {
+                    "count": len(missing),
+                    "issues": missing,
+                }
+
+        # header only request: dictionary rows never read
+        if "VariableName" not in headers or not checks - {"dic_header"}:
+            return self.export_long_table(results, as_json, as_rows)
+
+        # All checks in one query, only failing names are materialized
+        name = pl.col("VariableName")
+        title_blank = (
+            self.is_blank_expr("Title") if "Title" in headers else pl.lit(True)
+        )
+        description_blank = (
+            self.is_blank_expr("Description")
             if "Description" in headers
-            else pl.lit(None).alias("Description"),
-        ).collect(streaming=True)
-
-        vars_df = df.select("VariableName").drop_nulls()
-        var_list = vars_df["VariableName"].to_list()
-
-        # Minimal variables
+            else pl.lit(True)
+        )
+        conditions = {
+            "min_vars": name.is_in(list(set(MINIMAL_VARS))),
+            "miss_title": title_blank,
+            "miss_description": description_blank,
+            "other_symbols": name.str.contains(r"[^A-Za-z0-9_.]"),
+            "pos1_char": ~name.str.contains(r"^[A-Za-z]"),
+            "under_64char": name.str.len_chars() > 60,
+        }
+        with self.timed("scan", checks & conditions.keys()) as record:
+            found = self._collect(
+                ldf.select(
+                    pl.len().alias("__rows"),
+                    *(
+                        name.filter(cond & name.is_not_null()).implode().alias(check)
+                        for check, cond in conditions.items()
+                        if check in checks
+                    ),
+                )
+            ).row(0, named=True)
+            record["rows"] = found["__rows"]
+
+        # Minimal variables, set lookup over the few present ones
         if "min_vars" in checks:
-            missing = [v for v in MINIMAL_VARS if v not in var_list]
+            present = set(found["min_vars"])
+            missing = [v for v in MINIMAL_VARS if v not in present]
             results["missing_minimal_var"] = {
                 "count": len(missing),
                 "issues": missing,
             }
 
-        # Missing Title
-        if "miss_title" in checks:
-            bad = (
-                df.filter(self.is_blank_expr("Title"))
-                .select("VariableName")
-                .drop_nulls()
-                .to_series()
-                .to_list()
-            )
-            results["missing_title"] = {
-                "count": len(bad),
-                "issues": bad,
-            }
-
-        # Missing Description
-        if "miss_description" in checks:
-            bad = (
-                df.filter(self.is_blank_expr("Description"))
-                .select("VariableName")
-                .drop_nulls()
-                .to_series()
-                .to_list()
-            )
-            results["missing_description"] = {
-                "count": len(bad),
-                "issues": bad,
-            }
-
-        # Invalid characters in VariableName
-        if "other_symbols" in checks:
-            bad = (
-                vars_df.filter(pl.col("VariableName").str.contains(r"[^A-Za-z0-9_.]"))
-                .to_series()
-                .to_list()
-            )
-            results["other_symbols"] = {
-                "count": len(bad),
-                "issues": bad,
-            }
-
-        # First character must be a letter (FIXED)
-        if "pos1_char" in checks:
-            bad = (
-                vars_df.filter(~pl.col("VariableName").str.contains(r"^[A-Za-z]"))
-                .to_series()
-                .to_list()
-            )
-            results["pos1_char"] = {
-                "count": len(bad),
-                "issues": bad,
-            }
-
-        # Variable name too long
-        if "under_64char" in checks:
-            bad = (
-                vars_df.filter(pl.col("VariableName").str.len_chars() > 60)
-                .to_series()
-                .to_list()
-            )
-            results["under_64char"] = {
-                "count": len(bad),
-                "issues": bad,
-            }
-
-        return self.export_long_table(results, as_json)
+        for check, key in (
+            ("miss_title", "missing_title"),  # Missing Title
+            ("miss_description", "missing_description"),  # Missing Description
+            ("other_symbols", "other_symbols"),  # Invalid characters in VariableName
+            ("pos1_char", "pos1_char"),  # First character must be a letter
+            ("under_64char", "under_64char"),  # Variable name too long
+        ):
+            if check in checks:
+                bad = found[check]
+                results[key] = {
+                    "count": len(bad),
+                    "issues": bad,
+                }
+
+        return self.export_long_table(results, as_json, as_rows)
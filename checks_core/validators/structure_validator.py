@@ -1,124 +1,293 @@
 import polars as pl
-import hashlib
+from typing import Iterable, Optional, Union
 from .base_validator import BaseValidator
 from . import MINIMAL_VARS
 
 
-# aggressive memory management: keep hashes, drop concatenated strings immediately
-def detect_duplicate_rows(df: pl.DataFrame):
-    row_hash = df.select(
-        pl.concat_str(pl.all(), separator="|").hash().alias("row_hash")
-    )
-    duplicated_mask = row_hash["row_hash"].is_duplicated()
-    dup_count: int = duplicated_mask.sum()
-    dup_hashes = row_hash.filter(duplicated_mask).to_series().to_list()
-
-    del row_hash, duplicated_mask  # intermediate objects
-
-    return {"count": dup_count, "issues": dup_hashes}
-
-
 class StructureValidator(BaseValidator):
+    CHECKS = {
+        "blank_header",
+        "dup_header",
+        "blank_row",
+        "blank_column",
+        "dup_row",
+        "dup_column",
+        "min_vars",
+    }
+    CONTENT_CHECKS = {"blank_row", "blank_column", "dup_row", "dup_column"}
+
     def validate_csv(
-        self, file_path: str, str_checks: str = "all", as_json: bool = False
+        self,
+        file_path: str,
+        str_checks: Union[str, Iterable[str]] = "all",
+        as_json: bool = False,
+        max_memory_mb: Optional[int] = None,
     ):
-        ldf = pl.scan_csv(file_path)
+        return self.validate_frame(
+            self.scan_file(file_path), str_checks, as_json, max_memory_mb
+        )
+
+    def validate_frame(
+        self,
+        df: Union[pl.DataFrame, pl.LazyFrame],
+        str_checks: Union[str, Iterable[str]] = "all",
+        as_json: bool = False,
+        max_memory_mb: Optional[int] = None,
+        as_rows: bool = False,
+    ):
+        ldf = df.lazy()
         schema = ldf.collect_schema()
         columns = schema.names()
 
-        checks = (
-            {
-                "blank_header",
-                "dup_header",
-                "blank_row",
-                "blank_column",
-                "dup_row",
-                "dup_column",
-                "min_vars",
-            }
-            if str_checks == "all"
-            else {
-                "blank_header",
-                "dup_header",
-                "blank_row",
-                "blank_column",
-                "dup_row",
-                "dup_column",
-            }
-        )
+        checks = self.select(str_checks, self.CHECKS)
 
         results = {}
 
-        # Blank header
-        if "blank_header" in checks:
-            idx = [i for i, c in enumerate(columns) if c == ""]
-            results["blank_header"] = {"count": len(idx), "issues": idx}
-
-        # Duplicated headers
-        if "dup_header" in checks:
-            dup = (
-                pl.Series("header", columns)
-                .value_counts()
-                .filter(pl.col("count") > 1)
-                .select("header")
-                .to_series()
-                .to_list()
+        with self.timed("header", checks & {"blank_header", "dup_header"}):
+            # Blank header
+            if "blank_header" in checks:
+                idx = [i for i, c in enumerate(columns) if c == ""]
+                results["blank_header"] = {"count": len(idx), "issues": idx}
+
+            # Duplicated headers
+            if "dup_header" in checks:
+                dup = (
+                    pl.Series("header", columns)
+                    .value_counts()
+                    .filter(pl.col("count") > 1)
+                    .select("header")
+                    .to_series()
+                    .to_list()
+                )
+                results["duplicated_header"] = {"count": len(dup), "issues": dup}
+
+        # Only scan data if any content-based checks are required
+        if columns and checks.intersection(self.CONTENT_CHECKS):
+            results.update(self.content_checks(ldf, schema, checks, max_memory_mb))
+
+        # Minimal required variables
+        if "min_vars" in checks:
+            with self.timed("min_vars", {"min_vars"}):
+                missing = [v for v in MINIMAL_VARS if v not in columns]
+                results["minimal_var"] = {"count": len(missing), "issues": missing}
+
+        del schema  # no longer needed
+
+        return self.export_long_table(results, as_json, as_rows)
+
+    def content_checks(
+        self,
+        ldf: pl.LazyFrame,
+        schema: pl.Schema,
+        checks: set,
+        max_memory_mb: Optional[int] = None,
+    ) -> dict:
+        """
+        All content checks in one pass, batched when a memory budget is given.
+        """
+        if max_memory_mb:
+            return self.content_checks_batched(ldf, schema, checks, max_memory_mb)
+
+        with self.timed("scan", checks & self.CONTENT_CHECKS) as record:
+            out = self._collect(self.content_plan(ldf, schema, checks))
+            partial = self.partial_row(out)
+            record["rows"] = partial["__rows"]
+        row_hashes = out["row_hashes"].explode() if "dup_row" in checks else None
+
+        fingerprints = [partial.get(f"__fp_{i}") for i in range(len(schema.names()))]
+        return self.content_results(
+            ldf, schema, checks, partial, row_hashes, fingerprints
+        )
+
+    def content_checks_batched(
+        self, ldf: pl.LazyFrame, schema: pl.Schema, checks: set, max_memory_mb: int
+    ) -> dict:
+        """
+        Out-of-core variant: read data in batches sized to the memory budget and merge
+        per-batch state (blank counts and flags, row hashes, per-column fingerprints).
+
+        Only the row hash index grows with the data, 8 bytes per row when dup_row is checked.
+        """
+        columns = schema.names()
+        # blank masks, row hash, column hashes and the concatenated row string per row
+        plan_row_bytes = 9 * len(columns) + 8
+        batch_rows = self.batch_rows(ldf, max_memory_mb, plan_row_bytes)
+
+        partial = {"blank_row": 0}
+        partial.update({f"__blank_col_{i}": True for i in range(len(columns))})
+        row_hashes = []
+        fingerprints = [[] for _ in columns]
+
+        with self.timed("scan", checks & self.CONTENT_CHECKS) as record:
+            record["rows"] = 0
+            for batch in self.iter_batches(ldf, batch_rows):
+                out = self.content_plan(batch.lazy(), schema, checks).collect()
+                batch_partial = self.partial_row(out)
+                record["rows"] += batch_partial["__rows"]
+
+                if "blank_row" in checks:
+                    partial["blank_row"] += batch_partial["blank_row"]
+                for i in range(len(columns)):
+                    if "blank_column" in checks:
+                        partial[f"__blank_col_{i}"] &= batch_partial[f"__blank_col_{i}"]
+                    if "dup_column" in checks:
+                        fingerprints[i].append(batch_partial[f"__fp_{i}"])
+                if "dup_row" in checks:
+                    row_hashes.append(out["row_hashes"].explode())
+                del out, batch
+
+        if "dup_row" in checks:
+            row_hashes = (
+                pl.concat(row_hashes)
+                if row_hashes
+                else pl.Series("row_hashes", [], dtype=pl.UInt64)
             )
-            results["duplicated_header"] = {"count": len(dup), "issues": dup}
 
-        # Only collect if any content-based checks are required
-        content_checks = {"blank_row", "blank_column", "dup_row", "dup_column"}
-        if checks.intersection(content_checks):
-            df = ldf.collect(streaming=True)
+        return self.content_results(
+            ldf,
+            schema,
+            checks,
+            partial,
+            row_hashes,
+            [tuple(fp) for fp in fingerprints],
+            batch_rows,
+        )
 
-            # Blank rows
-            if "blank_row" in checks:
-                mask = df.select(
-                    pl.all_horizontal([self.is_blank_expr(c) for c in columns])
-                )
-                count = mask.filter(pl.all()).height
-                results["blank_row"] = {"count": count, "issues": []}
-                del mask
+    @staticmethod
+    def partial_row(out: pl.DataFrame) -> dict:
+        # aggregates other than row hashes, at least the row count
+        return out.drop("row_hashes", strict=False).row(0, named=True)
 
-            # Blank columns
-            if "blank_column" in checks:
-                blank_cols = [
-                    c for c in columns if df.select(self.is_blank_expr(c).all()).item()
-                ]
-                results["blank_column"] = {
-                    "count": len(blank_cols),
-                    "issues": blank_cols,
-                }
+    def content_plan(
+        self, ldf: pl.LazyFrame, schema: pl.Schema, checks: set
+    ) -> pl.LazyFrame:
+        """
+        Compile content checks into one lazy query: blank masks, row hashes and
+        column hashes computed once per row, then all aggregates in the same pass.
+        """
+        columns = schema.names()
+        idx = range(len(columns))
+        blank = [pl.col(f"__blank_{i}") for i in idx]
 
-            # Duplicated rows
-            if "dup_row" in checks:
-                results["duplicated_row"] = detect_duplicate_rows(df)
+        row_exprs = []
+        agg_exprs = [pl.len().alias("__rows")]
+        if checks.intersection({"blank_row", "blank_column"}):
+            row_exprs += [
+                self.is_blank_expr(c).alias(f"__blank_{i}")
+                for i, c in enumerate(columns)
+            ]
+        if "blank_row" in checks:
+            agg_exprs.append(pl.all_horizontal(blank).sum().alias("blank_row"))
+        if "blank_column" in checks:
+            agg_exprs += [b.all().alias(f"__blank_col_{i}") for i, b in zip(idx, blank)]
+        if "dup_row" in checks:
+            # keep hashes only, concatenated strings never materialized
+            row_exprs.append(
+                pl.concat_str(pl.all(), separator="|").hash().alias("__row_hash")
+            )
+            agg_exprs.append(pl.col("__row_hash").implode().alias("row_hashes"))
+        if "dup_column" in checks:
+            # order sensitive fingerprint per column, compared as text like csv values
+            row_exprs += [
+                pl.col(c).cast(pl.Utf8).hash(seed=0).alias(f"__hash_{i}")
+                for i, c in enumerate(columns)
+            ]
+            agg_exprs += [
+                pl.col(f"__hash_{i}").implode().hash(seed=1).alias(f"__fp_{i}")
+                for i in idx
+            ]
 
-            # Duplicated columns
-            if "dup_column" in checks:
-                col_hashes = {
-                    c: hashlib.md5("".join(map(str, df[c])).encode()).hexdigest()
-                    for c in columns
-                }
-                seen = {}
-                dup_cols = []
-                for c, h in col_hashes.items():
-                    if h in seen:
-                        dup_cols.append(c)
-                    else:
-                        seen[h] = c
-                results["duplicated_column"] = {
-                    "count": len(dup_cols),
-                    "issues": dup_cols,
+        return ldf.select(row_exprs).select(agg_exprs)
+
+    def content_results(
+        self,
+        ldf: pl.LazyFrame,
+        schema: pl.Schema,
+        checks: set,
+        partial: dict,
+        row_hashes: Optional[pl.Series],
+        fingerprints: list,
+        batch_rows: Optional[int] = None,
+    ) -> dict:
+        columns = schema.names()
+        results = {}
+        if "blank_row" in checks:
+            results["blank_row"] = {"count": partial["blank_row"], "issues": []}
+        if "blank_column" in checks:
+            blank_cols = [
+                c for i, c in enumerate(columns) if partial[f"__blank_col_{i}"]
+            ]
+            results["blank_column"] = {"count": len(blank_cols), "issues": blank_cols}
+        if "dup_row" in checks:
+            with self.timed("dup_row", {"dup_row"}) as record:
+                record["rows"] = row_hashes.len()
+                mask = self.duplicated_mask(row_hashes)
+                results["duplicated_row"] = {
+                    "count": int(mask.sum()),
+                    "issues": row_hashes.filter(mask).to_list(),
                 }
+                del mask
+        if "dup_column" in checks:
+            with self.timed("dup_column", {"dup_column"}):
+                dup_cols = self.confirm_duplicate_columns(
+                    ldf, schema, fingerprints, batch_rows
+                )
+            results["duplicated_column"] = {"count": len(dup_cols), "issues": dup_cols}
 
-            del df
+        return results
 
-        # Minimal required variables
-        if "min_vars" in checks:
-            missing = [v for v in MINIMAL_VARS if v not in columns]
-            results["minimal_var"] = {"count": len(missing), "issues": missing}
+    @staticmethod
+    def duplicated_mask(hashes: pl.Series) -> pl.Series:
+        """
+        Same as is_duplicated, but sort based: no hash table over every row, only a sorted copy.
+        """
+        s = hashes.sort()
+        dup_values = s.filter((s == s.shift(1)) | (s == s.shift(-1))).unique()
+        del s
+        return hashes.is_in(dup_values)
 
-        del schema  # no longer needed
+    def confirm_duplicate_columns(
+        self,
+        ldf: pl.LazyFrame,
+        schema: pl.Schema,
+        fingerprints: list,
+        batch_rows: Optional[int] = None,
+    ) -> list:
+        """
+        Exact comparison of columns sharing a fingerprint, so hash collisions are never reported.
+
+        Only candidate columns are read again, all pairs checked in one query (per batch).
+        """
+        columns = schema.names()
+        groups = {}
+        for c, fp in zip(columns, fingerprints):
+            groups.setdefault(fp, []).append(c)
+
+        pairs = [
+            (a, b)
+            for members in groups.values()
+            for i, b in enumerate(members)
+            for a in members[:i]
+        ]
+        if not pairs:
+            return []
+
+        def as_text(c):
+            return pl.col(c) if schema[c] == pl.Utf8 else pl.col(c).cast(pl.Utf8)
+
+        exprs = [
+            as_text(a).eq_missing(as_text(b)).all().alias(f"__eq_{n}")
+            for n, (a, b) in enumerate(pairs)
+        ]
+        if batch_rows:
+            candidates = list(dict.fromkeys(c for pair in pairs for c in pair))
+            equal = [True] * len(pairs)
+            for batch in self.iter_batches(ldf.select(candidates), batch_rows):
+                batch_equal = batch.select(exprs).row(0)
+                equal = [e and b for e, b in zip(equal, batch_equal)]
+        else:
+            equal = self._collect(ldf.select(exprs)).row(0)
 
-        return self.export_long_table(results, as_json)
+        # first column of each identical set is the original, later ones are duplicates
+        dups = {b for (_, b), same in zip(pairs, equal) if same}
+        return [c for c in columns if c in dups]
@@ -1,45 +1,373 @@
-import json
+import asyncio
 import os
+import time
+import polars as pl
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
 
-from server.models import DatasetRequest, DataDictionaryRequest
-from server.helper import json_rows_to_df, df_to_temp_csv
+from server.models import DatasetRequest, DataDictionaryRequest, ValidationOptions
+from server.helper import json_rows_to_df
+from server.cache import Source, cached_result, source_cache_key, lookup
+from server.metrics import record_stage, record_validation
+from validators.base_validator import BaseValidator, CheckResult
 from validators.structure_validator import StructureValidator
 from validators.schema_validator import SchemaValidator
+from validators.conformance_validator import ConformanceValidator
+from validators.registry import KINDS, Cost, kind_cost, select_checks
+
+# cpu bound checks run here, never on the event loop
+executor: Optional[Executor] = None
+
+# server wide memory budget for structure checks, 0 = whole dataset in one pass
+DEFAULT_MAX_MEMORY_MB = int(os.getenv("VALIDATION_MAX_MEMORY_MB", 0))
+PREVIEW_CONFIG = {
+    "rows": int(os.getenv("PREVIEW_ROWS", 10000)),
+    "max_issues": int(os.getenv("PREVIEW_MAX_ISSUES", 100)),
+}
+
+
+# setup global executor, "thread" (polars releases GIL) or "process" (isolated memory per job)
+def init_executor():
+    global executor
+    if executor is None:
+        kind = os.getenv("VALIDATION_EXECUTOR", "thread").lower()
+        workers = int(os.getenv("VALIDATION_WORKERS") or 0) or os.cpu_count() or 1
+        if kind == "process":
+            # 1 = fresh process per job, memory goes back to OS after each job
+            tasks_per_child = int(os.getenv("VALIDATION_MAX_TASKS_PER_CHILD", 1))
+            executor = ProcessPoolExecutor(
+                max_workers=workers, max_tasks_per_child=tasks_per_child or None
+            )
+        elif kind == "thread":
+            executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="validation"
+            )
+        else:
+            raise ValueError(
+                f"Unknown VALIDATION_EXECUTOR '{kind}', use 'thread' or 'process'"
+            )
+
+
+def shutdown_executor():
+    global executor
+    if executor:
+        executor.shutdown(wait=True, cancel_futures=True)
+        executor = None
+
+
+async def run_in_executor(fn, *args):
+    init_executor()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, fn, *args)
+
+
+async def run_timed(kind: str, source: Union[Source, tuple], fn, *args) -> list:
+    """
+    Run a validate_* function in the executor and record its timings as metrics.
+    """
+    start = time.perf_counter()
+    rows, timings = await run_in_executor(fn, *args)
+    record_validation(kind, time.perf_counter() - start, input_bytes(source), timings)
+    return rows
+
+
+def input_bytes(source: Union[Source, tuple]) -> Optional[int]:
+    """
+    File size or estimated in-memory size, None for lazy frames.
+    """
+    if isinstance(source, tuple):
+        sizes = [input_bytes(s) for s in source]
+        return None if None in sizes else sum(sizes)
+    if isinstance(source, str):
+        return os.path.getsize(source) if os.path.exists(source) else None
+    if isinstance(source, pl.DataFrame):
+        return source.estimated_size()
+    return None
 
 
 async def run_both_validations(
-    dataset: DatasetRequest, datadic: DataDictionaryRequest
+    dataset: DatasetRequest,
+    datadic: DataDictionaryRequest,
+    options: Optional[ValidationOptions] = None,
 ) -> dict:
     """
     Wrapper function run structure and schema checks.
 
     expect dataset and datadic in json format
     """
-    dataset_df = json_rows_to_df(dataset.rows)
-    datadic_df = json_rows_to_df(datadic.rows)
+    start = time.perf_counter()
+    dataset_df = await asyncio.to_thread(json_rows_to_df, dataset.rows)
+    datadic_df = await asyncio.to_thread(json_rows_to_df, datadic.rows)
+    record_stage(
+        "ingest",
+        "json_rows",
+        time.perf_counter() - start,
+        len(dataset.rows) + len(datadic.rows),
+    )
 
-    dataset_csv = df_to_temp_csv(dataset_df)
-    datadic_csv = df_to_temp_csv(datadic_df)
+    return await run_source_validations(dataset_df, datadic_df, options)
 
-    try:
-        structure_validator = StructureValidator()
-        schema_validator = SchemaValidator()
 
-        structure_json = structure_validator.validate_csv(dataset_csv, as_json=True)
-        schema_json = schema_validator.validate_csv(datadic_csv, as_json=True)
+async def run_file_validations(
+    dataset_path: str,
+    datadic_path: str,
+    options: Optional[ValidationOptions] = None,
+    schema: Optional[list] = None,
+) -> dict:
+    """
+    Run structure and schema checks on files already on disk (csv or parquet).
 
-        structure_data = json.loads(structure_json)
-        schema_data = json.loads(schema_json)
+    Schema rows already checked for this dictionary are reused when given. Caller is
+    responsible for deleting files.
+    """
+    return await run_source_validations(dataset_path, datadic_path, options, schema)
 
-        # return a plain dict, TaskInfo.result can store this
-        return {
-            "structure": structure_data,
+
+async def run_source_validations(
+    dataset: Source,
+    datadic: Source,
+    options: Optional[ValidationOptions] = None,
+    schema: Optional[list] = None,
+) -> dict:
+    # independent so a changed dictionary still reuses the cached dataset result
+    runs = {
+        "structure": lambda: run_structure_validation(dataset, options),
+        "schema": lambda: run_schema_validation(datadic, options),
+        "conformance": lambda: run_conformance_validation(dataset, datadic, options),
+    }
+    if schema is not None:  # dictionary checked once for its whole batch
+        runs["schema"] = lambda: asyncio.sleep(0, schema)
+    # cheapest kinds reach the executor first, heavy scans queue behind them
+    order = sorted(runs, key=lambda kind: kind_cost(kind, checks_of(options)) or 0)
+    results = await asyncio.gather(*(runs[kind]() for kind in order))
+
+    # return a plain dict, TaskInfo.result can store this
+    data = dict(zip(order, results))
+    return mark_preview({kind: data[kind] for kind in KINDS}, options)
+
+
+async def run_batch_validations(
+    datasets: List[Source], datadic: Source, options: Optional[ValidationOptions] = None
+) -> dict:
+    """
+    Check the dictionary once and all datasets in parallel (bounded by the executor).
+    """
+    schema_data, structure_data, conformance_data = await asyncio.gather(
+        run_schema_validation(datadic, options),
+        asyncio.gather(
+            *(run_structure_validation(dataset, options) for dataset in datasets)
+        ),
+        asyncio.gather(
+            *(
+                run_conformance_validation(dataset, datadic, options)
+                for dataset in datasets
+            )
+        ),
+    )
+    return mark_preview(
+        {
             "schema": schema_data,
-        }
-
-    finally:
-        for path in (dataset_csv, datadic_csv):
-            try:
-                os.remove(path)
-            except OSError:
-                pass
+            "structure": structure_data,
+            "conformance": conformance_data,
+        },
+        options,
+    )
+
+
+async def run_checks(
+    kind: str,
+    source: Union[Source, tuple],
+    params: dict,
+    compute: Callable[[], Awaitable[list]],
+    options: Optional[ValidationOptions] = None,
+) -> list:
+    cost = kind_cost(kind, checks_of(options))
+    if cost is None:
+        return []  # nothing of this kind requested, input not read
+    limits = preview_limits(options)
+    if limits is not None:
+        # never cached: fingerprinting a huge input would cost more than the preview
+        return bound_issues(await compute(), limits["max_issues"])
+    if cost == Cost.HEADER:
+        return await compute()  # cheaper than fingerprinting the input for the cache
+    return await cached_result(kind, source, params, compute)
+
+
+async def run_structure_validation(
+    dataset: Source, options: Optional[ValidationOptions] = None
+) -> List[CheckResult]:
+    return await run_checks(
+        "structure",
+        dataset,
+        structure_params(options),
+        lambda: run_timed("structure", dataset, validate_structure, dataset, options),
+        options,
+    )
+
+
+async def run_schema_validation(
+    datadic: Source, options: Optional[ValidationOptions] = None
+) -> List[CheckResult]:
+    return await run_checks(
+        "schema",
+        datadic,
+        schema_params(options),
+        lambda: run_timed("schema", datadic, validate_schema, datadic, options),
+        options,
+    )
+
+
+async def run_conformance_validation(
+    dataset: Source, datadic: Source, options: Optional[ValidationOptions] = None
+) -> List[CheckResult]:
+    return await run_checks(
+        "conformance",
+        (dataset, datadic),
+        conformance_params(options),
+        lambda: run_timed(
+            "conformance",
+            (dataset, datadic),
+            validate_conformance,
+            dataset,
+            datadic,
+            options,
+        ),
+        options,
+    )
+
+
+async def lookup_cached_validations(
+    dataset: Source, datadic: Source, options: Optional[ValidationOptions] = None
+) -> Optional[dict]:
+    """
+    All results if already cached, else None.
+    """
+    sources = {
+        "structure": dataset,
+        "schema": datadic,
+        "conformance": (dataset, datadic),
+    }
+    params = {
+        "structure": structure_params(options),
+        "schema": schema_params(options),
+        "conformance": conformance_params(options),
+    }
+    if preview_limits(options) is not None:
+        return None
+    results = {}
+    for kind in KINDS:
+        cost = kind_cost(kind, checks_of(options))
+        if cost is None:
+            results[kind] = []
+            continue
+        if cost == Cost.HEADER:
+            return None  # never cached, cheap enough to run as a task
+        key = await source_cache_key(kind, sources[kind], params[kind])
+        results[kind] = await lookup(key)
+        if results[kind] is None:
+            return None
+
+    return results
+
+
+def checks_of(options: Optional[ValidationOptions]) -> Optional[List[str]]:
+    return options.checks if options is not None else None
+
+
+def selected(kind: str, options: Optional[ValidationOptions]):
+    checks = select_checks(kind, checks_of(options))
+    return "all" if checks is None else sorted(checks)
+
+
+# everything that changes the result goes in the cache key
+def structure_params(options: Optional[ValidationOptions] = None) -> dict:
+    return {"str_checks": selected("structure", options)}
+
+
+def schema_params(options: Optional[ValidationOptions] = None) -> dict:
+    return {"sch_checks": selected("schema", options)}
+
+
+def conformance_params(options: Optional[ValidationOptions] = None) -> dict:
+    return {"checks": selected("conformance", options)}
+
+
+def preview_limits(options: Optional[ValidationOptions]) -> Optional[dict]:
+    if options is None or options.mode != "preview":
+        return None
+    return {
+        "rows": options.preview_rows or PREVIEW_CONFIG["rows"],
+        "max_issues": options.preview_max_issues or PREVIEW_CONFIG["max_issues"],
+    }
+
+
+def mark_preview(result: dict, options: Optional[ValidationOptions]) -> dict:
+    limits = preview_limits(options)
+    if limits is not None:
+        result.update(partial=True, preview=limits)
+    return result
+
+
+def bound_issues(rows: list, max_issues: int) -> list:
+    """
+    Preview rows: marked partial, issue lists cut after max_issues.
+    """
+    for row in rows:
+        row["partial"] = True
+        if len(row.get("issue") or []) > max_issues:
+            row["issue"] = row["issue"][:max_issues]
+            row["truncated"] = True
+    return rows
+
+
+def as_frame(
+    source: Source, options: Optional[ValidationOptions] = None
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Frame for source, only its first rows in preview mode (head is pushed into the scan).
+    """
+    frame = BaseValidator.scan_file(source) if isinstance(source, str) else source
+    limits = preview_limits(options)
+    return frame.head(limits["rows"]) if limits is not None else frame
+
+
+# module level so process pool can pickle them, paths are cheaper to send than frames
+# result rows are returned as plain dicts, serialized once where they leave the process
+# stage timings come back with them, metrics are recorded in the server process
+def validate_structure(
+    dataset: Source, options: Optional[ValidationOptions] = None
+) -> Tuple[List[CheckResult], List[dict]]:
+    max_memory_mb = (options and options.max_memory_mb) or DEFAULT_MAX_MEMORY_MB
+    validator = StructureValidator()
+    rows = validator.validate_frame(
+        as_frame(dataset, options),
+        selected("structure", options),
+        max_memory_mb=max_memory_mb or None,
+        as_rows=True,
+    )
+    return rows, validator.timings
+
+
+def validate_schema(
+    datadic: Source, options: Optional[ValidationOptions] = None
+) -> Tuple[List[CheckResult], List[dict]]:
+    validator = SchemaValidator()
+    rows = validator.validate_frame(
+        as_frame(datadic, options), selected("schema", options), as_rows=True
+    )
+    return rows, validator.timings
+
+
+def validate_conformance(
+    dataset: Source, datadic: Source, options: Optional[ValidationOptions] = None
+) -> Tuple[List[CheckResult], List[dict]]:
+    max_memory_mb = (options and options.max_memory_mb) or DEFAULT_MAX_MEMORY_MB
+    validator = ConformanceValidator()
+    rows = validator.validate_frame(
+        as_frame(dataset, options),
+        as_frame(datadic),  # every rule is needed for the rows checked
+        max_memory_mb=max_memory_mb or None,
+        checks=selected("conformance", options),
+        as_rows=True,
+    )
+    return rows, validator.timings